@@ -0,0 +1 @@
+"""Benchmarks for the earthquake data pipeline. Run from the repository root, e.g. python -m benchmarks.bench_parser"""
@@ -0,0 +1,68 @@
+"""
+raw_archive.py on the real raw files: import time and compression ratio per
+codec, random access latency, and a full pipeline.py re-parse from the loose
+files against one from the archive (outputs compared).
+
+    python -m benchmarks.bench_archive [--txt-dir ./earthquake_data] [--regional-dir ./earthquake_regional_data]
+"""
+import argparse
+import filecmp
+import glob
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from cwa_quake import metrics
+from cwa_quake.pipeline import run_pipeline
+from cwa_quake.raw_archive import CODECS, RawArchive, import_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--txt-dir", default="./earthquake_data")
+    parser.add_argument("--regional-dir", default="./earthquake_regional_data")
+    args = parser.parse_args()
+    metrics.configure(quiet=True)
+
+    file_paths = (sorted(glob.glob(os.path.join(args.txt_dir, "*.txt")))
+                  + sorted(glob.glob(os.path.join(args.regional_dir, "*_regional.json"))))
+    scratch = tempfile.mkdtemp(prefix="bench_archive_")
+    try:
+        print(f"{len(file_paths)} files, {sum(map(os.path.getsize, file_paths)) / 1e6:.1f} MB")
+        print(f"{'codec':<7}{'import s':>9}{'stored MB':>11}{'ratio':>7}{'get p50 ms':>12}")
+        for codec in sorted(CODECS):
+            archive = RawArchive(os.path.join(scratch, f"{codec}.sqlite"), codec)
+            start = time.perf_counter()
+            import_files(archive, file_paths)
+            elapsed = time.perf_counter() - start
+            stats = archive.stats()
+            names = random.Random(0).sample(archive.names(), min(200, stats["payloads"]))
+            latencies = []
+            for name in names:
+                start = time.perf_counter()
+                archive.get(name)
+                latencies.append(time.perf_counter() - start)
+            print(f"{codec:<7}{elapsed:>9.2f}{stats['stored_bytes'] / 1e6:>11.2f}"
+                  f"{stats['bytes'] / stats['stored_bytes']:>7.1f}{np.percentile(latencies, 50) * 1e3:>12.3f}")
+            archive.close()
+
+        loose_dir, archive_dir = os.path.join(scratch, "loose"), os.path.join(scratch, "archive")
+        loose = run_pipeline(args.txt_dir, args.regional_dir, loose_dir)
+        archive = RawArchive(os.path.join(scratch, "lzma.sqlite"))
+        archived = run_pipeline(output_dir=archive_dir, archive=archive)
+        archive.close()
+        names = sorted(os.listdir(loose_dir))
+        _, mismatch, errors = filecmp.cmpfiles(loose_dir, archive_dir, names, shallow=False)
+        print(f"Re-parse from loose files: {loose['events']} events in {loose['elapsed_s']:.2f}s")
+        print(f"Re-parse from the archive: {archived['events']} events in {archived['elapsed_s']:.2f}s "
+              f"({len(mismatch) + len(errors)} outputs differ)")
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == "__main__":
+    main()
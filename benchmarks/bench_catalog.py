@@ -0,0 +1,63 @@
+"""
+EarthquakeCatalog against the glob + json.load scan it replaces, for the
+query "M>=5 in 2024 affecting 新竹市": full scan, catalog with no header
+index yet (builds it), and catalog with the index in place. Prints wall time
+and event files read for each.
+
+    python -m benchmarks.bench_catalog [--unified-dir ./unified_earthquake_data]
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from cwa_quake.earthquake_catalog import EarthquakeCatalog
+
+QUERY = {"start": "2024-01-01", "end": "2025-01-01", "min_magnitude": 5, "county": "新竹市"}
+
+
+def scan(unified_dir):
+    matches, files = [], 0
+    for file_path in glob.glob(os.path.join(unified_dir, '*.json')):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            event = json.load(f)
+        files += 1
+        try:
+            magnitude = float(event.get("magnitude"))
+        except (TypeError, ValueError):
+            continue
+        if ("2024-01-01" <= (event.get("timestamp") or "") < "2025-01-01" and magnitude >= 5
+                and any(location.get("county") == "新竹市" for location in event.get("affected_locations", []))):
+            matches.append(event)
+    return matches, files
+
+
+def query(unified_dir):
+    catalog = EarthquakeCatalog(unified_dir)
+    matches = list(catalog.events(**QUERY))
+    return matches, catalog.stats["indexed"] + catalog.stats["loaded"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--unified-dir", default="./unified_earthquake_data")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench_catalog_")
+    try:
+        unified_dir = os.path.join(scratch, "unified")
+        shutil.copytree(args.unified_dir, unified_dir)
+        print(f"{'method':<22}{'matches':>8}{'files read':>12}{'seconds':>9}")
+        for name, run in [("glob + json.load", scan), ("catalog, no index", query), ("catalog, index", query)]:
+            start = time.perf_counter()
+            matches, files = run(unified_dir)
+            print(f"{name:<22}{len(matches):>8}{files:>12}{time.perf_counter() - start:>9.3f}")
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == "__main__":
+    main()
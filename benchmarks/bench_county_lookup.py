@@ -0,0 +1,147 @@
+"""
+Benchmarks county_lookup.CountyLookup against a per-point Python ray cast,
+and checks it on benchmarks/county_fixture.geojson: a county with a hole
+holding another county, a concave county and a county of two islands. The
+fixture is also written out as a zipped shapefile and read back through
+convert_shapefile_zip(), the conversion behind `county_lookup --fetch`.
+
+    python -m benchmarks.bench_county_lookup [--points 100000] [--boundary-file cwa_quake/taiwan_counties.geojson]
+"""
+import argparse
+import io
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+from cwa_quake.county_lookup import NAME_PROPERTY, CountyLookup, convert_shapefile_zip
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "county_fixture.geojson")
+
+# (lon, lat) -> county in the fixture; away from any edge
+FIXTURE_POINTS = {
+    (120.2, 23.2): "嘉義縣",
+    (120.9, 23.9): "嘉義縣",
+    (120.5, 23.5): "嘉義市",     # in the hole of 嘉義縣
+    (120.25, 22.75): "臺南市",
+    (120.75, 22.25): "臺南市",
+    (120.75, 22.75): None,      # in the notch of 臺南市
+    (119.6, 23.6): "澎湖縣",
+    (119.45, 23.25): "澎湖縣",   # the second island
+    (119.45, 23.6): None,
+    (122.0, 25.0): None,
+}
+
+
+def feature_polygons(feature):
+    geometry = feature["geometry"]
+    return geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+
+
+def python_lookup(collection, lon, lat):
+    """Even-odd ray cast of one point against every ring of every feature, in plain Python."""
+    for feature in collection["features"]:
+        for rings in feature_polygons(feature):
+            inside = False
+            for ring in rings:
+                for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+                    if (y1 > lat) != (y2 > lat) and lon < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                        inside = not inside
+            if inside:
+                return feature["properties"][NAME_PROPERTY]
+    return None
+
+
+def shapefile_zip(collection):
+    """Writes a FeatureCollection as a zipped polygon shapefile, rings wound as shapefiles have them."""
+    records, names = [], []
+    for number, feature in enumerate(collection["features"], 1):
+        rings = []
+        for polygon in feature_polygons(feature):
+            rings.append(polygon[0][::-1])                  # outer ring clockwise
+            rings.extend(ring[::-1] for ring in polygon[1:])
+        points = [point for ring in rings for point in ring]
+        parts = np.cumsum([0] + [len(ring) for ring in rings[:-1]])
+        xs, ys = zip(*points)
+        content = (struct.pack("<i4d2i", 5, min(xs), min(ys), max(xs), max(ys), len(rings), len(points))
+                   + struct.pack(f"<{len(parts)}i", *parts) + struct.pack(f"<{2 * len(points)}d", *np.ravel(points)))
+        records.append(struct.pack(">2i", number, len(content) // 2) + content)
+        names.append(feature["properties"][NAME_PROPERTY].encode("utf-8"))
+
+    body = b"".join(records)
+    shp = struct.pack(">7i", 9994, 0, 0, 0, 0, 0, (100 + len(body)) // 2) + struct.pack("<2i8d", 1000, 5, *[0.0] * 8) + body
+    width = max(len(name) for name in names)
+    dbf = (struct.pack("<4BI2H20x", 3, 126, 1, 1, len(names), 32 + 32 + 1, 1 + width)
+           + NAME_PROPERTY.encode("ascii").ljust(11, b"\0") + b"C" + bytes(4) + bytes([width, 0]) + bytes(14)
+           + b"\r" + b"".join(b" " + name.ljust(width) for name in names) + b"\x1a")
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("COUNTY.shp", shp)
+        zf.writestr("COUNTY.dbf", dbf)
+        zf.writestr("COUNTY.cpg", "UTF-8")
+    return archive.getvalue()
+
+
+def check(lookup, points=FIXTURE_POINTS):
+    coords = np.array(list(points))
+    found = lookup.lookup(coords[:, 0], coords[:, 1])
+    return [(point, expected, county) for (point, expected), county in zip(points.items(), found) if county != expected]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--boundary-file", default=FIXTURE, help="boundaries to time lookups against")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failures = check(CountyLookup(FIXTURE))
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(FIXTURE, "r", encoding="utf-8") as f:
+            converted = convert_shapefile_zip(shapefile_zip(json.load(f)))
+        path = os.path.join(tmp, "converted.geojson")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(converted, f, ensure_ascii=False)
+        converted_failures = check(CountyLookup(path))
+    for point, expected, county in failures + converted_failures:
+        print(f"  {point}: expected {expected}, got {county}")
+    print(f"Fixture points: {'ok' if not failures else 'FAILED'}; "
+          f"after the shapefile round trip: {'ok' if not converted_failures else 'FAILED'}")
+
+    with open(args.boundary_file, "r", encoding="utf-8") as f:
+        collection = json.load(f)
+    lookup, build = timed(lambda: CountyLookup(args.boundary_file))
+    boxes = np.array([[*np.min(ring, axis=0)[:2], *np.max(ring, axis=0)[:2]]
+                      for feature in collection["features"] for rings in feature_polygons(feature) for ring in rings[:1]])
+    rng = np.random.default_rng(args.seed)
+    lons = rng.uniform(boxes[:, 0].min(), boxes[:, 2].max(), args.points)
+    lats = rng.uniform(boxes[:, 1].min(), boxes[:, 3].max(), args.points)
+    found, lookup_time = timed(lambda: lookup.lookup(lons, lats))
+
+    sample = min(args.points, 200)
+    brute, loop_time = timed(lambda: [python_lookup(collection, lons[i], lats[i]) for i in range(sample)])
+    mismatches = sum(county != found[i] for i, county in enumerate(brute))
+
+    print(f"{len(collection['features'])} counties from {args.boundary_file}, {args.points:,} points")
+    print(f"  build lookup:         {build * 1000:8.1f} ms")
+    print(f"  lookup:               {lookup_time * 1000:8.1f} ms  ({args.points / lookup_time:,.0f} points/s, "
+          f"{np.count_nonzero(found != None) / args.points:.0%} in a county)")  # noqa: E711
+    print(f"  python loop:          {loop_time / sample * args.points * 1000:8.1f} ms (extrapolated)")
+    print(f"Results match the python loop on {sample} points: {'yes' if not mismatches else 'NO'}")
+    sys.exit(1 if failures or converted_failures or mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compares reading the unified events from the directory of indented JSON files
+with reading them from a packed event store (event_store.py): opening the
+index, loading every event, fetching single events by ID and a one-month
+time range. The store is built in a scratch directory.
+
+    python -m benchmarks.bench_event_store [--unified-dir ./unified_earthquake_data] [--repeat 3]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from cwa_quake.event_store import EventStore, convert_directory, index_path, normalize_timestamp
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def load_directory(unified_dir):
+    events = []
+    for file_path in sorted(glob.glob(os.path.join(unified_dir, '*.json'))):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            events.append(json.load(f))
+    return events
+
+
+def directory_range(unified_dir, start, end):
+    """Time range over the directory: every file has to be parsed to see its timestamp."""
+    return [event for event in load_directory(unified_dir)
+            if start <= normalize_timestamp(event.get("timestamp")) < end]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--unified-dir", default="./unified_earthquake_data")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--lookups", type=int, default=200, help="random single-event fetches")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench_event_store_")
+    try:
+        store_path = os.path.join(scratch, 'unified_events.jsonl')
+        convert_time, store = best_of(1, lambda: convert_directory(args.unified_dir, store_path))
+        store.close()
+        dir_bytes = sum(os.path.getsize(p) for p in glob.glob(os.path.join(args.unified_dir, '*.json')))
+        store_bytes = os.path.getsize(store_path) + os.path.getsize(index_path(store_path))
+
+        dir_all, events = best_of(args.repeat, lambda: load_directory(args.unified_dir))
+        open_time, store = best_of(args.repeat, lambda: EventStore(store_path))
+        store_all, _ = best_of(args.repeat, lambda: list(EventStore(store_path)))
+
+        ids = random.Random(0).choices(store.ids(), k=args.lookups)
+        paths = [os.path.join(args.unified_dir, f"{event_id}.json") for event_id in ids]
+
+        def fetch_files():
+            for path in paths:
+                with open(path, 'r', encoding='utf-8') as f:
+                    json.load(f)
+
+        dir_get, _ = best_of(args.repeat, fetch_files)
+        store_get, _ = best_of(args.repeat, lambda: [store.get(event_id) for event_id in ids])
+
+        # The most recent month with events
+        latest = max(normalize_timestamp(event.get("timestamp")) for event in events)
+        start, end = latest[:7] + "-01", latest[:7] + "-32"
+        dir_range, month = best_of(args.repeat, lambda: directory_range(args.unified_dir, start, end))
+        store_range, _ = best_of(args.repeat, lambda: list(store.time_range(start, end)))
+
+        print(f"{len(events)} events, converted in {convert_time:.2f}s")
+        print(f"  size:            directory {dir_bytes / 1e6:7.1f} MB   store {store_bytes / 1e6:7.1f} MB")
+        print(f"  open index:      {'':23}store {open_time * 1e3:7.1f} ms")
+        print(f"  load all:        directory {dir_all * 1e3:7.1f} ms   store {store_all * 1e3:7.1f} ms")
+        print(f"  {f'{args.lookups} by ID:':<17}directory {dir_get * 1e3:7.1f} ms   store {store_get * 1e3:7.1f} ms")
+        print(f"  {f'{start[:7]} ({len(month)} ev):':<17}directory {dir_range * 1e3:7.1f} ms   store {store_range * 1e3:7.1f} ms")
+        store.close()
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+pipeline.py on the shared executor at several worker counts: wall time,
+throughput, worker utilization and chunk count per run, and whether the
+unified output is byte-identical to the serial (workers=1) run.
+
+    python -m benchmarks.bench_executor [--workers 1 2 4 8 16] [--chunk-kb N]
+                                        [--txt-dir ./earthquake_data] [--regional-dir ./earthquake_regional_data]
+"""
+import argparse
+import filecmp
+import os
+import shutil
+import tempfile
+import time
+
+from cwa_quake import metrics
+from cwa_quake.executor import FileExecutor
+from cwa_quake.pipeline import run_pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--txt-dir", default="./earthquake_data")
+    parser.add_argument("--regional-dir", default="./earthquake_regional_data")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--chunk-kb", type=int)
+    args = parser.parse_args()
+    metrics.configure(quiet=True)
+
+    scratch = tempfile.mkdtemp(prefix="bench_executor_")
+    try:
+        print(f"{os.cpu_count()} CPUs")
+        print(f"{'workers':>7}{'seconds':>9}{'events/s':>10}{'speedup':>9}{'util':>6}{'chunks':>8}  identical")
+        serial_dir = serial_s = None
+        for workers in sorted(set(args.workers) | {1}):
+            output_dir = os.path.join(scratch, f"w{workers}")
+            executor = FileExecutor(workers, args.chunk_kb * 1024 if args.chunk_kb else None)
+            start = time.perf_counter()
+            stats = run_pipeline(args.txt_dir, args.regional_dir, output_dir, executor=executor)
+            elapsed = time.perf_counter() - start
+            if serial_dir is None:
+                serial_dir, serial_s, identical = output_dir, elapsed, "-"
+            else:
+                names = sorted(os.listdir(serial_dir))
+                match, mismatch, errors = filecmp.cmpfiles(serial_dir, output_dir, names, shallow=False)
+                identical = "yes" if len(match) == len(names) == len(os.listdir(output_dir)) else \
+                    f"NO ({len(mismatch) + len(errors)} differ)"
+            print(f"{workers:>7}{elapsed:>9.2f}{stats['events'] / elapsed:>10.0f}{serial_s / elapsed:>9.2f}"
+                  f"{executor.utilization():>6.0%}{executor.stats['chunks']:>8}  {identical}")
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == "__main__":
+    main()
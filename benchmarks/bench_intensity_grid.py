@@ -0,0 +1,80 @@
+"""
+intensity_grid.py over the unified events: a cold build of the whole
+catalog into an empty cache, the per-event gridding time against a brute
+force distance matrix over every cell, and the latency of a repeat
+request (cache hit).
+
+    python -m benchmarks.bench_intensity_grid [--unified-dir ./unified_earthquake_data] [--workers 1]
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from cwa_quake import metrics
+from cwa_quake.earthquake_catalog import EarthquakeCatalog
+from cwa_quake.executor import FileExecutor
+from cwa_quake.intensity_grid import DEFAULT_K, DEFAULT_MAX_DISTANCE_KM, IntensityGridder, cell_index, grid_axes, \
+    grid_event, location_values
+from cwa_quake.spatial_index import haversine_km
+
+
+def brute_force(event):
+    """IDW of the linear intensity over every cell against every location, without the index."""
+    lons, lats = grid_axes()
+    cell_lons, cell_lats = np.meshgrid(lons, lats)
+    point_lons, point_lats, values = location_values(event)
+    distances = haversine_km(cell_lons.ravel()[:, None], cell_lats.ravel()[:, None], point_lons, point_lats)
+    nearest = np.argsort(distances, axis=1)[:, :DEFAULT_K]
+    d = np.take_along_axis(distances, nearest, axis=1)
+    weights = np.where(d <= DEFAULT_MAX_DISTANCE_KM, np.maximum(d, 0.5) ** -2, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (values["intensity"][nearest] * weights).sum(axis=1) / weights.sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--unified-dir", default="./unified_earthquake_data")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--sample", type=int, default=200, help="events timed one by one")
+    args = parser.parse_args()
+    metrics.configure(quiet=True)
+
+    scratch = tempfile.mkdtemp(prefix="bench_intensity_grid_")
+    try:
+        catalog = EarthquakeCatalog(args.unified_dir, index_path=f"{scratch}/headers.jsonl")
+        gridder = IntensityGridder(catalog, scratch)
+        cell_index()
+        start = time.perf_counter()
+        counts = gridder.build(executor=FileExecutor(args.workers, name="grid"))
+        elapsed = time.perf_counter() - start
+        print(f"Cold build: {counts['gridded']} events in {elapsed:.1f}s ({counts['gridded'] / elapsed:.0f} events/s, "
+              f"{args.workers} workers), {len(grid_axes()[0]) * len(grid_axes()[1])} cells per grid")
+
+        sample = random.Random(0).sample(sorted(catalog.headers), min(args.sample, len(catalog)))
+        events = [catalog.get(event_id) for event_id in sample]
+        for name, run in [("indexed", grid_event), ("brute force", brute_force)]:
+            latencies = []
+            for event in events:
+                start = time.perf_counter()
+                run(event)
+                latencies.append(time.perf_counter() - start)
+            print(f"{name:<12} p50 {np.percentile(latencies, 50) * 1e3:7.2f} ms  "
+                  f"p99 {np.percentile(latencies, 99) * 1e3:7.2f} ms per event")
+
+        latencies = []
+        for event_id in sample:
+            start = time.perf_counter()
+            gridder.get(event_id)
+            latencies.append(time.perf_counter() - start)
+        print(f"Cache hit    p50 {np.percentile(latencies, 50) * 1e3:7.2f} ms  "
+              f"p99 {np.percentile(latencies, 99) * 1e3:7.2f} ms ({gridder.stats['hits']} hits)")
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Compares the streaming station parser (station_parser.py) with the previous
+readlines + per-field regex parser on the earthquake_data corpus, and checks
+that both produce identical results.
+
+    python -m benchmarks.bench_parser [--input-dir ./earthquake_data] [--repeat 3]
+"""
+import argparse
+import glob
+import os
+import re
+import time
+from datetime import datetime
+
+from cwa_quake.intensity import normalize_intensity
+from cwa_quake.parse_earthquake_data import parse_earthquake_file
+from cwa_quake.station_parser import iter_stations
+
+
+def legacy_parse_earthquake_file(filepath):
+    """The parser as it was before station_parser.py, kept as the reference."""
+    with open(filepath, 'r', encoding='big5', errors='replace') as file:
+        lines = file.readlines()
+
+    if len(lines) < 6:
+        return None
+
+    filename = os.path.basename(filepath)
+    earthquake_id = filename.split('_')[1].split('.')[0] if '_' in filename else None
+
+    header_data = {}
+    for i in range(5):
+        if ':' in lines[i]:
+            key, value = lines[i].split(':', 1)
+            header_data[key.strip()] = value.strip()
+
+    lat_match = re.search(r'(\d+\.\d+)', header_data.get('Lat', '0'))
+    lon_match = re.search(r'(\d+\.\d+)', header_data.get('Lon', '0'))
+
+    timestamp = None
+    if 'Origin Time' in header_data:
+        try:
+            timestamp = datetime.strptime(header_data['Origin Time'], '%Y/%m/%d %H:%M:%S').isoformat()
+        except ValueError:
+            pass
+
+    result = {
+        "earthquake_id": earthquake_id,
+        "timestamp": timestamp,
+        "latitude": float(lat_match.group(1)) if lat_match else None,
+        "longitude": float(lon_match.group(1)) if lon_match else None,
+        "depth_km": float(header_data.get('Depth', '0').replace('km', '')) if 'Depth' in header_data else None,
+        "magnitude": float(header_data.get('Mag', '0')) if 'Mag' in header_data else None,
+        "stations": []
+    }
+
+    for i in range(5, len(lines)):
+        line = lines[i].strip()
+        if not line or not line.startswith('Stacode='):
+            continue
+
+        parts = line.split(',')
+        station = {}
+        for part in parts:
+            if '=' in part:
+                key, value = part.split('=', 1)
+                key = key.strip()
+                value = value.strip()
+
+                if re.match(r'^[-+]?\d+\.\d+$', value):
+                    value = float(value)
+                elif value.isdigit():
+                    value = int(value)
+
+                if key == 'Int' and isinstance(value, str) and '級' in value:
+                    value = int(value.replace('級', '').strip())
+                station[key] = value
+        result["stations"].append(station)
+
+    return result
+
+
+def with_normalized_intensity(result):
+    """The legacy result with Int as the current parser reads it (damaged labels like "4??" -> 4)."""
+    for station in result["stations"]:
+        if "Int" in station:
+            station["Int"] = normalize_intensity(station["Int"])
+    return result
+
+
+def time_parser(parse, file_paths, repeat):
+    """Best-of-`repeat` wall time for parsing every file once."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for file_path in file_paths:
+            parse(file_path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input-dir", default="./earthquake_data")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    file_paths = sorted(glob.glob(os.path.join(args.input_dir, '*.txt')))
+    if not file_paths:
+        print(f"No txt files found in {args.input_dir}")
+        return
+
+    mismatches = [path for path in file_paths
+                  if parse_earthquake_file(path) != with_normalized_intensity(legacy_parse_earthquake_file(path))]
+    stations = sum(1 for path in file_paths for _ in iter_stations(path))
+    size = sum(os.path.getsize(path) for path in file_paths)
+
+    legacy = time_parser(legacy_parse_earthquake_file, file_paths, args.repeat)
+    current = time_parser(parse_earthquake_file, file_paths, args.repeat)
+    streaming = time_parser(lambda path: sum(1 for _ in iter_stations(path)), file_paths, args.repeat)
+
+    print(f"{len(file_paths)} files, {stations} stations, {size / 1e6:.1f} MB")
+    for name, elapsed in (("legacy parser", legacy), ("parse_earthquake_file", current), ("iter_stations", streaming)):
+        print(f"{name:>22}: {elapsed:.3f}s  {stations / elapsed:,.0f} stations/s  "
+              f"{size / 1e6 / elapsed:.1f} MB/s  ({legacy / elapsed:.2f}x)")
+    print(f"Output identical to legacy parser: {'yes' if not mismatches else 'NO'}")
+    for path in mismatches[:10]:
+        print(f"  mismatch: {path}")
+
+
+if __name__ == "__main__":
+    main()
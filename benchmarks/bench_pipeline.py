@@ -0,0 +1,78 @@
+"""
+Times the three-script flow (parse_earthquake_data -> add_city_to_stations ->
+unify_earthquake_json) against the fused pipeline.py on the same inputs, and
+compares events/s and bytes written. Both run in a scratch directory.
+
+    python -m benchmarks.bench_pipeline [--txt-dir ./earthquake_data] [--regional-dir ./earthquake_regional_data]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from cwa_quake import add_city_to_stations
+from cwa_quake import unify_earthquake_json
+from cwa_quake.parse_earthquake_data import process_earthquake_files
+from cwa_quake.pipeline import run_pipeline
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(p) for p in glob.glob(os.path.join(path, '*.json')))
+
+
+def link_inputs(txt_dir, regional_dir, work_dir):
+    """Creates work_dir/earthquake_data and work_dir/earthquake_regional_data pointing at the inputs."""
+    os.makedirs(os.path.join(work_dir, 'earthquake_data'))
+    for path in glob.glob(os.path.join(txt_dir, '*.txt')):
+        os.symlink(os.path.abspath(path), os.path.join(work_dir, 'earthquake_data', os.path.basename(path)))
+    os.symlink(os.path.abspath(regional_dir), os.path.join(work_dir, 'earthquake_regional_data'))
+
+
+def run_three_scripts(work_dir):
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            process_earthquake_files('./earthquake_data', './earthquake_data/json')
+            add_city_to_stations.main()
+            unify_earthquake_json.main()
+        elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+    written = sum(directory_bytes(os.path.join(work_dir, d))
+                  for d in ('earthquake_data/json', 'earthquake_data/json_with_city', 'unified_earthquake_data'))
+    return elapsed, written, len(glob.glob(os.path.join(work_dir, 'unified_earthquake_data', '*.json')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--txt-dir", default="./earthquake_data")
+    parser.add_argument("--regional-dir", default="./earthquake_regional_data")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench_pipeline_")
+    try:
+        three_dir, fused_dir = os.path.join(scratch, 'three'), os.path.join(scratch, 'fused')
+        link_inputs(args.txt_dir, args.regional_dir, three_dir)
+        three_time, three_bytes, events = run_three_scripts(three_dir)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = run_pipeline(args.txt_dir, args.regional_dir, os.path.join(fused_dir, 'unified'))
+
+        print(f"{events} events")
+        print(f"  three scripts: {three_time:6.2f}s  {events / three_time:6.0f} events/s  {three_bytes / 1e6:6.1f} MB written")
+        print(f"  pipeline.py:   {stats['elapsed_s']:6.2f}s  {stats['events'] / stats['elapsed_s']:6.0f} events/s  "
+              f"{stats['bytes_written'] / 1e6:6.1f} MB written")
+        print(f"  speedup {three_time / stats['elapsed_s']:.2f}x, "
+              f"{1 - stats['bytes_written'] / three_bytes:.0%} fewer bytes written")
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == "__main__":
+    main()
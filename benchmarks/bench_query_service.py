@@ -0,0 +1,152 @@
+"""
+Load test of query_service.py: the service runs in its own process over a
+scratch copy of the unified directory, and client threads with keep-alive
+connections send a mix of latest / date-range / magnitude / county / by-ID
+queries. Prints requests per second and client-side p50/p99 latency per
+query kind, then adds an event to the directory and measures how long the
+service takes to pick it up.
+
+    python -m benchmarks.bench_query_service [--unified-dir ./unified_earthquake_data] [--clients 8] [--seconds 10]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COUNTIES = ["臺北市", "臺中市", "臺南市", "新竹市", "花蓮縣"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get(conn, path):
+    conn.request("GET", path)
+    response = conn.getresponse()
+    body = response.read()
+    return response.status, body
+
+
+def wait_until_up(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            status, body = get(conn, "/stats")
+            conn.close()
+            if status == 200:
+                return json.loads(body)
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("query service did not start")
+
+
+def make_queries(event_ids, rng):
+    """(kind, path) generator over the query mix."""
+    while True:
+        kind = rng.choice(["latest", "range", "magnitude", "county", "event"])
+        if kind == "latest":
+            path = "/events/latest?limit=20"
+        elif kind == "range":
+            year, month = rng.randint(2014, 2025), rng.randint(1, 12)
+            path = f"/events?start={year}-{month:02d}-01&end={year + month // 12}-{month % 12 + 1:02d}-01"
+        elif kind == "magnitude":
+            path = f"/events?min_magnitude={rng.choice([4, 5, 6])}&limit=50"
+        elif kind == "county":
+            path = f"/events?county={quote(rng.choice(COUNTIES))}&start={rng.randint(2014, 2025)}-01-01&limit=50"
+        else:
+            # Skewed towards a few hot events, as dashboards are
+            path = f"/events/{event_ids[min(int(rng.expovariate(1 / 20)), len(event_ids) - 1)]}"
+        yield kind, path
+
+
+def client(port, event_ids, seconds, seed, results):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    queries = make_queries(event_ids, rng)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        kind, path = next(queries)
+        start = time.perf_counter()
+        status, _ = get(conn, path)
+        results.append((kind, time.perf_counter() - start, status))
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--unified-dir", default="./unified_earthquake_data")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench_query_")
+    unified_dir = os.path.join(scratch, "unified")
+    shutil.copytree(args.unified_dir, unified_dir)
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "cwa_quake.query_service", "--unified-dir", unified_dir,
+                                "--port", str(port), "--reload-interval", "0.5", "--quiet"], cwd=ROOT)
+    try:
+        stats = wait_until_up(port)
+        print(f"Service up with {stats['events']} events in {time.perf_counter() - start:.2f}s")
+
+        event_ids = sorted(os.path.basename(p)[:-len(".json")] for p in os.listdir(unified_dir))
+        random.Random(0).shuffle(event_ids)
+        results = []
+        threads = [threading.Thread(target=client, args=(port, event_ids, args.seconds, seed, results))
+                   for seed in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        errors = sum(status != 200 for _, _, status in results)
+        print(f"{len(results)} requests from {args.clients} clients in {args.seconds:.0f}s: "
+              f"{len(results) / args.seconds:.0f} req/s, {errors} errors")
+        print(f"{'query':<11}{'requests':>9}{'p50 ms':>9}{'p99 ms':>9}")
+        for kind in ["latest", "range", "magnitude", "county", "event", "all"]:
+            latencies = np.array([latency for k, latency, _ in results if kind in (k, "all")]) * 1e3
+            if len(latencies):
+                print(f"{kind:<11}{len(latencies):>9}{np.percentile(latencies, 50):>9.2f}"
+                      f"{np.percentile(latencies, 99):>9.2f}")
+
+        # Incremental reload: a new event shows up without a restart
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        with open(os.path.join(unified_dir, f"{event_ids[0]}.json"), "r", encoding="utf-8") as f:
+            event = json.load(f)
+        event["event_id"] = "9999_001"
+        event["timestamp"] = "2099-01-01T00:00:00"
+        with open(os.path.join(unified_dir, "9999_001.json"), "w", encoding="utf-8") as f:
+            json.dump(event, f, ensure_ascii=False)
+        start = time.perf_counter()
+        while get(conn, "/events/9999_001")[0] != 200:
+            time.sleep(0.01)
+        seen = time.perf_counter() - start
+        stats = json.loads(get(conn, "/stats")[1])
+        print(f"New event served after {seen:.2f}s (reload interval 0.5s, "
+              f"last reload took {stats['last_reload_s'] * 1e3:.1f} ms)")
+        conn.close()
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(scratch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmarks spatial_index.GridIndex on synthetic points spread over Taiwan
+against a per-pair Python loop and a NumPy brute force.
+
+    python -m benchmarks.bench_spatial [--points 100000] [--queries 10000] [--radius 20] [--k 5]
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from cwa_quake.spatial_index import GridIndex, haversine_km
+
+# Bounding box of Taiwan and its outlying islands
+LON_RANGE = (119.3, 122.1)
+LAT_RANGE = (21.8, 25.4)
+
+
+def python_radius(lons, lats, q_lon, q_lat, radius_km):
+    """The O(points) per-query Python loop that reports used to run."""
+    hits = []
+    for i, (lon, lat) in enumerate(zip(lons, lats)):
+        p1, p2 = math.radians(q_lat), math.radians(lat)
+        a = (math.sin((p2 - p1) / 2) ** 2
+             + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon - q_lon) / 2) ** 2)
+        if 2 * 6371.0088 * math.asin(math.sqrt(a)) <= radius_km:
+            hits.append(i)
+    return hits
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--radius", type=float, default=20.0, help="radius query distance in km")
+    parser.add_argument("--k", type=int, default=5, help="neighbours per k-NN query")
+    parser.add_argument("--cell", type=float, default=0.05, help="grid cell size in degrees")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    lons, lats = rng.uniform(*LON_RANGE, args.points), rng.uniform(*LAT_RANGE, args.points)
+    q_lons, q_lats = rng.uniform(*LON_RANGE, args.queries), rng.uniform(*LAT_RANGE, args.queries)
+
+    index, build = timed(lambda: GridIndex(lons, lats, args.cell))
+    radius_hits, radius_time = timed(lambda: index.query_radius(q_lons, q_lats, args.radius))
+    (knn_idx, knn_dist), knn_time = timed(lambda: index.query_knn(q_lons, q_lats, args.k))
+
+    # Baselines on a sample of queries, extrapolated to the full query count
+    sample = min(args.queries, 20)
+    _, loop_time = timed(lambda: [python_radius(lons, lats, q_lons[i], q_lats[i], args.radius) for i in range(sample)])
+    sample_np = min(args.queries, 200)
+    brute, brute_time = timed(lambda: [haversine_km(q_lons[i], q_lats[i], lons, lats) for i in range(sample_np)])
+
+    mismatches = 0
+    for i, distances in enumerate(brute):
+        if set(np.nonzero(distances <= args.radius)[0]) != set(radius_hits[i][0]):
+            mismatches += 1
+        if not np.allclose(np.sort(distances)[:args.k], knn_dist[i]):
+            mismatches += 1
+
+    matches = sum(len(hits) for hits, _ in radius_hits)
+    print(f"{args.points:,} points, {args.queries:,} queries, cell {args.cell} deg")
+    print(f"  build index:          {build * 1000:8.1f} ms")
+    print(f"  radius {args.radius:g} km:        {radius_time * 1000:8.1f} ms  "
+          f"({args.queries / radius_time:,.0f} queries/s, {matches / args.queries:.1f} hits/query)")
+    print(f"  {args.k}-nearest:            {knn_time * 1000:8.1f} ms  ({args.queries / knn_time:,.0f} queries/s)")
+    print(f"  numpy brute force:    {brute_time / sample_np * args.queries * 1000:8.1f} ms (extrapolated)")
+    print(f"  python loop:          {loop_time / sample * args.queries * 1000:8.1f} ms (extrapolated)")
+    print(f"Results match brute force on {sample_np} queries: {'yes' if not mismatches else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+End-to-end benchmark of every stage on a synthetic corpus (benchmarks/synthetic.py):
+
+    parse            parse_earthquake_file() per station txt file
+    city             add_city_to_earthquake_data() per parsed event
+    unify_detailed   transform_detailed_station_data() per city-tagged event
+    unify_regional   transform_regional_intensity_data() per regional record
+    extract_regional extract_regional_data() per details page
+    download         download_earthquake_data() of the catalog against stub_server.py
+
+Each stage runs in a fresh interpreter, so its peak RSS is its own. Inputs a
+stage needs (e.g. the parsed events for city) are prepared before timing.
+Throughput, p50/p99 latency per item and peak RSS are printed and saved as a
+JSON report; --compare prints the change against an earlier report.
+
+    python -m benchmarks.bench_stages [--events 2000 --stations 200 | --corpus DIR] [--report bench_stages.json]
+"""
+import argparse
+import contextlib
+import copy
+import glob
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+STAGES = ["parse", "city", "unify_detailed", "unify_regional", "extract_regional", "download"]
+
+
+def _timed(items, func):
+    """Per-item latencies (s) of func(item)."""
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _parsed_events(corpus):
+    from cwa_quake.parse_earthquake_data import parse_earthquake_file
+
+    return [parse_earthquake_file(path) for path in sorted(glob.glob(os.path.join(corpus, 'earthquake_data', '*.txt')))]
+
+
+def run_stage(stage, corpus):
+    """Runs one stage over the corpus; returns (latencies, input bytes)."""
+    txt_files = sorted(glob.glob(os.path.join(corpus, 'earthquake_data', '*.txt')))
+    regional_files = sorted(glob.glob(os.path.join(corpus, 'earthquake_regional_data', '*.json')))
+    html_files = sorted(glob.glob(os.path.join(corpus, 'details_html', '*.html')))
+
+    if stage == "parse":
+        from cwa_quake.parse_earthquake_data import parse_earthquake_file
+
+        return _timed(txt_files, parse_earthquake_file), sum(map(os.path.getsize, txt_files))
+
+    if stage == "city":
+        from cwa_quake.add_city_to_stations import add_city_to_earthquake_data
+
+        events = [event for event in _parsed_events(corpus) if event]
+        return _timed(events, add_city_to_earthquake_data), sum(map(os.path.getsize, txt_files))
+
+    if stage == "unify_detailed":
+        from cwa_quake.add_city_to_stations import add_city_to_earthquake_data
+        from cwa_quake.unify_earthquake_json import transform_detailed_station_data
+
+        events = [add_city_to_earthquake_data(event) for event in _parsed_events(corpus) if event]
+        return (_timed(events, lambda event: transform_detailed_station_data(event, "bench")),
+                sum(map(os.path.getsize, txt_files)))
+
+    if stage == "unify_regional":
+        from cwa_quake.unify_earthquake_json import transform_regional_intensity_data
+
+        records = []
+        for path in regional_files:
+            with open(path, 'r', encoding='utf-8') as f:
+                records.append((json.load(f), os.path.basename(path)[:-len('.json')]))
+        # The transform fills missing counties in place; time it on copies
+        records = [copy.deepcopy(record) for record in records]
+        return (_timed(records, lambda record: transform_regional_intensity_data(*record)),
+                sum(map(os.path.getsize, regional_files)))
+
+    if stage == "extract_regional":
+        from cwa_quake.regional_extractor import extract_regional_data
+
+        pages = []
+        for path in html_files:
+            with open(path, 'rb') as f:
+                pages.append(f.read())
+        return _timed(pages, lambda page: extract_regional_data([page])), sum(map(len, pages))
+
+    if stage == "download":
+        from cwa_quake.download_earthquake_data import download_earthquake_data
+        from cwa_quake.stub_server import start_stub_server
+
+        server, base_url = start_stub_server(os.path.join(corpus, 'earthquake_data'),
+                                             os.path.join(corpus, 'earthquake_regional_data'))
+        scratch = tempfile.mkdtemp(prefix="bench_download_")
+        latencies, sizes = [], []
+
+        def collect(job, result):
+            latencies.append(result["elapsed_s"])
+            sizes.append(result.get("size") or 0)
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                download_earthquake_data(os.path.join(corpus, 'catalog.csv'), os.path.join(scratch, 'txt'),
+                                         os.path.join(scratch, 'regional'), base_url,
+                                         max_workers=8, rate=10000, burst=100, on_result=collect)
+        finally:
+            server.shutdown()
+            shutil.rmtree(scratch)
+        return latencies, sum(sizes)
+
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def child(stage, corpus):
+    """Runs one stage and prints its statistics as JSON."""
+    start = time.perf_counter()
+    latencies, size = run_stage(stage, corpus)
+    wall = time.perf_counter() - start
+    latencies = np.asarray(latencies)
+    busy = float(latencies.sum())
+    # The download stage overlaps requests, so its throughput is per wall second
+    total = wall if stage == "download" else busy
+    print(json.dumps({
+        "items": len(latencies),
+        "total_s": total,
+        "items_per_s": len(latencies) / total if total else None,
+        "mb_per_s": size / 1e6 / total if total else None,
+        "p50_ms": float(np.percentile(latencies, 50) * 1e3) if len(latencies) else None,
+        "p99_ms": float(np.percentile(latencies, 99) * 1e3) if len(latencies) else None,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def measure(stage, corpus):
+    output = subprocess.run([sys.executable, "-m", "benchmarks.bench_stages", "--child", stage, corpus],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def format_report(report, previous=None):
+    lines = [f"{'stage':<17}{'items':>7}{'items/s':>11}{'MB/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'RSS MB':>8}"]
+    for stage, stats in report["stages"].items():
+        line = (f"{stage:<17}{stats['items']:>7}{stats['items_per_s'] or 0:>11.0f}{stats['mb_per_s'] or 0:>8.1f}"
+                f"{stats['p50_ms'] or 0:>9.2f}{stats['p99_ms'] or 0:>9.2f}{stats['peak_rss_mb']:>8.0f}")
+        old = (previous or {}).get("stages", {}).get(stage)
+        if old and old.get("items_per_s") and stats["items_per_s"]:
+            line += f"  {stats['items_per_s'] / old['items_per_s']:.2f}x throughput vs previous"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="existing synthetic corpus; generated in a scratch directory if omitted")
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--stations", type=int, default=200)
+    parser.add_argument("--stages", nargs="*", choices=STAGES, default=STAGES)
+    parser.add_argument("--report", default="bench_stages.json", help="JSON report to write")
+    parser.add_argument("--compare", help="earlier JSON report to compare with")
+    parser.add_argument("--child", nargs=2, metavar=("STAGE", "CORPUS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    from benchmarks.synthetic import generate_corpus
+
+    scratch = None
+    corpus = args.corpus
+    try:
+        if corpus is None:
+            scratch = corpus = tempfile.mkdtemp(prefix="bench_stages_")
+            start = time.perf_counter()
+            counts = generate_corpus(corpus, args.events, args.stations)
+            print(f"Generated {counts['detailed']} station files x {args.stations} stations and "
+                  f"{counts['regional']} regional events in {time.perf_counter() - start:.1f}s")
+
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "corpus": args.corpus or {"events": args.events, "stations": args.stations},
+            "stages": {stage: measure(stage, corpus) for stage in args.stages},
+        }
+    finally:
+        if scratch:
+            shutil.rmtree(scratch)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    print(format_report(report, previous))
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
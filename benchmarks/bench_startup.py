@@ -0,0 +1,81 @@
+"""
+Start-up cost of the command line: median wall time of fresh interpreters
+running `earthquake --help`, a few subcommand --help, and a bare import of
+each module, against `python -c pass`. Reports whether numpy or requests got
+imported, and checks the paths that need neither against a budget (ms over
+the baseline); exits 1 if one is over.
+
+    python -m benchmarks.bench_startup [--runs 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Prints which heavy dependencies the command left in sys.modules
+PROBE = ("import atexit, sys\n"
+         "atexit.register(lambda: print('\\0' + ','.join(m for m in ('numpy', 'requests') if m in sys.modules),"
+         " file=sys.stderr))\n")
+
+# (label, code, budget over the baseline in ms or None, heavy imports allowed).
+# Commands that process events need numpy anyway and are only reported.
+CASES = [
+    ("earthquake --help", ["--help"], 20, ""),
+    ("earthquake download --help", ["download", "--help"], 60, ""),
+    ("earthquake query --help", ["query", "--help"], None, "numpy"),
+    ("earthquake watch --help", ["watch", "--help"], None, "numpy"),
+] + [(f"import {module}", module, budget, allowed) for module, budget, allowed in [
+    ("cwa_quake.earthquake_cli", 20, ""),
+    ("cwa_quake.metrics", 20, ""),
+    ("cwa_quake.download_engine", 60, ""),
+    ("cwa_quake.download_manifest", 60, ""),
+    ("cwa_quake.raw_archive", 60, ""),
+    ("cwa_quake.download_earthquake_data", 60, ""),
+    ("cwa_quake.earthquake_catalog", None, "numpy"),
+    ("cwa_quake.pipeline", None, "numpy"),
+    ("cwa_quake.watch", None, "numpy"),
+]]
+
+
+def run(code, runs):
+    """Median seconds of `python -c code` over `runs` runs, and the heavy modules it imported."""
+    times, loaded = [], ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", PROBE + code], cwd=ROOT, capture_output=True, text=True)
+        times.append(time.perf_counter() - start)
+        loaded = result.stderr.rpartition("\0")[2].strip()
+    return statistics.median(times), loaded
+
+
+def cli(args):
+    return f"from cwa_quake import earthquake_cli\ntry:\n    earthquake_cli.main({args!r})\nexcept SystemExit:\n    pass\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=15)
+    args = parser.parse_args()
+
+    baseline, _ = run("pass", args.runs)
+    print(f"{'command':<44}{'ms':>8}{'over base':>11}{'budget':>8}  {'imports':<16}")
+    print(f"{'python -c pass':<44}{baseline * 1e3:>8.1f}")
+    failed = 0
+    for label, target, budget, allowed in CASES:
+        elapsed, loaded = run(cli(target) if isinstance(target, list) else f"import {target}", args.runs)
+        over = (elapsed - baseline) * 1e3
+        verdict = ""
+        if budget is not None:
+            ok = over <= budget and loaded in ("", allowed)
+            failed += not ok
+            verdict = "PASS" if ok else "FAIL"
+        print(f"{label:<44}{elapsed * 1e3:>8.1f}{over:>11.1f}{budget or '-':>8}  {loaded or '-':<16}{verdict}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Loads the full catalog of station records as per-event dicts (reading the
+unified JSON directory) and as memory-mapped columns (station_columns.py),
+then computes the max intensity per county both ways. Each variant runs in a
+fresh interpreter so peak RSS can be compared; the baseline is an interpreter
+that has only imported the modules.
+
+    python -m benchmarks.bench_station_columns [--unified-dir ./unified_earthquake_data]
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def run_dicts(unified_dir):
+    from cwa_quake.intensity import INTENSITY_MISSING, intensity_code
+    from cwa_quake.station_columns import load_unified_events
+
+    events = list(load_unified_events(unified_dir=unified_dir))
+    max_intensity = {}
+    for event in events:
+        for location in event["affected_locations"]:
+            code = intensity_code(location["intensity"])
+            if code != INTENSITY_MISSING and location["county"]:
+                max_intensity[location["county"]] = max(max_intensity.get(location["county"], 0), code)
+    return sum(len(event["affected_locations"]) for event in events), max_intensity
+
+
+def run_columns(columns_dir):
+    from cwa_quake.station_columns import StationColumns
+
+    columns = StationColumns.load(columns_dir)
+    max_intensity = columns.group_by("county", "intensity", "max")
+    return len(columns), {county: int(code) for county, code in max_intensity.items()}
+
+
+def child(mode, path):
+    """Runs one variant and prints its timings and peak RSS as JSON."""
+    import numpy  # noqa: F401  (part of the baseline of every variant)
+    import cwa_quake.station_columns  # noqa: F401
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "dicts":
+        records, result = run_dicts(path)
+    elif mode == "columns":
+        records, result = run_columns(path)
+    else:
+        records, result = 0, {}
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"elapsed_s": elapsed, "rss_kb": peak - baseline, "records": records, "result": result}))
+
+
+def measure(mode, path):
+    output = subprocess.run([sys.executable, "-m", "benchmarks.bench_station_columns", "--child", mode, path],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--unified-dir", default="./unified_earthquake_data")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    from cwa_quake.station_columns import StationColumns, load_unified_events
+
+    scratch = tempfile.mkdtemp(prefix="bench_station_columns_")
+    try:
+        start = time.perf_counter()
+        StationColumns.from_events(load_unified_events(unified_dir=args.unified_dir)).save(scratch)
+        build_time = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(scratch, name)) for name in os.listdir(scratch))
+
+        dicts = measure("dicts", args.unified_dir)
+        columns = measure("columns", scratch)
+        assert dicts["result"] == columns["result"], (dicts["result"], columns["result"])
+
+        print(f"{columns['records']} station records; columns built in {build_time:.2f}s, {size / 1e6:.2f} MB on disk")
+        print(f"  dicts:   {dicts['elapsed_s'] * 1e3:7.1f} ms  {dicts['rss_kb'] / 1024:6.1f} MB peak RSS over baseline")
+        print(f"  columns: {columns['elapsed_s'] * 1e3:7.1f} ms  {columns['rss_kb'] / 1024:6.1f} MB peak RSS over baseline")
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == "__main__":
+    main()
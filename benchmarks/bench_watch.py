@@ -0,0 +1,112 @@
+"""
+Latency benchmark of watch.py against the stub server: a synthetic corpus
+is generated, the stub publishes its catalog without the newest --burst
+events and the watcher ingests that baseline. Then, at a random point of
+the poll interval, the full catalog is published at once - a swarm of
+aftershocks - and the time from publication to each unified record is
+measured, with the peak queue depth and RSS.
+
+    python -m benchmarks.bench_watch [--events 2000] [--burst 500] [--workers 4] [--queue-size 32]
+"""
+import argparse
+import os
+import random
+import resource
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from cwa_quake import metrics
+from benchmarks.synthetic import generate_corpus
+from cwa_quake.stub_server import start_stub_server
+from cwa_quake.watch import Watcher
+
+
+def publish(catalog, lines):
+    """Replaces the served catalog atomically; returns the publication time."""
+    with open(catalog + ".tmp", "wb") as f:
+        f.writelines(lines)
+    os.replace(catalog + ".tmp", catalog)
+    return time.time()
+
+
+def wait_for(path, count, timeout=600):
+    deadline = time.time() + timeout
+    while len(os.listdir(path)) < count:
+        if time.time() > deadline:
+            raise RuntimeError(f"{len(os.listdir(path))} of {count} events unified after {timeout}s")
+        time.sleep(0.01)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--burst", type=int, default=500, help="events published at once after the baseline")
+    parser.add_argument("--stations", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=32)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub server seconds per response")
+    args = parser.parse_args()
+    metrics.configure(quiet=True)
+
+    scratch = tempfile.mkdtemp(prefix="bench_watch_")
+    try:
+        corpus = os.path.join(scratch, "corpus")
+        generate_corpus(corpus, args.events, args.stations)
+        with open(os.path.join(corpus, "catalog.csv"), "rb") as f:
+            header, *rows = f.readlines()  # newest first
+        catalog = os.path.join(scratch, "catalog.csv")
+        publish(catalog, [header] + rows[args.burst:])
+
+        server, base_url = start_stub_server(os.path.join(corpus, "earthquake_data"),
+                                             os.path.join(corpus, "earthquake_regional_data"),
+                                             latency=args.latency, catalog_file=catalog)
+        unified_dir = os.path.join(scratch, "unified")
+        dirs = [os.path.join(scratch, name) for name in ("txt", "regional")]
+        for path in dirs + [unified_dir]:
+            os.makedirs(path)
+        watcher = Watcher(f"{base_url}/catalog.csv", os.path.join(scratch, "manifest.sqlite"), *dirs, unified_dir,
+                          ledger_path=os.path.join(scratch, "ledger.sqlite"),
+                          registry_path=os.path.join(scratch, "registry.sqlite"), base_url=base_url,
+                          workers=args.workers, queue_size=args.queue_size, rate=0)
+        thread = threading.Thread(target=watcher.run, args=(args.interval,))
+        start = time.perf_counter()
+        thread.start()
+        wait_for(unified_dir, len(rows) - args.burst)
+        baseline_s = time.perf_counter() - start
+        print(f"Baseline: {len(rows) - args.burst} events ingested in {baseline_s:.2f}s "
+              f"({(len(rows) - args.burst) / baseline_s:.0f} events/s)")
+
+        metrics.metrics.reset()
+        watcher.stats["peak_queue"] = 0
+        time.sleep(random.uniform(0, args.interval))
+        published = publish(catalog, [header] + rows)
+        wait_for(unified_dir, len(rows))
+        burst_s = time.time() - published
+        watcher.stop()
+        thread.join()
+        server.shutdown()
+
+        latencies = np.array([os.path.getmtime(entry.path) for entry in os.scandir(unified_dir)
+                              if os.path.getmtime(entry.path) >= published]) - published
+        snapshot = metrics.metrics.snapshot()["histograms"]
+        print(f"Burst: {args.burst} events published at once, all unified after {burst_s:.2f}s "
+              f"({args.workers} workers, poll interval {args.interval}s, stub latency {args.latency * 1e3:.0f} ms)")
+        print(f"Publication to unified record: p50 {np.percentile(latencies, 50):.2f}s, "
+              f"p99 {np.percentile(latencies, 99):.2f}s, first {latencies.min():.2f}s")
+        print(f"Watcher's estimate (Last-Modified based): p50 "
+              f"{snapshot['watch.publish_to_unified_seconds']['p50']:.2f}s, "
+              f"p99 {snapshot['watch.publish_to_unified_seconds']['p99']:.2f}s")
+        print(f"Peak queue depth {watcher.stats['peak_queue']} of {args.queue_size}, "
+              f"queue wait p99 {snapshot['watch.queue_wait_seconds']['p99']:.2f}s, "
+              f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == "__main__":
+    main()
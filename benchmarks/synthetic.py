@@ -0,0 +1,167 @@
+"""
+Generates a synthetic corpus in the CWA formats, at any scale:
+
+    {out}/catalog.csv                       Big5 catalog (地震活動彙整) listing every event
+    {out}/earthquake_data/{year}_{id}.txt   Big5 station files of the numbered events
+    {out}/earthquake_regional_data/{encoded_id}_regional.json
+                                            regional data of the unnumbered events,
+                                            as stub_server.py serves them
+    {out}/details_html/{encoded_id}.html    their details pages
+
+Station codes are those of add_city_to_stations.code_to_city, followed by
+made-up ones once a corpus needs more stations. Files before 2015 use the
+nine-field layout, later ones all fifteen fields; from 2020 on intensities
+5 and 6 are split into 弱/強.
+
+    python -m benchmarks.synthetic --out /tmp/corpus --events 10000 --stations 200
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+
+from cwa_quake.add_city_to_stations import code_to_city
+from cwa_quake.earthquake_codec import encode_row
+from cwa_quake.stub_server import render_details_page
+
+YEARS = range(2014, 2026)
+
+# Taiwan's bounding box, where stations and epicenters are placed
+LON_RANGE = (120.0, 122.0)
+LAT_RANGE = (21.9, 25.3)
+
+REGIONAL_COUNTIES = ["臺北市", "新北市", "臺中市", "臺南市", "高雄市", "新竹市", "花蓮縣", "宜蘭縣"]
+
+# Lower PGA bound (gal) of each intensity level
+INTENSITY_PGA = [(250, "6弱"), (140, "5強"), (80, "5弱"), (25, "4"), (8, "3"), (2.5, "2"), (0.8, "1"), (0, "0")]
+
+
+def intensity_for(pga, year):
+    for threshold, level in INTENSITY_PGA:
+        if pga >= threshold:
+            if year < 2020 or not level[1:]:
+                return f"{level[0]}級"
+            return level
+    return "0級"
+
+
+def make_stations(count, rng):
+    """(code, name, lon, lat) of `count` stations."""
+    codes = list(code_to_city)[:count]
+    codes += [f"S{i:03d}" for i in range(count - len(codes))]
+    return [(code, f"測站{i % 1000:03d}", round(rng.uniform(*LON_RANGE), 2), round(rng.uniform(*LAT_RANGE), 2))
+            for i, code in enumerate(codes)]
+
+
+def station_file(origin, lon, lat, depth, magnitude, stations, rng):
+    """Text of one station file (str; written as Big5)."""
+    year = origin[:4]
+    lines = [
+        f"Origin Time:{origin.replace('-', '/')}",
+        f"Lon:{lon:.2f}°E",
+        f"Lat:{lat:.2f}°N",
+        f"Depth:{depth:.1f}km",
+        f"Mag:{magnitude:.1f}",
+    ]
+    for code, name, st_lon, st_lat in stations:
+        dist = math.hypot((st_lon - lon) * 101.8, (st_lat - lat) * 111.2)
+        baz = math.degrees(math.atan2(lon - st_lon, lat - st_lat)) % 360
+        hypo = math.hypot(dist, depth)
+        pga = [10 ** (0.77 + 0.57 * magnitude - 1.76 * math.log10(max(hypo, 1)) + rng.gauss(0, 0.25)) for _ in range(3)]
+        pgv = [p / rng.uniform(15, 40) for p in pga]
+        fields = [f"Stacode={code:<4}", f"Staname={name}", f"Stalon={st_lon:.2f}", f"Stalat={st_lat:.2f}",
+                  f"Dist={dist:7.2f}"]
+        if int(year) < 2015:
+            fields += [f"AZ={baz:6.2f}"] + [f"PGA({c})={v:7.2f}" for c, v in zip(("V", "NS", "EW"), pga)]
+        else:
+            fields += [f"BAZ={baz:6.2f}"]
+            fields += [f"PGA({c})={v:7.2f}" for c, v in zip(("V", "NS", "EW"), pga)]
+            fields += [f"PGV({c})={v:7.2f}" for c, v in zip(("V", "NS", "EW"), pgv)]
+            fields += [f"Int= {intensity_for(max(pga[1:]), int(year))}",
+                       f"PGA(SUM)={math.sqrt(sum(v * v for v in pga)):7.2f}",
+                       f"PGV(SUM)={math.sqrt(sum(v * v for v in pgv)):7.2f}"]
+        lines.append(",".join(fields))
+    return "\n".join(lines) + "\n"
+
+
+def generate_corpus(out_dir, events=1000, stations=200, regional_share=0.5, locations=5, seed=0):
+    """
+    Writes a synthetic corpus (see the module docstring) and returns its counts.
+
+    Args:
+        events: Total number of catalog events.
+        stations: Stations per numbered event's txt file.
+        regional_share: Fraction of events that are unnumbered (regional).
+        locations: Affected locations per regional event.
+    """
+    rng = random.Random(seed)
+    txt_dir = os.path.join(out_dir, "earthquake_data")
+    regional_dir = os.path.join(out_dir, "earthquake_regional_data")
+    html_dir = os.path.join(out_dir, "details_html")
+    for path in (txt_dir, regional_dir, html_dir):
+        os.makedirs(path, exist_ok=True)
+
+    station_list = make_stations(stations, rng)
+    numbers = {year: 0 for year in YEARS}
+    rows = []
+    counts = {"detailed": 0, "regional": 0, "bytes": 0}
+    for i in range(events):
+        year = YEARS[i * len(YEARS) // events]
+        origin = (f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+                  f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}")
+        lon, lat = rng.uniform(*LON_RANGE), rng.uniform(*LAT_RANGE)
+        depth, magnitude = rng.uniform(3, 80), round(rng.uniform(3.0, 7.0), 1)
+        regional = rng.random() < regional_share
+        if regional:
+            number = "小區域有感地震"
+        else:
+            numbers[year] += 1
+            number = f"{numbers[year]:03d}   "
+        row = [number, origin, f"{lon:.3f}", f"{lat:.4f}", f"{magnitude:.1f}", f"{depth:.1f}", "1",
+               "合成地震 (位於臺灣)"]
+        rows.append(row)
+        encoded_id, _ = encode_row(row)
+
+        if regional:
+            info = {
+                "epicenter_lat": f"{lat:.4f}", "epicenter_lon": f"{lon:.4f}",
+                "magnitude": f"{magnitude:.1f}", "max_intensity": str(rng.randint(1, 4)),
+                "locations": [{
+                    "latitude": f"{rng.uniform(*LAT_RANGE):.4f}", "longitude": f"{rng.uniform(*LON_RANGE):.4f}",
+                    "county": rng.choice(REGIONAL_COUNTIES), "intensity": str(rng.randint(1, 4)),
+                    "location_name": f"地點{rng.randint(0, 999):03d}",
+                } for _ in range(locations)],
+            }
+            path = os.path.join(regional_dir, f"{encoded_id}_regional.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(info, f, ensure_ascii=False, indent=2)
+            with open(os.path.join(html_dir, f"{encoded_id}.html"), "w", encoding="utf-8") as f:
+                f.write(render_details_page(info, padding=20000))
+            counts["regional"] += 1
+        else:
+            path = os.path.join(txt_dir, f"{year}_{number.strip()}.txt")
+            with open(path, "w", encoding="big5") as f:
+                f.write(station_file(origin, lon, lat, depth, magnitude, station_list, rng))
+            counts["detailed"] += 1
+        counts["bytes"] += os.path.getsize(path)
+
+    with open(os.path.join(out_dir, "catalog.csv"), "w", encoding="big5", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["編號", "地震時間", "經度", "緯度", "規模", "深度", "最大震度", "位置"])
+        writer.writerows(sorted(rows, key=lambda r: r[1], reverse=True))
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--stations", type=int, default=200)
+    parser.add_argument("--regional-share", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    counts = generate_corpus(args.out, args.events, args.stations, args.regional_share, seed=args.seed)
+    print(f"Wrote {counts['detailed']} station files and {counts['regional']} regional events "
+          f"({counts['bytes'] / 1e6:.1f} MB) to {args.out}")
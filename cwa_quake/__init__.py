@@ -0,0 +1,7 @@
+"""
+CWA earthquake data tools: download, parse, unify and query the station and
+regional intensity data. Each module is also a command (see earthquake_cli.py):
+
+    python -m cwa_quake pipeline --incremental
+    python -m cwa_quake.pipeline --incremental
+"""
@@ -0,0 +1,3 @@
+from .earthquake_cli import main
+
+main()
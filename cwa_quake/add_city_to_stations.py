@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import json
+import sys
+import glob
+import os
+import argparse
+import functools
+
+from . import executor as file_executor
+from . import metrics
+from .build_ledger import open_ledger, plan_build, record_build, remove_orphans
+from .county_lookup import lookup_counties, normalize_county
+from .station_registry import DEFAULT_REGISTRY, code_to_city, open_registry, station_counties
+
+def add_city_to_earthquake_data(earthquake_data, counties=None, sites=None):
+    """
+    Add city information to each station in the earthquake data based on station code.
+
+    `counties` maps station codes to their city/county, e.g. station_counties()
+    of the station registry; it defaults to the curated code_to_city. The
+    name is normalized to the county (county_lookup.normalize_county), or
+    "Unknown".
+    Every station is kept unless `sites`, a set of cities, is given; per-site
+    subsets are otherwise views of the county index (see county_index.py).
+    """
+    if counties is None:
+        counties = code_to_city
+    filtered_stations = []
+
+    # Stations missing from the mapping get their county from the offline
+    # boundary lookup, in one batch per event
+    stations = earthquake_data.get("stations", [])
+    new_stations = [station for station in stations
+                    if "Stacode" in station and station["Stacode"] not in counties
+                    and isinstance(station.get("Stalon"), float) and isinstance(station.get("Stalat"), float)]
+    looked_up = {}
+    if new_stations:
+        looked_up_counties = lookup_counties([station["Stalon"] for station in new_stations],
+                                             [station["Stalat"] for station in new_stations])
+        looked_up = {id(station): county for station, county in zip(new_stations, looked_up_counties)}
+        metrics.incr("city.county_lookups", len(new_stations))
+
+    for station in stations:
+        if "Stacode" in station:
+            station_code = station["Stacode"]
+
+            if station_code in counties:
+                city = counties[station_code]
+            else:
+                city = looked_up.get(id(station))
+            # Some curated entries are a township or a building; keep the county
+            city = normalize_county(city) or "Unknown"
+            station["City"] = city
+            if sites is None or city in sites:
+                filtered_stations.append(station)
+    
+    metrics.incr("city.events")
+    metrics.incr("city.stations_kept", len(filtered_stations))
+    metrics.incr("city.stations_dropped", len(stations) - len(filtered_stations))
+    earthquake_data["stations"] = filtered_stations
+    return earthquake_data
+
+def process_file(input_file, output_file=None, counties=None):
+    """Process a single JSON file to add city information."""
+    try:
+        with open(input_file, 'r') as f:
+            earthquake_data = json.load(f)
+        
+        updated_data = add_city_to_earthquake_data(earthquake_data, counties)
+        
+        if output_file:
+            # Write to the output file
+            file_executor.write_atomic(output_file, json.dumps(updated_data, ensure_ascii=False, indent=2).encode('utf-8'))
+            metrics.detail(f"Updated data written to {output_file}")
+        else:
+            # Output to stdout if no output file specified
+            print(json.dumps(updated_data, ensure_ascii=False, indent=2))
+            
+        return True
+    except Exception as e:
+        metrics.warn(f"Error processing file {input_file}: {e}")
+        return False
+
+def tag_file(input_file, output_dir, counties=None):
+    """Adds city information to one JSON file into output_dir; returns the output path, or None on error."""
+    output_file = os.path.join(output_dir, os.path.basename(input_file))
+    return output_file if process_file(input_file, output_file, counties) else None
+
+def main(ledger=None, registry=None, executor=None):
+    """
+    Adds city information to every parsed earthquake JSON file.
+
+    With a station registry connection (see station_registry.py) counties
+    are read from the registry instead of being looked up per event.
+
+    With a build ledger connection (see build_ledger.py) unchanged inputs are
+    skipped and outputs whose input is gone are deleted. Files are tagged on
+    the `executor` (see executor.py), serially by default.
+    """
+    executor = executor or file_executor.FileExecutor(1, name="city")
+    # Hardcoded paths
+    input_pattern = "./earthquake_data/json/*.json"
+    output_dir = "./earthquake_data/json_with_city"
+    
+    json_files = glob.glob(input_pattern)
+    if not json_files:
+        metrics.warn(f"No files found matching pattern: {input_pattern}")
+        return
+    
+    # Ensure output directory exists
+    os.makedirs(output_dir, exist_ok=True)
+
+    if ledger is not None:
+        for removed in remove_orphans(ledger, "city", json_files):
+            metrics.detail(f"Removed orphaned {removed}")
+        to_build, skipped = plan_build(ledger, "city", json_files)
+        metrics.info(f"{len(to_build)} new or modified files, {skipped} up to date")
+    else:
+        to_build = [(json_file, None) for json_file in json_files]
+    
+    counties = station_counties(registry) if registry is not None else None
+    processed = 0
+    results = executor.map(functools.partial(tag_file, output_dir=output_dir, counties=counties),
+                           [json_file for json_file, _ in to_build])
+    for (_, output_file), (json_file, fingerprint) in zip(results, to_build):
+        if output_file:
+            processed += 1
+            if ledger is not None:
+                record_build(ledger, "city", json_file, fingerprint, output_file)
+
+    if ledger is not None:
+        ledger.commit()
+    
+    metrics.info(f"Processed {processed} of {len(to_build)} files")
+    metrics.info(executor.report())
+    metrics.info(f"City information added to all stations. Results saved in {output_dir}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add city information to parsed earthquake JSON files.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip inputs unchanged since the last run, tracked in the build ledger")
+    parser.add_argument("--ledger", default="./build_ledger.sqlite")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY,
+                        help="station registry to read counties from, if it exists")
+    file_executor.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+
+    with metrics.stage("city"):
+        main(open_ledger(args.ledger) if args.incremental else None,
+             open_registry(args.registry) if os.path.exists(args.registry) else None,
+             file_executor.from_args(args, "city"))
+    metrics.finish()
\ No newline at end of file
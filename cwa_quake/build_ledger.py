@@ -0,0 +1,143 @@
+import hashlib
+import os
+import sqlite3
+
+# One row per (stage, source file) that has been built.
+#   stage:   "parse", "city", "unify", "pipeline" or "pipeline-store"
+#   size, mtime, sha256: fingerprint of the source when it was built
+#   version: STAGE_VERSIONS[stage] of the code that built it
+#   depends: digest of the other inputs the output was built with (the
+#            site_motion coefficients for regional sources), '' if none
+#   output:  file written from the source
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    stage   TEXT NOT NULL,
+    source  TEXT NOT NULL,
+    size    INTEGER NOT NULL,
+    mtime   REAL NOT NULL,
+    sha256  TEXT NOT NULL,
+    output  TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    depends TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (stage, source)
+);
+"""
+
+DEFAULT_LEDGER = "./build_ledger.sqlite"
+
+# Output format version per stage. Bump a stage's version whenever what it
+# writes for the same source changes, so --incremental rebuilds everything
+# built by older code instead of mixing old and new outputs. Ledgers from
+# before versioning read as version 0.
+STAGE_VERSIONS = {
+    "parse": 1,
+    "city": 3,
+    "unify": 3,
+    "pipeline": 4,
+    "pipeline-store": 4,
+}
+
+
+def open_ledger(db_path=DEFAULT_LEDGER):
+    """Opens (creating or upgrading if needed) the SQLite build ledger."""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(builds)")}
+    if "version" not in columns:
+        conn.execute("ALTER TABLE builds ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    if "depends" not in columns:
+        conn.execute("ALTER TABLE builds ADD COLUMN depends TEXT NOT NULL DEFAULT ''")
+    conn.commit()
+    return conn
+
+
+def file_digest(path):
+    """sha256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def plan_build(conn, stage, sources, output_exists=os.path.exists, depends=None):
+    """
+    Works out which sources of a stage have to be (re)built.
+
+    A source is skipped when it was built by the stage's current version
+    (STAGE_VERSIONS) from the same other inputs (`depends(source)`, a digest
+    or '', compared with what record_build() was given), its size and mtime
+    match the ledger and its output still exists. If only the mtime changed, the content hash decides, so
+    touching a file does not trigger a rebuild. Stages whose outputs are
+    not files pass their own `output_exists` check.
+
+    Returns:
+        tuple: (to_build, skipped)
+            - to_build: list of (source, fingerprint) to build; pass the
+              fingerprint to record_build() once the output is written.
+            - skipped: number of up-to-date sources.
+    """
+    known = {
+        row[0]: row[1:]
+        for row in conn.execute("SELECT source, size, mtime, sha256, output, depends FROM builds "
+                                "WHERE stage = ? AND version = ?", (stage, STAGE_VERSIONS.get(stage, 0)))
+    }
+    to_build = []
+    skipped = 0
+    for source in sources:
+        stat = os.stat(source)
+        entry = known.get(source)
+        if entry is not None and entry[4] == (depends(source) if depends else "") and output_exists(entry[3]):
+            size, mtime, sha256, output, _ = entry
+            if size == stat.st_size and mtime == stat.st_mtime:
+                skipped += 1
+                continue
+            if size == stat.st_size:
+                digest = file_digest(source)
+                if digest == sha256:
+                    conn.execute("UPDATE builds SET mtime = ? WHERE stage = ? AND source = ?",
+                                 (stat.st_mtime, stage, source))
+                    skipped += 1
+                    continue
+                to_build.append((source, (stat.st_size, stat.st_mtime, digest)))
+                continue
+        to_build.append((source, (stat.st_size, stat.st_mtime, None)))
+    conn.commit()
+    return to_build, skipped
+
+
+def record_build(conn, stage, source, fingerprint, output, depends=""):
+    """
+    Records that `output` was built from `source` with the given
+    fingerprint, by the current code and from the other inputs `depends`.
+    """
+    size, mtime, digest = fingerprint
+    if digest is None:
+        digest = file_digest(source)
+    conn.execute(
+        "INSERT OR REPLACE INTO builds (stage, source, size, mtime, sha256, output, version, depends) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (stage, source, size, mtime, digest, output, STAGE_VERSIONS.get(stage, 0), depends),
+    )
+
+
+def remove_orphans(conn, stage, sources, output_exists=os.path.exists, remove_output=os.remove):
+    """
+    Deletes the outputs of ledger entries whose source is no longer in
+    `sources` and drops those entries. `output_exists` and `remove_output`
+    replace the file operations for stages whose outputs are not files.
+
+    Returns:
+        list: Paths of the deleted outputs.
+    """
+    sources = set(sources)
+    removed = []
+    for source, output in conn.execute("SELECT source, output FROM builds WHERE stage = ?", (stage,)).fetchall():
+        if source in sources:
+            continue
+        if output_exists(output):
+            remove_output(output)
+            removed.append(output)
+        conn.execute("DELETE FROM builds WHERE stage = ? AND source = ?", (stage, source))
+    conn.commit()
+    return removed
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+County -> (event, location) inverted index over the full, unfiltered
+unified events, and per-site views materialized from it.
+
+The index stores every event's header and each of its locations under the
+location's county, so a view of one or more counties is read straight from
+the index in O(matching records), without touching the event files. Views
+are named county lists in a configuration file (sites.json):
+
+    {"sites": ["臺北市", "臺中市", "臺南市", "新竹市"]}
+
+Adding a site is adding its county to the configuration and materializing
+the view again. A view holds the events with at least one location in its
+counties, restricted to those locations; the max intensity of detailed
+events is recomputed over the kept stations.
+
+    python -m cwa_quake.county_index update [--store unified_events.jsonl | --unified-dir ./unified_earthquake_data]
+    python -m cwa_quake.county_index counties
+    python -m cwa_quake.county_index view sites [--output-dir ./views/sites]
+"""
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import time
+
+from .county_lookup import data_file, normalize_county
+from .hazard_stats import directory_source, store_source
+from .intensity import intensity_codes, max_intensity
+from .unify_earthquake_json import save_unified_data
+
+# One row per indexed event, and one per (county, event, location).
+#   events.header:     the unified event without its affected_locations (JSON)
+#   events.fingerprint: as in hazard_stats.py; a change re-indexes the event
+#   postings.county:   normalized county of the location, "Unknown" if none
+#   postings.location: position of the location in the event
+#   postings.record:   the location (JSON)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    event_id    TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    header      TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    county   TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    location INTEGER NOT NULL,
+    record   TEXT NOT NULL,
+    PRIMARY KEY (county, event_id, location)
+);
+CREATE INDEX IF NOT EXISTS postings_event ON postings (event_id);
+"""
+
+DEFAULT_COUNTY_INDEX = "./county_index.sqlite"
+DEFAULT_VIEWS_CONFIG = data_file("sites.json")
+DEFAULT_VIEWS_DIR = "./views"
+
+UNKNOWN_COUNTY = "Unknown"
+
+
+def open_index(db_path=DEFAULT_COUNTY_INDEX):
+    """Opens (creating if needed) the SQLite county index."""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def load_views(config_path=DEFAULT_VIEWS_CONFIG):
+    """{view name: [county, ...]} from the views configuration."""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def location_county(location):
+    """Index key of a location: its normalized county, UNKNOWN_COUNTY if it has none."""
+    return normalize_county(location.get("county")) or UNKNOWN_COUNTY
+
+
+def _index_event(conn, event_id, fingerprint, event):
+    header = {key: value for key, value in event.items() if key != "affected_locations"}
+    conn.execute("INSERT OR REPLACE INTO events (event_id, fingerprint, header) VALUES (?, ?, ?)",
+                 (event_id, fingerprint, json.dumps(header, ensure_ascii=False)))
+    conn.execute("DELETE FROM postings WHERE event_id = ?", (event_id,))
+    conn.executemany("INSERT INTO postings (county, event_id, location, record) VALUES (?, ?, ?, ?)",
+                     [(location_county(location), event_id, i, json.dumps(location, ensure_ascii=False))
+                      for i, location in enumerate(event.get("affected_locations", []))])
+
+
+def update_index(conn, source):
+    """
+    Brings the index up to date with a source, re-indexing only new and
+    changed events and dropping removed ones.
+
+    Args:
+        conn: Connection from open_index().
+        source: (fingerprints, loader) from hazard_stats.directory_source()
+            or store_source().
+
+    Returns:
+        dict: Counts of new, changed and removed events.
+    """
+    fingerprints, load = source
+    known = dict(conn.execute("SELECT event_id, fingerprint FROM events"))
+    counts = {"new": 0, "changed": 0, "removed": 0}
+    for event_id in known.keys() - fingerprints.keys():
+        conn.execute("DELETE FROM events WHERE event_id = ?", (event_id,))
+        conn.execute("DELETE FROM postings WHERE event_id = ?", (event_id,))
+        counts["removed"] += 1
+    for event_id, fingerprint in fingerprints.items():
+        if known.get(event_id) == fingerprint:
+            continue
+        counts["changed" if event_id in known else "new"] += 1
+        _index_event(conn, event_id, fingerprint, load(event_id))
+    conn.commit()
+    return counts
+
+
+def county_counts(conn):
+    """{county: (events, locations)} over the whole index."""
+    return {county: (events, locations) for county, events, locations in
+            conn.execute("SELECT county, COUNT(DISTINCT event_id), COUNT(*) FROM postings "
+                         "GROUP BY county ORDER BY county")}
+
+
+def view_events(conn, counties):
+    """
+    Yields the unified events with a location in any of `counties`, holding
+    only those locations, in event ID order. Reads nothing but the index.
+    """
+    counties = [normalize_county(county) or county for county in counties]
+    placeholders = ",".join("?" * len(counties))
+    rows = conn.execute(
+        f"SELECT p.event_id, e.header, p.record FROM postings p JOIN events e ON e.event_id = p.event_id "
+        f"WHERE p.county IN ({placeholders}) ORDER BY p.event_id, p.location", counties)
+    event = None
+    for event_id, header, record in rows:
+        if event is None or event["event_id"] != event_id:
+            if event is not None:
+                yield _finish_view_event(event)
+            event = json.loads(header)
+            event["affected_locations"] = []
+        event["affected_locations"].append(json.loads(record))
+    if event is not None:
+        yield _finish_view_event(event)
+
+
+def _finish_view_event(event):
+    # Regional events carry the CWA's event-wide max intensity; detailed
+    # ones are the max over their stations, so over the kept stations here
+    if event.get("source_type") == "detailed_station":
+        strongest = max_intensity(intensity_codes([location.get("intensity")
+                                                   for location in event["affected_locations"]]))
+        event["max_intensity_observed"] = strongest if strongest else None
+    return event
+
+
+def materialize_view(conn, counties, output_dir):
+    """
+    Writes the view of `counties` to {output_dir}/{event_id}.json, in the
+    unified format, and deletes files of events no longer in the view.
+
+    Returns:
+        tuple: (events written, locations written)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = set()
+    locations = 0
+    for event in view_events(conn, counties):
+        save_unified_data(event, output_dir)
+        written.add(f"{event['event_id']}.json")
+        locations += len(event["affected_locations"])
+    for file_path in glob.glob(os.path.join(output_dir, '*.json')):
+        if os.path.basename(file_path) not in written:
+            os.remove(file_path)
+    return len(written), locations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="County inverted index and per-site views of the unified events.")
+    parser.add_argument("--index", default=DEFAULT_COUNTY_INDEX)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    update = subparsers.add_parser("update", help="index new, changed and removed unified events")
+    update.add_argument("--store", help="packed event store to index instead of --unified-dir")
+    update.add_argument("--unified-dir", default="./unified_earthquake_data")
+    subparsers.add_parser("counties", help="events and locations per county")
+    view = subparsers.add_parser("view", help="materialize a configured view")
+    view.add_argument("name", help="view name in the configuration")
+    view.add_argument("--config", default=DEFAULT_VIEWS_CONFIG)
+    view.add_argument("--output-dir", help=f"defaults to {DEFAULT_VIEWS_DIR}/{{name}}")
+    args = parser.parse_args()
+
+    conn = open_index(args.index)
+    start = time.perf_counter()
+    if args.command == "update":
+        source = store_source(args.store) if args.store else directory_source(args.unified_dir)
+        counts = update_index(conn, source)
+        print(f"{counts['new']} new, {counts['changed']} changed, {counts['removed']} removed events "
+              f"indexed in {time.perf_counter() - start:.2f}s")
+    elif args.command == "counties":
+        for county, (events, locations) in county_counts(conn).items():
+            print(f"{county}\t{events} events\t{locations} locations")
+    else:
+        views = load_views(args.config)
+        if args.name not in views:
+            parser.error(f"No view {args.name!r} in {args.config}; configured: {', '.join(views)}")
+        output_dir = args.output_dir or os.path.join(DEFAULT_VIEWS_DIR, args.name)
+        events, locations = materialize_view(conn, views[args.name], output_dir)
+        print(f"View {args.name} ({', '.join(views[args.name])}): {events} events, {locations} locations "
+              f"written to {output_dir} in {time.perf_counter() - start:.2f}s")
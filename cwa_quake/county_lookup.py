@@ -0,0 +1,369 @@
+import argparse
+import io
+import json
+import os
+import struct
+import zipfile
+
+import numpy as np
+
+from . import metrics
+
+# The data files (sites.json, taiwan_counties.geojson) live in the package,
+# in a checkout as well as in an installed copy (package-data of pyproject.toml)
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def data_file(name):
+    """Path of a data file of the package."""
+    return os.path.join(DATA_DIR, name)
+
+
+# The MOI 直轄市、縣市界線 (TWD97 lon/lat) converted to GeoJSON by
+# `python -m cwa_quake.county_lookup --fetch`. It is not bundled; without it
+# lookup_counties() finds no county and stations outside code_to_city stay
+# "Unknown".
+DEFAULT_BOUNDARY_FILE = data_file("taiwan_counties.geojson")
+
+# Shapefile zip of the MOI 直轄市、縣市界線(TWD97經緯度) open data set
+# (https://data.gov.tw/dataset/7442, 政府資料開放授權條款第1版)
+MOI_COUNTY_URL = "https://data.moi.gov.tw/MoiOD/System/DownloadFile.aspx?DATA=72874C55-884D-4CEA-B7D6-F60B0BE85AB0"
+
+# Decimal places kept by the conversion; 4 is about 10 m
+COORD_PRECISION = 4
+
+# Name property of the county features, as in the MOI file
+NAME_PROPERTY = "COUNTYNAME"
+
+# Candidate (point, polygon) pairs tested per vectorized batch
+PAIR_BATCH = 200_000
+
+# The reverse geocoder behind code_to_city sometimes returned a township or a
+# building instead of the county; these map them to the county they are in.
+COUNTY_OF_PLACE = {
+    "花蓮市": "花蓮縣", "宜蘭市": "宜蘭縣", "彰化市": "彰化縣", "員林市": "彰化縣",
+    "斗六市": "雲林縣", "苗栗市": "苗栗縣", "屏東市": "屏東縣", "馬公市": "澎湖縣",
+    "竹北市": "新竹縣", "南投市": "南投縣", "朴子市": "嘉義縣", "臺東市": "臺東縣",
+    "台中港市鎮中心": "臺中市", "高雄市立桃源國民中學": "高雄市",
+    # CHN1 (120.53, 23.19), between the 臺南市 stations SNS and TWL
+    "內市": "臺南市",
+}
+
+COUNTIES = {
+    "臺北市", "新北市", "桃園市", "臺中市", "臺南市", "高雄市", "基隆市", "新竹市", "嘉義市",
+    "新竹縣", "苗栗縣", "彰化縣", "南投縣", "雲林縣", "嘉義縣", "屏東縣", "宜蘭縣", "花蓮縣",
+    "臺東縣", "澎湖縣", "金門縣", "連江縣",
+}
+
+
+def normalize_county(name):
+    """Maps a geocoded place name to its county, or None if it is not a known county."""
+    if not name:
+        return None
+    name = COUNTY_OF_PLACE.get(name, name).replace("台", "臺")
+    return name if name in COUNTIES else None
+
+
+class CountyLookup:
+    """
+    Point-in-polygon county lookup over a GeoJSON FeatureCollection of
+    (Multi)Polygons. Polygon bounding boxes are registered in a lon/lat grid;
+    a lookup only ray-casts the polygons whose box overlaps the point's cell,
+    for all points in NumPy batches.
+    """
+
+    def __init__(self, boundary_file=DEFAULT_BOUNDARY_FILE, cell_deg=0.1, name_property=NAME_PROPERTY):
+        with open(boundary_file, "r", encoding="utf-8") as f:
+            collection = json.load(f)
+
+        self.names = []
+        edges, edge_polygon, boxes, polygon_name = [], [], [], []
+        for feature in collection["features"]:
+            name_id = len(self.names)
+            self.names.append(feature["properties"][name_property])
+            geometry = feature["geometry"]
+            polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+            for rings in polygons:
+                polygon_id = len(boxes)
+                for ring in rings:
+                    ring = np.asarray(ring, dtype=np.float64)[:, :2]
+                    edges.append(np.hstack([ring, np.roll(ring, -1, axis=0)]))
+                    edge_polygon.append(np.full(len(ring), polygon_id))
+                outer = np.asarray(rings[0], dtype=np.float64)
+                boxes.append((*outer[:, :2].min(axis=0), *outer[:, :2].max(axis=0)))
+                polygon_name.append(name_id)
+
+        # Edges (x1, y1, x2, y2) sorted by polygon, with each polygon's slice
+        self.edges = np.vstack(edges)
+        edge_polygon = np.concatenate(edge_polygon)
+        self.edge_starts = np.searchsorted(edge_polygon, np.arange(len(boxes) + 1))
+        self.polygon_name = np.asarray(polygon_name)
+        boxes = np.asarray(boxes)
+
+        # Grid cell -> polygons whose bounding box overlaps it, as CSR arrays
+        self.cell_deg = float(cell_deg)
+        self.lon0, self.lat0 = boxes[:, 0].min(), boxes[:, 1].min()
+        col_lo, row_lo = self._cells(boxes[:, 0], boxes[:, 1])
+        col_hi, row_hi = self._cells(boxes[:, 2], boxes[:, 3])
+        self.ncols, self.nrows = int(col_hi.max()) + 1, int(row_hi.max()) + 1
+        cell_lists = [[] for _ in range(self.ncols * self.nrows)]
+        for polygon_id in range(len(boxes)):
+            for row in range(row_lo[polygon_id], row_hi[polygon_id] + 1):
+                base = row * self.ncols
+                for col in range(col_lo[polygon_id], col_hi[polygon_id] + 1):
+                    cell_lists[base + col].append(polygon_id)
+        self.cell_counts = np.array([len(ids) for ids in cell_lists])
+        self.cell_starts = np.concatenate([[0], np.cumsum(self.cell_counts)])
+        self.cell_polygons = np.array([p for ids in cell_lists for p in ids], dtype=np.int64)
+
+    def _cells(self, lons, lats):
+        cols = np.floor((np.asarray(lons) - self.lon0) / self.cell_deg).astype(np.int64)
+        rows = np.floor((np.asarray(lats) - self.lat0) / self.cell_deg).astype(np.int64)
+        return cols, rows
+
+    def lookup(self, lons, lats):
+        """
+        Finds the county of each point.
+
+        Args:
+            lons, lats: Point coordinates in degrees (scalars or arrays).
+
+        Returns:
+            numpy.ndarray: County name per point (object array), None where
+                           no polygon contains the point.
+        """
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        result = np.full(len(lons), -1, dtype=np.int64)
+
+        cols, rows = self._cells(lons, lats)
+        valid = (cols >= 0) & (cols < self.ncols) & (rows >= 0) & (rows < self.nrows)
+        points = np.nonzero(valid)[0]
+        cells = rows[points] * self.ncols + cols[points]
+
+        # Expand (point, candidate polygon) pairs
+        counts = self.cell_counts[cells]
+        pair_point = np.repeat(points, counts)
+        offsets = np.repeat(self.cell_starts[cells] - (np.cumsum(counts) - counts), counts)
+        pair_polygon = self.cell_polygons[np.arange(int(counts.sum())) + offsets]
+
+        for start in range(0, len(pair_point), PAIR_BATCH):
+            batch_point = pair_point[start:start + PAIR_BATCH]
+            batch_polygon = pair_polygon[start:start + PAIR_BATCH]
+            inside = self._contains(batch_polygon, lons[batch_point], lats[batch_point])
+            hit_point, hit_polygon = batch_point[inside], batch_polygon[inside]
+            unset = result[hit_point] < 0
+            result[hit_point[unset]] = self.polygon_name[hit_polygon[unset]]
+
+        names = np.array(self.names + [None], dtype=object)
+        return names[result]
+
+    def _contains(self, polygon_ids, xs, ys):
+        """Even-odd ray casting of each point against its paired polygon (all rings)."""
+        edge_counts = self.edge_starts[polygon_ids + 1] - self.edge_starts[polygon_ids]
+        pair_ids = np.repeat(np.arange(len(polygon_ids)), edge_counts)
+        offsets = np.repeat(self.edge_starts[polygon_ids] - (np.cumsum(edge_counts) - edge_counts), edge_counts)
+        x1, y1, x2, y2 = self.edges[np.arange(int(edge_counts.sum())) + offsets].T
+        px, py = xs[pair_ids], ys[pair_ids]
+        straddles = (y1 > py) != (y2 > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+        crossings = straddles & (px < x_cross)
+        return np.bincount(pair_ids, weights=crossings, minlength=len(polygon_ids)).astype(np.int64) % 2 == 1
+
+
+def _shapefile_rings(shp):
+    """Yields the rings of each record of a polygon .shp (None for a null shape)."""
+    pos = 100
+    while pos + 8 <= len(shp):
+        length = struct.unpack_from(">i", shp, pos + 4)[0] * 2
+        content = shp[pos + 8:pos + 8 + length]
+        pos += 8 + length
+        shape_type = struct.unpack_from("<i", content)[0]
+        if shape_type == 0:
+            yield None
+            continue
+        if shape_type not in (5, 15, 25):
+            raise ValueError(f"Not a polygon shapefile (shape type {shape_type})")
+        num_parts, num_points = struct.unpack_from("<2i", content, 36)
+        parts = np.frombuffer(content, "<i4", num_parts, 44).tolist() + [num_points]
+        points = np.frombuffer(content, "<f8", 2 * num_points, 44 + 4 * num_parts).reshape(-1, 2)
+        yield [points[start:end] for start, end in zip(parts, parts[1:])]
+
+
+def _dbf_records(dbf, encoding):
+    """Yields the attributes of each record of a .dbf as a dict of stripped strings."""
+    count, header_length, record_length = struct.unpack_from("<I2H", dbf, 4)
+    fields, pos = [], 32
+    while dbf[pos] != 0x0D:
+        fields.append((dbf[pos:pos + 11].split(b"\0")[0].decode("ascii"), dbf[pos + 16]))
+        pos += 32
+    for i in range(count):
+        record = dbf[header_length + i * record_length:header_length + (i + 1) * record_length]
+        values, offset = {}, 1
+        for name, length in fields:
+            values[name] = record[offset:offset + length].decode(encoding, "replace").strip()
+            offset += length
+        yield values
+
+
+def _ring_area(ring):
+    """Signed shoelace area; negative for clockwise rings (shapefile outer rings)."""
+    x, y = ring[:, 0], ring[:, 1]
+    return float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)) / 2
+
+
+def _ring_contains(ring, lon, lat):
+    x1, y1 = ring[:, 0], ring[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    straddles = (y1 > lat) != (y2 > lat)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x1 + (lat - y1) * (x2 - x1) / (y2 - y1)
+    return int(np.count_nonzero(straddles & (lon < x_cross))) % 2 == 1
+
+
+def _simplify_ring(ring, precision):
+    """Rounds a ring and drops the consecutive duplicate vertices that leaves; None if it collapses."""
+    ring = np.round(ring, precision)
+    keep = np.ones(len(ring), dtype=bool)
+    keep[1:] = np.any(ring[1:] != ring[:-1], axis=1)
+    ring = ring[keep]
+    return ring if len(ring) >= 4 else None
+
+
+def shapefile_polygons(rings):
+    """
+    Groups the rings of a shapefile record into GeoJSON polygons: each
+    clockwise ring is an outer ring, and each counter-clockwise ring a hole of
+    the outer ring that contains it. Rings are returned counter-clockwise
+    outside and clockwise inside, as RFC 7946 has them.
+    """
+    outers = [ring for ring in rings if _ring_area(ring) < 0]
+    holes = [ring for ring in rings if _ring_area(ring) >= 0]
+    polygons = [[outer[::-1]] for outer in outers]
+    for hole in holes:
+        owner = next((polygon for polygon, outer in zip(polygons, outers)
+                      if _ring_contains(outer, *hole[0])), None)
+        if owner is None:
+            polygons.append([hole])     # wound the wrong way, but not inside anything
+        else:
+            owner.append(hole[::-1])
+    return polygons
+
+
+def _zip_members(archive):
+    """{lower-case name: bytes} of a zip, with the members of zips nested in it."""
+    members = {}
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        for name in zf.namelist():
+            data = zf.read(name)
+            if name.lower().endswith(".zip"):
+                members.update(_zip_members(data))
+            else:
+                members[name.lower()] = data
+    return members
+
+
+def convert_shapefile_zip(archive, name_property=NAME_PROPERTY, precision=COORD_PRECISION):
+    """
+    Converts a zipped polygon shapefile (the MOI county boundaries) to a
+    GeoJSON FeatureCollection with one feature per record, keeping only the
+    `name_property` attribute. Coordinates are rounded to `precision` decimal
+    places, which drops most of the vertices of the survey-grade original.
+
+    Returns:
+        dict: The FeatureCollection.
+    """
+    members = _zip_members(archive)
+    shp_name = next((name for name in members if name.endswith(".shp")), None)
+    if shp_name is None:
+        raise ValueError("No .shp file in the archive")
+    stem = shp_name[:-4]
+    if stem + ".dbf" not in members:
+        raise ValueError(f"No .dbf file next to {shp_name}")
+    encoding = members.get(stem + ".cpg", b"utf-8").decode("ascii").strip() or "utf-8"
+
+    features = []
+    for rings, attributes in zip(_shapefile_rings(members[shp_name]), _dbf_records(members[stem + ".dbf"], encoding)):
+        if rings is None:
+            continue
+        rings = [ring for ring in (_simplify_ring(ring, precision) for ring in rings) if ring is not None]
+        polygons = shapefile_polygons(rings)
+        if not polygons:
+            continue
+        features.append({
+            "type": "Feature",
+            "properties": {name_property: attributes[name_property]},
+            "geometry": {
+                "type": "MultiPolygon",
+                "coordinates": [[ring.tolist() for ring in polygon] for polygon in polygons],
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def fetch_boundaries(output=DEFAULT_BOUNDARY_FILE, url=MOI_COUNTY_URL, archive_file=None, precision=COORD_PRECISION):
+    """
+    Downloads the MOI county boundary shapefile (or reads an already
+    downloaded `archive_file`) and writes it to `output` as GeoJSON.
+    """
+    if archive_file:
+        with open(archive_file, "rb") as f:
+            archive = f.read()
+    else:
+        import requests
+        metrics.info(f"Downloading {url}")
+        response = requests.get(url, timeout=300)
+        response.raise_for_status()
+        archive = response.content
+
+    collection = convert_shapefile_zip(archive, precision=precision)
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(collection, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, output)
+    names = sorted({feature["properties"][NAME_PROPERTY] for feature in collection["features"]})
+    metrics.info(f"Wrote {len(names)} counties to {output}: {', '.join(names)}")
+
+
+_default_lookup = None
+
+
+def lookup_counties(lons, lats):
+    """
+    CountyLookup.lookup() against DEFAULT_BOUNDARY_FILE, loaded on first use;
+    None for every point if the file is not there.
+    """
+    global _default_lookup
+    if _default_lookup is None:
+        if os.path.exists(DEFAULT_BOUNDARY_FILE):
+            _default_lookup = CountyLookup()
+        else:
+            metrics.warn(f"No county boundary file at {DEFAULT_BOUNDARY_FILE}; counties are not looked up "
+                         f"(run `python -m cwa_quake.county_lookup --fetch` to create it)")
+            _default_lookup = False
+    if not _default_lookup:
+        return np.full(len(np.atleast_1d(lons)), None, dtype=object)
+    return _default_lookup.lookup(lons, lats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline county lookup.")
+    parser.add_argument("--boundary-file", default=DEFAULT_BOUNDARY_FILE)
+    parser.add_argument("--fetch", action="store_true",
+                        help="download the MOI county boundaries and write them to --boundary-file")
+    parser.add_argument("--url", default=MOI_COUNTY_URL, help="shapefile zip to download with --fetch")
+    parser.add_argument("--archive", help="convert this already downloaded shapefile zip instead of downloading")
+    parser.add_argument("--precision", type=int, default=COORD_PRECISION, help="decimal places kept by --fetch")
+    parser.add_argument("point", nargs="*", type=float, help="lon lat [lon lat ...] to look up")
+    args = parser.parse_args()
+
+    if args.fetch or args.archive:
+        fetch_boundaries(args.boundary_file, args.url, args.archive, args.precision)
+    if args.point:
+        if not os.path.exists(args.boundary_file):
+            parser.error(f"no boundary file at {args.boundary_file}; create it with --fetch or --archive")
+        lookup = CountyLookup(args.boundary_file)
+        coords = np.asarray(args.point).reshape(-1, 2)
+        for (lon, lat), county in zip(coords, lookup.lookup(coords[:, 0], coords[:, 1])):
+            print(f"{lon}, {lat}: {county or 'Unknown'}")
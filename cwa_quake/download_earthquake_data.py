@@ -0,0 +1,272 @@
+import argparse
+import csv
+import hashlib
+import os
+import re
+import json
+from functools import partial
+from glob import glob
+
+from . import metrics
+from .download_engine import DownloadJob, download_all, save_response
+from .download_manifest import (conditional_headers, event_output_file, open_manifest, pending_events,
+                               record_result, sync_catalogs)
+from .earthquake_codec import CWA_BASE_URL, earthquake_data_url, encode_row, regional_data_url
+from .raw_archive import DEFAULT_ARCHIVE, RawArchive, page_name
+from .regional_extractor import extract_regional_data
+
+def parse_regional_html(html_content):
+    """
+    Parses the JavaScript variables of a CWA earthquake details page.
+
+    Args:
+        html_content: HTML of the details page
+
+    Returns:
+        dict: Epicenter, magnitude, max intensity and affected locations,
+              or None if the page has no locationList.
+    """
+    earthquake_info, _ = extract_regional_data([html_content.encode('utf-8')])
+    if earthquake_info is None:
+        metrics.warn("Could not find locationList in the HTML content")
+    return earthquake_info
+
+
+def save_regional_data(earthquake_info, output_file):
+    """
+    Writes parsed regional data as JSON.
+
+    Returns:
+        tuple: (bytes written, sha256 hex digest of the JSON)
+    """
+    content = json.dumps(earthquake_info, ensure_ascii=False, indent=2).encode('utf-8')
+    with open(output_file, 'wb') as f:
+        f.write(content)
+    return len(content), hashlib.sha256(content).hexdigest()
+
+
+def save_regional_response(response, job, archive=None):
+    """
+    download_engine handler for details pages. The page is read in chunks
+    only until all variables have been extracted; the bytes left unread are
+    reported to the engine. With a raw archive the page is read whole and
+    archived as {encoded_id}.html.
+    """
+    if response.status_code != 200:
+        return None
+    if archive is not None:
+        content = response.content
+        encoded_id = os.path.basename(job.output_file)[:-len('_regional.json')]
+        archive.put(page_name(encoded_id), content, job.url)
+        earthquake_info, bytes_read = extract_regional_data([content], response.encoding or 'utf-8')
+    else:
+        earthquake_info, bytes_read = extract_regional_data(response.iter_content(chunk_size=8 * 1024),
+                                                            response.encoding or 'utf-8')
+    if earthquake_info is None:
+        metrics.warn(f"Could not find locationList in {job.url}")
+        return None
+    # Count bytes on the wire (compressed) when the transport exposes them
+    if hasattr(response.raw, 'tell'):
+        bytes_read = response.raw.tell()
+    content_length = response.headers.get('Content-Length', '')
+    bytes_skipped = max(0, int(content_length) - bytes_read) if content_length.isdigit() else 0
+    size, checksum = save_regional_data(earthquake_info, job.output_file)
+    return size, checksum, bytes_skipped
+
+
+def save_archived_response(response, job, archive):
+    """download_engine handler for station txt files that also archives the file as downloaded."""
+    saved = save_response(response, job)
+    if saved is not None:
+        with open(job.output_file, 'rb') as f:
+            archive.put(os.path.basename(job.output_file), f.read(), job.url)
+    return saved
+
+
+def download_regional_data(url, output_dir='./earthquake_regional_data', session=None):
+    """
+    Downloads and parses regional earthquake data from CWA website.
+
+    Args:
+        url: URL of the earthquake details page
+        output_dir: Directory for the {encoded_id}_regional.json file
+        session: Optional requests.Session to reuse between calls
+
+    Returns:
+        dict: Parsed earthquake data, or None if skipped or failed
+    """
+    encoded_id = url.split('/')[-1]
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, f"{encoded_id}_regional.json")
+    if os.path.exists(output_file):
+        metrics.detail(f"File already exists: {output_file}. Skipping download.")
+        return None
+
+    try:
+        metrics.detail(f"Downloading regional data from: {url}")
+        if session is None:
+            import requests
+            session = requests
+        response = session.get(url, timeout=30)
+        if response.status_code != 200:
+            metrics.warn(f"Failed to download regional data. Status code: {response.status_code}")
+            return None
+
+        earthquake_info = parse_regional_html(response.text)
+        if earthquake_info is None:
+            return None
+        save_regional_data(earthquake_info, output_file)
+
+        metrics.detail(f"Successfully saved regional data to: {output_file}")
+        metrics.detail(f"Found {len(earthquake_info['locations'])} affected locations")
+
+        return earthquake_info
+
+    except Exception as e:
+        metrics.warn(f"Error processing regional data: {e}")
+        return None
+
+
+def collect_download_jobs(csv_filepath, output_dir, regional_dir='./earthquake_regional_data',
+                          base_url=CWA_BASE_URL):
+    """
+    Reads an earthquake CSV file and returns the DownloadJobs for every event
+    whose output file does not exist yet.
+
+    Numbered earthquakes download the station txt file into `output_dir`;
+    unnumbered (小區域有感) ones download the details page, saved as JSON in
+    `regional_dir`.
+    """
+    jobs = []
+    try:
+        with open(csv_filepath, 'r', encoding='big5') as csvfile:
+            reader = csv.reader(csvfile)
+            header = next(reader)  # Skip header row
+
+            for i, row in enumerate(reader):
+                try:
+                    earthquake_id = row[0].strip()
+                    time_raw = row[1]
+
+                    if not earthquake_id.isdigit():
+                        encoded_string, error = encode_row(row)
+                        if error:
+                            metrics.warn(f"Skipping row {i+2}: {error}")
+                            continue
+                        output_file = os.path.join(regional_dir, f"{encoded_string}_regional.json")
+                        if not os.path.exists(output_file):
+                            jobs.append(DownloadJob(regional_data_url(encoded_string, base_url),
+                                                    output_file, save_regional_response))
+                        continue
+
+                    # Extract year from the time field
+                    # Assuming time_raw format is like: '2024-04-03 12:34:56'
+                    match = re.search(r'(\d{4})-', time_raw)
+                    if not match:
+                        metrics.warn(f"Skipping row {i+2}: Cannot extract year from time '{time_raw}'")
+                        continue
+
+                    year = match.group(1)
+                    output_file = os.path.join(output_dir, f"{year}_{earthquake_id}.txt")
+                    if not os.path.exists(output_file):
+                        jobs.append(DownloadJob(earthquake_data_url(year, earthquake_id, base_url),
+                                                output_file, None))
+
+                except Exception as e:
+                    metrics.warn(f"Error processing row {i+2}: {e}")
+
+    except FileNotFoundError:
+        metrics.warn(f"Error: CSV file not found at {csv_filepath}")
+    except Exception as e:
+        metrics.warn(f"An unexpected error occurred: {e}")
+
+    return jobs
+
+
+def download_earthquake_data(csv_filepath, output_dir, regional_dir='./earthquake_regional_data',
+                             base_url=CWA_BASE_URL, **engine_options):
+    """
+    Reads an earthquake CSV file and downloads related data files from the CWA website.
+
+    URL format: https://scweb.cwa.gov.tw/zh-tw/earthquake/download?file=%2FdrawTrace%2Foutcome%2F{year}%2F{year}{編號}.txt
+
+    Downloads run concurrently through download_engine.download_all();
+    `engine_options` (max_workers, rate, burst, retries) are passed through.
+    """
+    # Create output directories if they don't exist
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(regional_dir, exist_ok=True)
+
+    metrics.info(f"Processing CSV file: {csv_filepath}")
+    metrics.info(f"Downloading files to: {output_dir}")
+    metrics.info("-" * 40)
+
+    jobs = collect_download_jobs(csv_filepath, output_dir, regional_dir, base_url)
+    return download_all(jobs, **engine_options)
+
+
+def manifest_jobs(events, output_dir, regional_dir, base_url=CWA_BASE_URL, revalidate=False, archive=None):
+    """
+    Builds the DownloadJobs of manifest events (see
+    download_manifest.pending_events()); their payloads are stored in the
+    raw archive, if one is given.
+    """
+    regional_handler = partial(save_regional_response, archive=archive) if archive else save_regional_response
+    txt_handler = partial(save_archived_response, archive=archive) if archive else None
+    jobs = []
+    for event in events:
+        output_file = event_output_file(event, output_dir, regional_dir)
+        headers = conditional_headers(event) if revalidate and event["status"] == "done" else None
+        if event["kind"] == "regional":
+            jobs.append(DownloadJob(regional_data_url(event["encoded_id"], base_url), output_file,
+                                    regional_handler, headers, event["encoded_id"]))
+        else:
+            jobs.append(DownloadJob(earthquake_data_url(event["year"], event["earthquake_id"], base_url),
+                                    output_file, txt_handler, headers, event["encoded_id"]))
+    return jobs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download CWA earthquake data for every catalog CSV.")
+    parser.add_argument("--base-url", default=CWA_BASE_URL, help="CWA earthquake site (or a local stub server)")
+    parser.add_argument("--output-dir", default="./earthquake_data")
+    parser.add_argument("--regional-dir", default="./earthquake_regional_data")
+    parser.add_argument("--manifest", default="./download_manifest.sqlite", help="download state database")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="also re-request finished events conditionally to pick up changed data")
+    parser.add_argument("--workers", type=int, default=8, help="maximum concurrent requests")
+    parser.add_argument("--rate", type=float, default=2.0, help="requests per second per host")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE, help="raw archive to store the payloads in")
+    parser.add_argument("--no-archive", action="store_true", help="do not archive the payloads")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    os.makedirs(args.regional_dir, exist_ok=True)
+
+    # Merge all catalog CSVs into the manifest once; events listed in several
+    # CSVs share one entry and are only downloaded once
+    conn = open_manifest(args.manifest)
+    added = sync_catalogs(conn, sorted(glob('./*.csv')), args.output_dir, args.regional_dir)
+    events = pending_events(conn, revalidate=args.revalidate)
+    metrics.info(f"Manifest: {added} new events, {len(events)} to request")
+
+    outcomes = {}
+
+    def checkpoint(job, result):
+        outcome = record_result(conn, job.key, result)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    archive = None if args.no_archive else RawArchive(args.archive)
+    jobs = manifest_jobs(events, args.output_dir, args.regional_dir, args.base_url, args.revalidate, archive)
+    with metrics.stage("download"):
+        download_all(jobs, max_workers=args.workers, rate=args.rate, retries=args.retries, on_result=checkpoint)
+    conn.close()
+    if archive is not None:
+        archive.close()
+
+    metrics.info(f"Outcomes: {outcomes}")
+    metrics.info("Download process completed.")
+    metrics.finish()
@@ -0,0 +1,260 @@
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+from . import metrics
+
+# A unit of work for the engine.
+#   url:         URL to fetch
+#   output_file: where the result ends up
+#   handler:     callable(response, job) -> (bytes written, sha256 hex digest)
+#                of the saved content, or None to treat the job as failed;
+#                a third element may report response bytes left unread by
+#                an early exit. None selects save_response()
+#   headers:     extra request headers, e.g. If-None-Match for revalidation
+#   key:         caller's identifier for the job, passed back in results
+DownloadJob = namedtuple("DownloadJob", ["url", "output_file", "handler", "headers", "key"],
+                         defaults=(None, None))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `rate` tokens are added per second, up to
+    `capacity`; acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Keeps one TokenBucket per host so each server gets its own budget."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        if not self.rate:
+            return
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
+
+
+def make_session(pool_size):
+    """Creates a requests.Session whose connection pool fits `pool_size` workers."""
+    # Imported on first use, so importing this module (e.g. for DownloadJob)
+    # does not pay for requests
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def fetch(session, limiter, url, retries=3, timeout=30, **kwargs):
+    """
+    GETs `url` through the shared session, honouring the host rate limit and
+    retrying connection errors and retryable status codes with jittered backoff.
+
+    Returns:
+        requests.Response: The last response received (may be a non-200).
+
+    Raises:
+        requests.RequestException: If every attempt failed without a response.
+    """
+    import requests
+
+    for attempt in range(retries + 1):
+        limiter.acquire(url)
+        if attempt:
+            metrics.incr("http.retries")
+        metrics.incr("http.requests")
+        start = time.perf_counter()
+        try:
+            response = session.get(url, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            metrics.incr("http.connection_errors")
+            if attempt == retries:
+                raise
+        else:
+            metrics.observe("http.latency_seconds", time.perf_counter() - start)
+            metrics.incr(f"http.status.{response.status_code}")
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            response.close()
+            if retry_after.isdigit():
+                time.sleep(int(retry_after))
+                continue
+        time.sleep(backoff_delay(attempt))
+
+
+def save_response(response, job):
+    """
+    Default handler: streams the response body to job.output_file. The body is
+    written to a .part file first so an interrupted run never leaves a
+    truncated file that later runs would mistake for a finished download.
+    """
+    if response.status_code != 200:
+        return None
+    size = 0
+    digest = hashlib.sha256()
+    part_file = job.output_file + ".part"
+    with open(part_file, "wb") as f:
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            f.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+    os.replace(part_file, job.output_file)
+    return size, digest.hexdigest()
+
+
+def _run_job(session, limiter, job, retries):
+    """
+    Downloads one job.
+
+    Returns:
+        dict: status (HTTP status or None), size and checksum of the saved
+              content (None unless saved), etag, last_modified, elapsed_s.
+    """
+    start = time.monotonic()
+    result = {"status": None, "size": None, "checksum": None, "etag": None, "last_modified": None,
+              "bytes_skipped": 0}
+    try:
+        response = fetch(session, limiter, job.url, retries=retries, stream=True, headers=job.headers)
+        with response:
+            result["status"] = response.status_code
+            result["etag"] = response.headers.get("ETag")
+            result["last_modified"] = response.headers.get("Last-Modified")
+            if response.status_code != 304:
+                saved = (job.handler or save_response)(response, job)
+                if saved is not None:
+                    result["size"], result["checksum"] = saved[:2]
+                    if len(saved) > 2:
+                        result["bytes_skipped"] = saved[2]
+    except Exception as e:
+        metrics.warn(f"Failed to download {job.url}: {e}")
+    else:
+        if result["size"] is None and result["status"] != 304:
+            metrics.warn(f"Failed to download {job.url}. Status code: {result['status']}")
+    result["elapsed_s"] = time.monotonic() - start
+    metrics.observe("download.job_seconds", result["elapsed_s"])
+    if result["status"] == 304:
+        metrics.incr("download.not_modified")
+    elif result["size"] is None:
+        metrics.incr("download.failed")
+    else:
+        metrics.incr("download.files")
+        metrics.incr("download.bytes", result["size"])
+        metrics.incr("download.bytes_skipped", result["bytes_skipped"])
+    return result
+
+
+def download_all(jobs, max_workers=8, rate=2.0, burst=2, retries=3, session=None, on_result=None):
+    """
+    Runs download jobs concurrently over one pooled HTTP session.
+
+    Args:
+        jobs: Iterable of DownloadJob.
+        max_workers: Maximum number of requests in flight.
+        rate: Requests per second allowed per host (0 disables the limit).
+        burst: Token bucket capacity per host.
+        retries: Retries per job for connection errors and 429/5xx responses.
+        session: Optional requests.Session to reuse.
+        on_result: Optional callable(job, result) run on the calling thread
+            as each job finishes, e.g. to checkpoint progress.
+
+    Returns:
+        dict: Throughput summary for the run (see format_summary()).
+    """
+    jobs = list(jobs)
+    own_session = session is None
+    if own_session:
+        session = make_session(max_workers)
+    limiter = HostRateLimiter(rate, burst)
+
+    summary = {"jobs": len(jobs), "succeeded": 0, "not_modified": 0, "failed": 0, "bytes": 0,
+               "early_exits": 0, "bytes_skipped": 0, "latency_s": []}
+    start = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_run_job, session, limiter, job, retries): job for job in jobs}
+            for future in as_completed(futures):
+                result = future.result()
+                summary["latency_s"].append(result["elapsed_s"])
+                if result["status"] == 304:
+                    summary["not_modified"] += 1
+                elif result["size"] is None:
+                    summary["failed"] += 1
+                else:
+                    summary["succeeded"] += 1
+                    summary["bytes"] += result["size"]
+                    if result["bytes_skipped"]:
+                        summary["early_exits"] += 1
+                        summary["bytes_skipped"] += result["bytes_skipped"]
+                if on_result:
+                    on_result(futures[future], result)
+    finally:
+        if own_session:
+            session.close()
+
+    summary["elapsed_s"] = time.monotonic() - start
+    metrics.info(format_summary(summary))
+    return summary
+
+
+def format_summary(summary):
+    """Formats a download_all() summary as a one-line throughput report."""
+    elapsed = summary["elapsed_s"] or 1e-9
+    latencies = sorted(summary["latency_s"])
+    p50 = latencies[len(latencies) // 2] if latencies else 0.0
+    line = (
+        f"Downloaded {summary['succeeded']}/{summary['jobs']} files "
+        f"({summary['not_modified']} not modified, {summary['failed']} failed), {summary['bytes'] / 1e6:.2f} MB "
+        f"in {elapsed:.1f}s: {summary['jobs'] / elapsed:.2f} files/s, "
+        f"{summary['bytes'] / 1e6 / elapsed:.2f} MB/s, p50 latency {p50 * 1000:.0f} ms"
+    )
+    if summary["early_exits"]:
+        line += (
+            f"; early exit skipped {summary['bytes_skipped'] / 1e6:.2f} MB "
+            f"({summary['bytes_skipped'] / summary['early_exits'] / 1e3:.1f} kB/page)"
+        )
+    return line
@@ -0,0 +1,206 @@
+import csv
+import os
+import sqlite3
+import time
+
+from . import metrics
+from .earthquake_codec import catalog_event
+
+# Download state of every catalog event, keyed by encoded ID.
+#   status: new     - listed in a catalog, not downloaded yet
+#           done    - downloaded; size/checksum describe the saved file
+#           failed  - last attempt failed, retried on the next run
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    encoded_id    TEXT PRIMARY KEY,
+    kind          TEXT NOT NULL,
+    year          TEXT NOT NULL,
+    earthquake_id TEXT,
+    origin_time   TEXT,
+    sources       TEXT NOT NULL,
+    status        TEXT NOT NULL DEFAULT 'new',
+    size          INTEGER,
+    checksum      TEXT,
+    etag          TEXT,
+    last_modified TEXT,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    updated_at    REAL
+);
+CREATE INDEX IF NOT EXISTS events_status ON events (status);
+CREATE TABLE IF NOT EXISTS catalogs (
+    path  TEXT PRIMARY KEY,
+    size  INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+"""
+
+
+def open_manifest(db_path):
+    """Opens (creating if needed) the SQLite download manifest."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def event_output_file(event, output_dir, regional_dir):
+    """Path the downloaded data of a manifest event is saved to."""
+    if event["kind"] == "regional":
+        return os.path.join(regional_dir, f"{event['encoded_id']}_regional.json")
+    return os.path.join(output_dir, f"{event['year']}_{event['earthquake_id']}.txt")
+
+
+def read_catalog(csv_filepath):
+    """
+    Reads one catalog CSV.
+
+    Returns:
+        list: CatalogEvents of the valid rows, in file order.
+    """
+    with open(csv_filepath, 'r', encoding='big5') as csvfile:
+        return parse_catalog(csvfile, csv_filepath)
+
+
+def parse_catalog(lines, name):
+    """CatalogEvents of the valid rows of catalog CSV text lines; `name` labels warnings."""
+    events = []
+    reader = csv.reader(lines)
+    next(reader, None)  # Skip header row
+    for i, row in enumerate(reader):
+        event, error = catalog_event(row)
+        if error:
+            metrics.warn(f"Skipping {name} row {i+2}: {error}")
+            continue
+        events.append(event)
+    return events
+
+
+def sync_catalogs(conn, csv_paths, output_dir, regional_dir):
+    """
+    Merges every catalog CSV into the manifest, deduplicating by encoded ID.
+
+    CSVs whose size and mtime are unchanged since the last sync are not
+    re-read. Events seen for the first time whose output file already exists
+    (downloaded before the manifest existed) are adopted as done, so the
+    data directories only have to be checked once.
+
+    Returns:
+        int: Number of events added to the manifest.
+    """
+    added = 0
+    for csv_path in csv_paths:
+        stat = os.stat(csv_path)
+        known = conn.execute("SELECT size, mtime FROM catalogs WHERE path = ?", (csv_path,)).fetchone()
+        if known and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime:
+            continue
+
+        added += len(add_events(conn, read_catalog(csv_path), os.path.basename(csv_path), output_dir, regional_dir))
+        conn.execute("INSERT OR REPLACE INTO catalogs (path, size, mtime) VALUES (?, ?, ?)",
+                     (csv_path, stat.st_size, stat.st_mtime))
+        conn.commit()
+    return added
+
+
+def add_events(conn, events, source, output_dir, regional_dir):
+    """
+    Adds CatalogEvents listed by catalog `source` to the manifest (see
+    sync_catalogs()). Does not commit.
+
+    Returns:
+        list: The CatalogEvents that were new to the manifest.
+    """
+    added = []
+    for event in events:
+        row = conn.execute("SELECT sources FROM events WHERE encoded_id = ?", (event.encoded_id,)).fetchone()
+        if row:
+            sources = row["sources"].split(",")
+            if source not in sources:
+                conn.execute("UPDATE events SET sources = ? WHERE encoded_id = ?",
+                             (",".join(sources + [source]), event.encoded_id))
+            continue
+
+        conn.execute(
+            "INSERT INTO events (encoded_id, kind, year, earthquake_id, origin_time, sources) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (event.encoded_id, event.kind, event.year, event.earthquake_id, event.origin_time, source),
+        )
+        added.append(event)
+        output_file = event_output_file(event._asdict(), output_dir, regional_dir)
+        if os.path.exists(output_file):
+            conn.execute("UPDATE events SET status = 'done', size = ?, updated_at = ? WHERE encoded_id = ?",
+                         (os.path.getsize(output_file), time.time(), event.encoded_id))
+    return added
+
+
+def pending_events(conn, revalidate=False):
+    """
+    Returns the manifest events that need a request: new and failed events,
+    plus finished ones when `revalidate` is set (to be fetched conditionally
+    with their stored ETag/Last-Modified).
+    """
+    statuses = ("new", "failed", "done") if revalidate else ("new", "failed")
+    placeholders = ",".join("?" * len(statuses))
+    return conn.execute(
+        f"SELECT * FROM events WHERE status IN ({placeholders}) ORDER BY origin_time", statuses
+    ).fetchall()
+
+
+def conditional_headers(event):
+    """Request headers that let the server answer 304 for an unchanged event."""
+    headers = {}
+    if event["etag"]:
+        headers["If-None-Match"] = event["etag"]
+    if event["last_modified"]:
+        headers["If-Modified-Since"] = event["last_modified"]
+    return headers
+
+
+def record_result(conn, encoded_id, result):
+    """
+    Stores the outcome of one download (a download_engine result dict) and
+    commits, so an interrupted run resumes where it stopped.
+
+    Returns:
+        str: "new" or "changed" for saved content, "unchanged" for a 304 or
+             identical checksum, "failed" otherwise.
+    """
+    previous = conn.execute("SELECT status, checksum FROM events WHERE encoded_id = ?", (encoded_id,)).fetchone()
+    now = time.time()
+    if result["status"] == 304:
+        conn.execute("UPDATE events SET updated_at = ? WHERE encoded_id = ?", (now, encoded_id))
+        outcome = "unchanged"
+    elif result["size"] is None:
+        _count_failure(conn, encoded_id, now)
+        outcome = "failed"
+    else:
+        conn.execute(
+            "UPDATE events SET status = 'done', size = ?, checksum = ?, etag = ?, last_modified = ?, "
+            "attempts = attempts + 1, updated_at = ? WHERE encoded_id = ?",
+            (result["size"], result["checksum"], result["etag"], result["last_modified"], now, encoded_id),
+        )
+        if previous is None or previous["status"] != "done":
+            outcome = "new"
+        elif previous["checksum"] and previous["checksum"] != result["checksum"]:
+            outcome = "changed"
+        else:
+            outcome = "unchanged"
+    conn.commit()
+    return outcome
+
+
+def record_failure(conn, encoded_id):
+    """
+    Counts a failed attempt at an event whose download succeeded but which
+    could not be processed (see watch.py), so it is retried like a failed
+    download, and commits.
+    """
+    _count_failure(conn, encoded_id, time.time())
+    conn.commit()
+
+
+def _count_failure(conn, encoded_id, now):
+    conn.execute(
+        "UPDATE events SET status = CASE WHEN status = 'done' THEN 'done' ELSE 'failed' END, "
+        "attempts = attempts + 1, updated_at = ? WHERE encoded_id = ?",
+        (now, encoded_id),
+    )
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Lazy access to the unified events through a small header index.
+
+EarthquakeCatalog keeps one header per event - ID, time, magnitude,
+epicenter, depth, max intensity, source type and affected counties - in
+{unified_dir}.headers.jsonl (or {store}.headers.jsonl for a packed store),
+refreshed from stat() fingerprints so only new and changed files are read.
+Filters are evaluated on the headers alone; full events, with their
+affected_locations, are read only for the matches, one at a time:
+
+    catalog = EarthquakeCatalog("./unified_earthquake_data")
+    for event in catalog.events(start="2024-01-01", end="2025-01-01", min_magnitude=5, county="新竹市"):
+        ...
+
+    python -m cwa_quake.earthquake_catalog --start 2024-01-01 --end 2025-01-01 --min-magnitude 5 --county 新竹市 [--full]
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from . import metrics
+from .county_lookup import normalize_county
+from .event_store import normalize_timestamp
+from .hazard_stats import directory_source, store_source
+from .intensity import normalize_intensity
+from .station_columns import SOURCE_TYPES
+
+
+# Version of summarize(); index entries written by another version are read again
+HEADER_VERSION = 2
+
+
+def header_index_path(source_path):
+    """Header index file of a unified directory or packed store."""
+    return source_path.rstrip("/" + os.sep) + ".headers.jsonl"
+
+
+def summarize(event):
+    """The header of a unified event: the fields filters run on and lists return."""
+    # Normalized like county_index.location_county(), so select() finds every spelling
+    counties = {normalize_county(location.get("county")) for location in event.get("affected_locations", [])}
+    counties = sorted(counties - {None})
+    try:
+        magnitude = float(event.get("magnitude"))
+    except (TypeError, ValueError):
+        magnitude = None
+    return {
+        "event_id": event.get("event_id"),
+        "timestamp": normalize_timestamp(event.get("timestamp")) or None,
+        "magnitude": magnitude,
+        "depth_km": event.get("depth_km"),
+        "epicenter_latitude": event.get("epicenter_latitude"),
+        "epicenter_longitude": event.get("epicenter_longitude"),
+        "max_intensity": normalize_intensity(event.get("max_intensity_observed")),
+        "source_type": event.get("source_type"),
+        "counties": counties,
+    }
+
+
+def _time(value):
+    """np.datetime64 of an ISO date / date-time string (or datetime64), None passes through."""
+    if value is None or isinstance(value, np.datetime64):
+        return value
+    return np.datetime64(normalize_timestamp(value), "s")
+
+
+class HeaderArrays:
+    """
+    Headers in time order as NumPy arrays, plus one boolean column per
+    county. Built whole and swapped in by reference, so a reader never sees
+    a half-updated index.
+    """
+
+    def __init__(self, headers):
+        ordered = sorted(headers, key=lambda h: (h["timestamp"] or "￿", h["event_id"]))
+        self.summaries = ordered
+        self.timestamps = np.array([h["timestamp"] or "NaT" for h in ordered], dtype="datetime64[s]")
+        self.magnitudes = np.array([np.nan if h["magnitude"] is None else h["magnitude"] for h in ordered],
+                                   dtype=np.float64)
+        self.source_types = np.array([h["source_type"] or "" for h in ordered], dtype=object)
+        # Events without a timestamp sort last and are only found by ID
+        self.dated = int(np.count_nonzero(~np.isnat(self.timestamps)))
+        self.counties = {}
+        for i, header in enumerate(ordered):
+            for county in header["counties"]:
+                self.counties.setdefault(county, np.zeros(len(ordered), dtype=bool))[i] = True
+
+    def select(self, start=None, end=None, min_magnitude=None, county=None, max_magnitude=None,
+               source_type=None):
+        """
+        Positions (oldest first) of the events matching the filters: start
+        inclusive, end exclusive, and any of `county` (normalized) if it is
+        a list.
+        """
+        lo = int(np.searchsorted(self.timestamps[:self.dated], start)) if start is not None else 0
+        hi = int(np.searchsorted(self.timestamps[:self.dated], end)) if end is not None else self.dated
+        keep = np.ones(max(hi - lo, 0), dtype=bool)
+        if min_magnitude is not None:
+            keep &= self.magnitudes[lo:hi] >= min_magnitude
+        if max_magnitude is not None:
+            keep &= self.magnitudes[lo:hi] <= max_magnitude
+        if source_type is not None:
+            keep &= self.source_types[lo:hi] == source_type
+        if county is not None:
+            counties = [county] if isinstance(county, str) else county
+            counties = [normalize_county(c) or c for c in counties]
+            columns = [self.counties[c][lo:hi] for c in counties if c in self.counties]
+            keep &= np.logical_or.reduce(columns) if columns else False
+        return np.nonzero(keep)[0] + lo
+
+
+class EarthquakeCatalog:
+    """
+    Unified events of a directory or packed store behind a persistent
+    header index. Headers are in memory; event bodies are read on access.
+
+    Args:
+        unified_dir: Directory of {event_id}.json files.
+        store: Packed event store (see event_store.py) to read instead.
+        index_path: Header index file; defaults to header_index_path() of
+            the source. Not written if it cannot be.
+        refresh: Bring the index up to date with the source right away.
+    """
+
+    def __init__(self, unified_dir="./unified_earthquake_data", store=None, index_path=None, refresh=True):
+        self.unified_dir = unified_dir
+        self.store = store
+        self.index_path = index_path or header_index_path(store or unified_dir)
+        self.fingerprints = {}
+        self.headers = {}
+        self.arrays = HeaderArrays([])
+        self._load = None
+        self.stats = {"indexed": 0, "loaded": 0}
+        self._read_index()
+        if refresh:
+            self.refresh()
+
+    def _read_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # torn write at the end
+                if entry.get("version") != HEADER_VERSION:
+                    continue
+                self.fingerprints[entry["id"]] = entry["fingerprint"]
+                self.headers[entry["id"]] = entry["header"]
+        self.arrays = HeaderArrays(self.headers.values())
+
+    def _write_index(self):
+        part_file = self.index_path + ".part"
+        try:
+            with open(part_file, "w", encoding="utf-8") as f:
+                for event_id, header in self.headers.items():
+                    f.write(json.dumps({"id": event_id, "fingerprint": self.fingerprints[event_id],
+                                        "version": HEADER_VERSION, "header": header}, ensure_ascii=False) + "\n")
+            os.replace(part_file, self.index_path)
+        except OSError as e:
+            metrics.warn(f"Could not write header index {self.index_path}: {e}")
+
+    def refresh(self):
+        """
+        Re-reads the headers of new and changed events and drops removed
+        ones, then rewrites the index file if anything changed.
+
+        Returns:
+            set: IDs of the events that changed or were removed.
+        """
+        fingerprints, load = store_source(self.store) if self.store else directory_source(self.unified_dir)
+        changed = {event_id for event_id, fingerprint in fingerprints.items()
+                   if self.fingerprints.get(event_id) != fingerprint}
+        removed = self.fingerprints.keys() - fingerprints.keys()
+        headers = {event_id: header for event_id, header in self.headers.items() if event_id in fingerprints}
+        for event_id in changed:
+            try:
+                headers[event_id] = summarize(load(event_id))
+            except (OSError, ValueError) as e:
+                # Possibly caught mid-write; picked up on the next refresh
+                metrics.warn(f"Could not read {event_id}: {e}")
+                fingerprints.pop(event_id)
+                headers.pop(event_id, None)
+        self._load = load
+        self.fingerprints = fingerprints
+        self.headers = headers
+        self.stats["indexed"] += len(changed)
+        if changed or removed:
+            self.arrays = HeaderArrays(headers.values())
+            self._write_index()
+        return changed | removed
+
+    def __len__(self):
+        return len(self.headers)
+
+    def __contains__(self, event_id):
+        return event_id in self.headers
+
+    def get(self, event_id):
+        """The full unified event; raises KeyError if unknown."""
+        if event_id not in self.headers:
+            raise KeyError(event_id)
+        if self._load is None:
+            self._load = (store_source(self.store) if self.store else directory_source(self.unified_dir))[1]
+        self.stats["loaded"] += 1
+        return self._load(event_id)
+
+    def select(self, start=None, end=None, min_magnitude=None, max_magnitude=None, county=None,
+               source_type=None):
+        """
+        Headers of the matching events, oldest first, from the index alone.
+
+        Args:
+            start, end: ISO dates or date-times; start inclusive, end exclusive.
+            min_magnitude, max_magnitude: Inclusive magnitude bounds.
+            county: A county name or a list of them (any matches).
+            source_type: One of station_columns.SOURCE_TYPES.
+        """
+        arrays = self.arrays
+        positions = arrays.select(_time(start), _time(end), min_magnitude, county, max_magnitude, source_type)
+        return [arrays.summaries[i] for i in positions]
+
+    def events(self, **filters):
+        """
+        Yields the full matching events (see select() for the filters),
+        reading one file at a time so memory stays bounded.
+        """
+        for header in self.select(**filters):
+            yield self.get(header["event_id"])
+
+    def __iter__(self):
+        return self.events()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the unified events through the header index.")
+    parser.add_argument("--store", help="packed event store to read instead of --unified-dir")
+    parser.add_argument("--unified-dir", default="./unified_earthquake_data")
+    parser.add_argument("--index", help="header index file (default: next to the source)")
+    parser.add_argument("--start", help="ISO date or date-time, inclusive")
+    parser.add_argument("--end", help="ISO date or date-time, exclusive")
+    parser.add_argument("--min-magnitude", type=float)
+    parser.add_argument("--max-magnitude", type=float)
+    parser.add_argument("--county", nargs="*")
+    parser.add_argument("--source-type", choices=SOURCE_TYPES)
+    parser.add_argument("--full", action="store_true", help="print the full events as JSON lines")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+
+    start = time.perf_counter()
+    catalog = EarthquakeCatalog(args.unified_dir, args.store, args.index)
+    filters = {"start": args.start, "end": args.end, "min_magnitude": args.min_magnitude,
+               "max_magnitude": args.max_magnitude, "county": args.county, "source_type": args.source_type}
+    if args.full:
+        for event in catalog.events(**filters):
+            print(json.dumps(event, ensure_ascii=False))
+    else:
+        headers = catalog.select(**filters)
+        for header in headers:
+            print(f"{header['event_id']}\t{header['timestamp']}\tM{header['magnitude']}\t"
+                  f"{header['max_intensity']}\t{','.join(header['counties'])}")
+        metrics.info(f"{len(headers)} of {len(catalog)} events match; {catalog.stats['indexed']} headers "
+                     f"re-indexed, {catalog.stats['loaded']} events read in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+One entry point for the scripts of this repository:
+
+    earthquake download --workers 8 --rate 2
+    earthquake pipeline --incremental
+    earthquake query --start 2024-01-01 --min-magnitude 5 --county 新竹市
+
+Each subcommand runs the script's own command line, so `earthquake parse
+--help` lists the options of parse_earthquake_data.py. A script's module is
+imported only when its subcommand runs; `earthquake --help` imports none of
+them (and none of numpy or requests).
+
+Installed with `pip install .` (or `pip install -e .`) as the `earthquake`
+console script, or run from a checkout as `python -m cwa_quake`.
+"""
+import argparse
+import runpy
+import sys
+
+# Subcommand -> (module, summary)
+COMMANDS = {
+    "download": ("download_earthquake_data", "download the events of the catalog CSVs"),
+    "watch": ("watch", "poll the catalog and ingest new events as they appear"),
+    "parse": ("parse_earthquake_data", "parse the station txt files into JSON"),
+    "tag": ("add_city_to_stations", "add counties to the parsed stations"),
+    "unify": ("unify_earthquake_json", "unify detailed-station and regional JSON"),
+    "pipeline": ("pipeline", "parse, tag and unify in one pass"),
+    "query": ("earthquake_catalog", "filter the unified events through the header index"),
+    "serve": ("query_service", "HTTP query service over the unified events"),
+    "archive": ("raw_archive", "compressed archive of the raw downloads"),
+    "store": ("event_store", "packed unified event store"),
+    "registry": ("station_registry", "persistent station registry"),
+    "views": ("county_index", "county index and per-site views"),
+    "filter": ("filter_counties", "regional data of a configured view"),
+    "join": ("event_join", "join detailed-station and regional events"),
+    "stats": ("hazard_stats", "hazard statistics per county and station"),
+    "columns": ("station_columns", "columnar station records"),
+    "motion": ("site_motion", "attenuation fit and regional estimates"),
+    "near": ("spatial_index", "events and stations near a point"),
+    "grid": ("intensity_grid", "interpolated intensity, PGA and PGV rasters per event"),
+    "stations": ("extract_station_coords", "export station coordinates"),
+    "encode": ("encode_earthquake_data", "encoded IDs of catalog CSV rows"),
+}
+
+
+def build_parser():
+    width = max(map(len, COMMANDS))
+    epilog = "commands:\n" + "\n".join(f"  {name:<{width}}  {summary}" for name, (_, summary) in COMMANDS.items())
+    parser = argparse.ArgumentParser(prog="earthquake", description="CWA earthquake data tools.", epilog=epilog,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=COMMANDS, metavar="command", help="see below")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="options of the command (see command --help)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    module, _ = COMMANDS[args.command]
+    sys.argv = [f"earthquake {args.command}"] + args.args
+    runpy.run_module(f"{__package__}.{module}", run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
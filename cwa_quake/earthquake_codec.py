@@ -0,0 +1,84 @@
+from collections import namedtuple
+
+CWA_BASE_URL = "https://scweb.cwa.gov.tw/zh-tw/earthquake"
+
+# One earthquake of a catalog CSV (地震活動彙整).
+#   kind: "detailed" for numbered (顯著有感) events that have a station txt
+#         file, "regional" for unnumbered (小區域有感) events that only have a
+#         details page
+CatalogEvent = namedtuple("CatalogEvent", ["encoded_id", "kind", "year", "earthquake_id", "origin_time"])
+
+
+def encode_row(row):
+    """
+    Encodes a single earthquake data row based on specific columns.
+
+    Encoding logic: {cleaned_地震時間}{cleaned_規模}{cleaned_編號}
+    - cleaned_地震時間: '地震時間' with '-', ' ', ':' removed.
+    - cleaned_規模: '規模' with '.' removed.
+    - cleaned_編號: '編號' with leading/trailing whitespace removed, omitted
+      when it is not numeric (小區域有感地震).
+
+    Args:
+        row: A list containing earthquake data columns.
+
+    Returns:
+        tuple: (encoded_string, error_message)
+            - encoded_string: The encoded string if successful, None otherwise.
+            - error_message: Error message if encoding fails, None otherwise.
+    """
+    # Ensure row has enough columns
+    if len(row) < 8:
+        return None, f"Insufficient columns ({len(row)})"
+
+    earthquake_id_raw = row[0]
+    time_raw = row[1]
+    magnitude_raw = row[4]
+
+    # Clean data
+    earthquake_id = earthquake_id_raw.strip()
+
+    cleaned_time = time_raw.replace('-', '').replace(' ', '').replace(':', '')
+    cleaned_magnitude = magnitude_raw.replace('.', '')
+    if len(cleaned_magnitude) == 1:
+        cleaned_magnitude = cleaned_magnitude + '0'
+
+    # Validate cleaned time and magnitude look reasonable (simple check)
+    if not cleaned_time.isdigit() or len(cleaned_time) != 14:
+        return None, f"Invalid time format '{time_raw}'"
+    if not cleaned_magnitude.isdigit():
+        return None, f"Invalid magnitude format '{magnitude_raw}'"
+
+    # Concatenate according to the specified logic
+    if not earthquake_id.isdigit():
+        encoded_string = f"{cleaned_time}{cleaned_magnitude}"
+    else:
+        encoded_string = f"{cleaned_time}{cleaned_magnitude}{earthquake_id}"
+    return encoded_string, None
+
+
+def catalog_event(row):
+    """
+    Decodes a catalog CSV row into a CatalogEvent.
+
+    Returns:
+        tuple: (CatalogEvent, error_message), as encode_row().
+    """
+    encoded_string, error = encode_row(row)
+    if error:
+        return None, error
+    earthquake_id = row[0].strip()
+    year = encoded_string[:4]
+    if earthquake_id.isdigit():
+        return CatalogEvent(encoded_string, "detailed", year, earthquake_id, row[1].strip()), None
+    return CatalogEvent(encoded_string, "regional", year, None, row[1].strip()), None
+
+
+def earthquake_data_url(year, earthquake_id, base_url=CWA_BASE_URL):
+    """URL of the station txt file for a numbered (顯著有感) earthquake."""
+    return f"{base_url}/download?file=%2FdrawTrace%2Foutcome%2F{year}%2F{year}{earthquake_id}.txt"
+
+
+def regional_data_url(encoded_id, base_url=CWA_BASE_URL):
+    """URL of the details page for a small-felt-area (小區域有感) earthquake."""
+    return f"{base_url}/details/{encoded_id}"
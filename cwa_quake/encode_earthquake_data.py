@@ -0,0 +1,55 @@
+import argparse
+import csv
+import sys
+
+from .earthquake_codec import encode_row
+
+def encode_earthquake_data(filepath):
+    """
+    Reads an earthquake CSV file, encodes each valid row based on specific columns,
+    and prints the encoded string.
+
+    Encoding logic: {cleaned_地震時間}{cleaned_規模}{cleaned_編號}
+    - cleaned_地震時間: '地震時間' with '-', ' ', ':' removed.
+    - cleaned_規模: '規模' with '.' removed.
+    - cleaned_編號: '編號' with leading/trailing whitespace removed.
+
+    Rows are skipped if '編號' is not numeric after cleaning.
+    """
+    try:
+        with open(filepath, 'r', encoding='big5') as csvfile:
+            reader = csv.reader(csvfile)
+            header = next(reader) # Skip header row
+
+            print(f"Processing file: {filepath}")
+            print(f"Header: {','.join(header)}")
+            print("-" * 20)
+
+            for i, row in enumerate(reader):
+                try:
+                    if not row[0].strip().isdigit():
+                        print(f"Skipping row {i+2}: Non-numeric ID '{row[0].strip()}'", file=sys.stderr)
+                        continue
+
+                    encoded_string, error = encode_row(row)
+                    if error:
+                        print(f"Skipping row {i+2}: {error}", file=sys.stderr)
+                        continue
+                    
+                    print(encoded_string)
+
+                except Exception as e:
+                    print(f"Error processing row {i+2}: {row} - {e}", file=sys.stderr)
+
+    except FileNotFoundError:
+        print(f"Error: File not found at {filepath}", file=sys.stderr)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the encoded IDs of the numbered events of catalog CSVs.")
+    parser.add_argument("csv_files", nargs="+", help="Big5 catalog CSV (地震活動彙整) files")
+    args = parser.parse_args()
+
+    for csv_filepath in args.csv_files:
+        encode_earthquake_data(csv_filepath)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Joins the detailed-station events ({year}_{id}) and the regional events
+({YYYYMMDDHHMMSS}{mag}_regional) that describe the same earthquake.
+
+Both sources are sorted by origin time; for every regional event the
+detailed events within the time tolerance are found by bisection, and
+candidates within the distance and magnitude tolerances are paired best
+first, each event at most once. A pair becomes one merged event: the
+detailed event's origin, magnitude and stations plus the regional
+locations, with the max intensity over both and the provenance of each
+part. Events without a partner are passed through and listed in a report,
+so their missing counterpart can be looked up in the download manifest and
+fetched again.
+
+    python -m cwa_quake.event_join [--unified-dir ./unified_earthquake_data | --store unified_events.jsonl]
+                         [--output-dir ./joined_earthquake_data] [--report join_report.json]
+                         [--manifest download_manifest.sqlite --requeue]
+"""
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+
+from .download_manifest import open_manifest
+from .earthquake_codec import regional_data_url
+from .event_store import normalize_timestamp
+from .intensity import intensity_codes, max_intensity
+from .spatial_index import haversine_km
+from .station_columns import load_unified_events
+from .unify_earthquake_json import save_unified_data
+
+DETAILED = "detailed_station"
+REGIONAL = "regional_intensity"
+
+# The regional reports are early automatic solutions: their origin times are
+# seconds off the reviewed catalog, and magnitudes of large events up to a unit low
+DEFAULT_MAX_SECONDS = 30.0
+DEFAULT_MAX_KM = 25.0
+DEFAULT_MAX_MAGNITUDE = 1.0
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def event_arrays(events):
+    """Origin time (s since epoch), longitude, latitude and magnitude arrays of events, sorted by time."""
+    times = np.array([normalize_timestamp(event.get("timestamp")) or "NaT" for event in events],
+                     dtype="datetime64[s]")
+    order = np.argsort(times, kind="stable")
+    return {
+        "order": order,
+        "time": times[order].astype(np.int64),
+        "valid": ~np.isnat(times[order]),
+        "lon": np.array([_float(events[i].get("epicenter_longitude")) for i in order]),
+        "lat": np.array([_float(events[i].get("epicenter_latitude")) for i in order]),
+        "magnitude": np.array([_float(events[i].get("magnitude")) for i in order]),
+    }
+
+
+def find_matches(detailed, regional, max_seconds=DEFAULT_MAX_SECONDS, max_km=DEFAULT_MAX_KM,
+                 max_magnitude=DEFAULT_MAX_MAGNITUDE):
+    """
+    Pairs detailed and regional events (lists of unified events) that are
+    the same earthquake, in O(n log n + candidates).
+
+    Returns:
+        list: (detailed index, regional index, time diff s, distance km,
+              magnitude diff) per pair, ordered by detailed index.
+    """
+    d, r = event_arrays(detailed), event_arrays(regional)
+    d_times = d["time"][:np.count_nonzero(d["valid"])]
+    r_valid = np.nonzero(r["valid"])[0]
+    lo = np.searchsorted(d_times, r["time"][r_valid] - max_seconds, side="left")
+    hi = np.searchsorted(d_times, r["time"][r_valid] + max_seconds, side="right")
+
+    # Candidate pairs as flat arrays: every regional event against its time window
+    counts = hi - lo
+    r_pos = np.repeat(r_valid, counts)
+    d_pos = np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)]) if counts.sum() else np.empty(0, np.int64)
+    dt = np.abs(d["time"][d_pos] - r["time"][r_pos]).astype(np.float64)
+    dist = haversine_km(d["lon"][d_pos], d["lat"][d_pos], r["lon"][r_pos], r["lat"][r_pos])
+    dmag = np.abs(d["magnitude"][d_pos] - r["magnitude"][r_pos])
+    close = (dist <= max_km) & ~(dmag > max_magnitude)
+    d_pos, r_pos, dt, dist, dmag = d_pos[close], r_pos[close], dt[close], dist[close], dmag[close]
+
+    # Best first by combined normalized distance; each event pairs at most once
+    score = dt / max_seconds + dist / max_km + np.nan_to_num(dmag, nan=max_magnitude) / max_magnitude
+    used_d, used_r, matches = set(), set(), []
+    for k in np.argsort(score, kind="stable"):
+        if d_pos[k] in used_d or r_pos[k] in used_r:
+            continue
+        used_d.add(d_pos[k])
+        used_r.add(r_pos[k])
+        matches.append((int(d["order"][d_pos[k]]), int(r["order"][r_pos[k]]),
+                        float(dt[k]), round(float(dist[k]), 2), None if np.isnan(dmag[k]) else round(float(dmag[k]), 2)))
+    return sorted(matches)
+
+
+def merge_events(detailed_event, regional_event, match):
+    """One event from a matched pair; every location is tagged with its source."""
+    _, _, time_diff, distance, magnitude_diff = match
+    merged = {key: value for key, value in detailed_event.items() if key != "affected_locations"}
+    locations = ([dict(location, source_type=DETAILED) for location in detailed_event["affected_locations"]]
+                 + [dict(location, source_type=REGIONAL) for location in regional_event["affected_locations"]])
+    strongest = max_intensity(intensity_codes([detailed_event.get("max_intensity_observed"),
+                                               regional_event.get("max_intensity_observed")]))
+    merged.update({
+        "max_intensity_observed": strongest if strongest else None,
+        "source_type": "merged",
+        "sources": [
+            {"source_type": DETAILED, "event_id": detailed_event["event_id"]},
+            {"source_type": REGIONAL, "event_id": regional_event["event_id"],
+             "timestamp": regional_event.get("timestamp"), "magnitude": regional_event.get("magnitude"),
+             "time_diff_s": time_diff, "distance_km": distance, "magnitude_diff": magnitude_diff},
+        ],
+        "affected_locations": locations,
+    })
+    return merged
+
+
+def join_events(events, max_seconds=DEFAULT_MAX_SECONDS, max_km=DEFAULT_MAX_KM,
+                max_magnitude=DEFAULT_MAX_MAGNITUDE):
+    """
+    Joins the two sources of a list of unified events.
+
+    Returns:
+        tuple: (joined events, unmatched events) - joined holds the merged
+               pairs and every unmatched event (with single-source
+               provenance); unmatched lists the latter again.
+    """
+    detailed = [event for event in events if event.get("source_type") == DETAILED]
+    regional = [event for event in events if event.get("source_type") == REGIONAL]
+    matches = find_matches(detailed, regional, max_seconds, max_km, max_magnitude)
+    joined = [merge_events(detailed[match[0]], regional[match[1]], match) for match in matches]
+    matched_detailed = {match[0] for match in matches}
+    matched_regional = {match[1] for match in matches}
+    unmatched = ([event for i, event in enumerate(detailed) if i not in matched_detailed]
+                 + [event for j, event in enumerate(regional) if j not in matched_regional])
+    for event in unmatched:
+        joined.append(dict(event, sources=[{"source_type": event["source_type"], "event_id": event["event_id"]}]))
+    joined.sort(key=lambda event: (normalize_timestamp(event.get("timestamp")), event["event_id"]))
+    return joined, unmatched
+
+
+def counterparts(manifest, event, max_seconds=DEFAULT_MAX_SECONDS):
+    """
+    Manifest events of the other source whose origin time is within
+    max_seconds of an unmatched event (see download_manifest.py).
+    """
+    other = "regional" if event["source_type"] == DETAILED else "detailed"
+    origin = np.datetime64(normalize_timestamp(event.get("timestamp")) or "NaT", "s")
+    if np.isnat(origin):
+        return []
+    window = [str(origin - int(max_seconds)).replace("T", " "), str(origin + int(max_seconds)).replace("T", " ")]
+    return manifest.execute("SELECT * FROM events WHERE kind = ? AND origin_time BETWEEN ? AND ?",
+                            (other, *window)).fetchall()
+
+
+def manifest_event_id(row):
+    """Unified event ID of a manifest event's data."""
+    if row["kind"] == "regional":
+        return f"{row['encoded_id']}_regional"
+    return f"{row['year']}_{row['earthquake_id']}"
+
+
+def unmatched_report(unmatched, manifest=None, max_seconds=DEFAULT_MAX_SECONDS, known_ids=()):
+    """
+    One entry per unmatched event: the source it is missing from, the
+    regional details URL that would carry it (for detailed events), and the
+    catalog events of the other source near its origin time if a manifest
+    connection is given. A counterpart is "present" when its event ID is in
+    `known_ids`, i.e. its data is there but did not match.
+    """
+    report = []
+    for event in unmatched:
+        entry = {
+            "event_id": event["event_id"],
+            "source_type": event["source_type"],
+            "missing_source": REGIONAL if event["source_type"] == DETAILED else DETAILED,
+            "timestamp": event.get("timestamp"),
+            "magnitude": event.get("magnitude"),
+        }
+        if event["source_type"] == DETAILED and event.get("timestamp") and event.get("magnitude") is not None:
+            # Encoded as earthquake_codec.encode_row() does for unnumbered events
+            digits = "".join(filter(str.isdigit, normalize_timestamp(event["timestamp"])))
+            magnitude = f"{float(event['magnitude']):.1f}".replace(".", "")
+            entry["regional_url"] = regional_data_url(digits + magnitude)
+        if manifest is not None:
+            entry["catalog_counterparts"] = [
+                {"encoded_id": row["encoded_id"], "status": row["status"], "origin_time": row["origin_time"],
+                 "present": manifest_event_id(row) in known_ids}
+                for row in counterparts(manifest, event, max_seconds)
+            ]
+        report.append(entry)
+    return report
+
+
+def requeue(manifest, report):
+    """
+    Marks the catalog counterparts of unmatched events whose data is not
+    present as failed, so the next download run fetches them.
+    """
+    encoded_ids = {c["encoded_id"] for entry in report for c in entry.get("catalog_counterparts", [])
+                   if not c["present"]}
+    for encoded_id in encoded_ids:
+        manifest.execute("UPDATE events SET status = 'failed' WHERE encoded_id = ?", (encoded_id,))
+    manifest.commit()
+    return len(encoded_ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Join detailed-station and regional events of the same earthquake.")
+    parser.add_argument("--store", help="packed event store to read instead of --unified-dir")
+    parser.add_argument("--unified-dir", default="./unified_earthquake_data")
+    parser.add_argument("--output-dir", default="./joined_earthquake_data")
+    parser.add_argument("--report", default="./join_report.json", help="JSON list of the unmatched events")
+    parser.add_argument("--max-seconds", type=float, default=DEFAULT_MAX_SECONDS)
+    parser.add_argument("--max-km", type=float, default=DEFAULT_MAX_KM)
+    parser.add_argument("--max-magnitude", type=float, default=DEFAULT_MAX_MAGNITUDE)
+    parser.add_argument("--manifest", help="download manifest to look up the missing counterparts in")
+    parser.add_argument("--requeue", action="store_true",
+                        help="mark the counterparts found in the manifest for download")
+    args = parser.parse_args()
+
+    events = list(load_unified_events(args.store, args.unified_dir))
+    joined, unmatched = join_events(events, args.max_seconds, args.max_km, args.max_magnitude)
+
+    # Files of events no longer joined are removed, as county_index.materialize_view() does
+    os.makedirs(args.output_dir, exist_ok=True)
+    written = set()
+    for event in joined:
+        save_unified_data(event, args.output_dir)
+        written.add(f"{event['event_id']}.json")
+    for file_path in glob.glob(os.path.join(args.output_dir, '*.json')):
+        if os.path.basename(file_path) not in written:
+            os.remove(file_path)
+
+    manifest = open_manifest(args.manifest) if args.manifest else None
+    report = unmatched_report(unmatched, manifest, args.max_seconds, {event["event_id"] for event in events})
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    merged = len(joined) - len(unmatched)
+    missing = {source: sum(entry["missing_source"] == source for entry in report) for source in (DETAILED, REGIONAL)}
+    print(f"Joined {len(events)} events into {len(joined)}: {merged} merged pairs, "
+          f"{missing[REGIONAL]} detailed-only and {missing[DETAILED]} regional-only; written to {args.output_dir}")
+    if manifest is not None:
+        found = sum(any(not c["present"] for c in entry["catalog_counterparts"]) for entry in report)
+        print(f"{found} unmatched events have a catalog counterpart in {args.manifest} whose data is missing")
+        if args.requeue:
+            print(f"Marked {requeue(manifest, report)} manifest events for download")
+    print(f"Unmatched events listed in {args.report}")
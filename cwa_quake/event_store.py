@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Packed store for unified events: one append-only JSON Lines file holding a
+compact record per event, plus a sidecar index (JSON Lines as well) of
+event_id -> offset, length, timestamp and magnitude.
+
+Readers memory-map the data file and slice out single events, so fetching an
+event or a time range needs neither a directory scan nor a parse of the
+other events.
+
+    python -m cwa_quake.event_store convert [--unified-dir ./unified_earthquake_data] [--store ./unified_events.jsonl]
+    python -m cwa_quake.event_store get 2024_019
+    python -m cwa_quake.event_store range 2024-04-01 2024-05-01
+"""
+import argparse
+import bisect
+import glob
+import json
+import mmap
+import os
+
+DEFAULT_STORE = "./unified_events.jsonl"
+
+
+def index_path(store_path):
+    return store_path + ".idx"
+
+
+def normalize_timestamp(timestamp):
+    """
+    ISO form ('YYYY-MM-DDTHH:MM:SS') of both detailed and regional
+    timestamps, or of a date or datetime; '' if missing.
+    """
+    if hasattr(timestamp, "isoformat"):
+        return timestamp.isoformat()
+    return (timestamp or "").replace(" ", "T")
+
+
+def _magnitude(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class EventStore:
+    """
+    Append-only packed event store. Appending an event whose ID is already
+    stored supersedes the old record; delete() appends a tombstone. Both
+    leave dead bytes behind until compact() rewrites the file.
+    """
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = path
+        self.entries = {}
+        self._map = None
+        self._file = None
+        self._sorted = None
+        if os.path.exists(path) and os.path.exists(index_path(path)):
+            data_size = os.path.getsize(path)
+            with open(index_path(path), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn write; _append_index() starts the next entry on a new line
+                    if entry["length"] < 0:
+                        self.entries.pop(entry["id"], None)
+                    elif entry["offset"] + entry["length"] <= data_size:
+                        self.entries[entry["id"]] = entry
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, event_id):
+        return event_id in self.entries
+
+    def ids(self):
+        return list(self.entries)
+
+    def append(self, unified_data):
+        """Appends one unified event and its index entry; returns (offset, length)."""
+        record = json.dumps(unified_data, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(record)
+        entry = {
+            "id": unified_data["event_id"],
+            "offset": offset,
+            "length": len(record),
+            "timestamp": normalize_timestamp(unified_data.get("timestamp")),
+            "magnitude": _magnitude(unified_data.get("magnitude")),
+        }
+        # The data is written before its index entry, so a crash can leave
+        # unreferenced bytes but never an entry pointing past the data
+        self._append_index(entry)
+        self.entries[entry["id"]] = entry
+        self._sorted = None
+        return offset, len(record)
+
+    def delete(self, event_id):
+        """Removes an event by appending a tombstone to the index."""
+        if event_id not in self.entries:
+            return
+        self._append_index({"id": event_id, "offset": 0, "length": -1})
+        del self.entries[event_id]
+        self._sorted = None
+
+    def _append_index(self, entry):
+        """Appends an index line, after a newline if a torn write left the last line unterminated."""
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(index_path(self.path), "a+b") as f:
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
+
+    def _data(self, end):
+        if self._map is None or len(self._map) < end:
+            self.close()
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def get(self, event_id):
+        """Returns the unified event with this ID; raises KeyError if it is not stored."""
+        entry = self.entries[event_id]
+        end = entry["offset"] + entry["length"]
+        return json.loads(self._data(end)[entry["offset"]:end])
+
+    def _by_time(self):
+        if self._sorted is None:
+            self._sorted = sorted(self.entries.values(), key=lambda e: (e["timestamp"], e["id"]))
+            self._timestamps = [e["timestamp"] for e in self._sorted]
+        return self._sorted
+
+    def time_range(self, start=None, end=None, min_magnitude=None):
+        """
+        Yields the events with start <= timestamp < end (ISO strings, dates
+        or datetimes; either bound may be None), oldest first, optionally
+        only those of at least `min_magnitude`. Only matching records are
+        read.
+        """
+        entries = self._by_time()
+        lo = bisect.bisect_left(self._timestamps, normalize_timestamp(start)) if start else 0
+        hi = bisect.bisect_left(self._timestamps, normalize_timestamp(end)) if end else len(entries)
+        for entry in entries[lo:hi]:
+            if min_magnitude is not None and (entry["magnitude"] is None or entry["magnitude"] < min_magnitude):
+                continue
+            yield self.get(entry["id"])
+
+    def __iter__(self):
+        return self.time_range()
+
+    def compact(self):
+        """Rewrites the store without superseded records and tombstones."""
+        tmp_path = self.path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if os.path.exists(index_path(tmp_path)):
+            os.remove(index_path(tmp_path))
+        compacted = EventStore(tmp_path)
+        for event in self:
+            compacted.append(event)
+        self.close()
+        os.replace(tmp_path, self.path)
+        os.replace(index_path(tmp_path), index_path(self.path))
+        self.__init__(self.path)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+
+def convert_directory(unified_dir, store_path=DEFAULT_STORE):
+    """
+    Packs every {event_id}.json of a unified directory into a new store,
+    replacing any existing one.
+
+    Returns:
+        EventStore: The new store.
+    """
+    for path in (store_path, index_path(store_path)):
+        if os.path.exists(path):
+            os.remove(path)
+    store = EventStore(store_path)
+    for file_path in sorted(glob.glob(os.path.join(unified_dir, "*.json"))):
+        with open(file_path, "r", encoding="utf-8") as f:
+            store.append(json.load(f))
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Packed unified event store.")
+    parser.add_argument("--store", default=DEFAULT_STORE)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert = subparsers.add_parser("convert", help="pack a unified JSON directory")
+    convert.add_argument("--unified-dir", default="./unified_earthquake_data")
+    get = subparsers.add_parser("get", help="print one event")
+    get.add_argument("event_id")
+    time_range = subparsers.add_parser("range", help="list events in a time range")
+    time_range.add_argument("start")
+    time_range.add_argument("end")
+    time_range.add_argument("--min-magnitude", type=float)
+    subparsers.add_parser("compact", help="drop superseded records")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        store = convert_directory(args.unified_dir, args.store)
+        size = os.path.getsize(args.store)
+        print(f"Packed {len(store)} events into {args.store} ({size / 1e6:.1f} MB)")
+    elif args.command == "get":
+        print(json.dumps(EventStore(args.store).get(args.event_id), ensure_ascii=False, indent=4))
+    elif args.command == "range":
+        for event in EventStore(args.store).time_range(args.start, args.end, args.min_magnitude):
+            print(f"{event['event_id']}  {event['timestamp']}  M{event['magnitude']}  "
+                  f"{len(event['affected_locations'])} locations")
+    elif args.command == "compact":
+        store = EventStore(args.store)
+        store.compact()
+        print(f"Compacted {args.store}: {len(store)} events, {os.path.getsize(args.store) / 1e6:.1f} MB")
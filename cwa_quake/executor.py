@@ -0,0 +1,179 @@
+"""
+Process pool shared by the per-file stages (parse, city tagging, unify,
+pipeline, regional views).
+
+Files are grouped into chunks of about `chunk_bytes` (consecutive in input
+order; a file larger than that is a chunk of its own) and the chunks are
+handed to the pool largest first, so the few events 20x the size of the
+rest do not end up as the tail of the run. Results come back in input
+order whatever order the chunks finish in:
+
+    executor = FileExecutor(workers=16)
+    for path, result in executor.map(functools.partial(task, output_dir), paths):
+        ...
+    metrics.info(executor.report())
+
+`func` runs in the worker processes, so it must be a module-level function
+(or a functools.partial of one) with picklable arguments and results; keep
+SQLite connections and other shared state in the parent. With workers=1
+everything runs in-process, in order, with no pool. Counters and histograms
+recorded by `func` in a worker are merged into the parent's metrics.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import metrics
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Chunks per worker when no chunk size is given: enough to even out the
+# load, few enough that per-chunk overhead stays small
+CHUNKS_PER_WORKER = 4
+
+
+def write_atomic(path, content):
+    """Writes bytes to `path` through a temporary file, so readers never see a partial file."""
+    part_file = f"{path}.{os.getpid()}.part"
+    try:
+        with open(part_file, 'wb') as f:
+            f.write(content)
+        os.replace(part_file, path)
+    except BaseException:
+        if os.path.exists(part_file):
+            os.remove(part_file)
+        raise
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
+
+
+def plan_chunks(sizes, chunk_bytes):
+    """
+    Splits positions 0..len(sizes)-1 into runs of consecutive positions
+    totalling about `chunk_bytes` each.
+
+    Returns:
+        list: (start, end, bytes) per chunk, in input order.
+    """
+    chunks, start, total = [], 0, 0
+    for i, size in enumerate(sizes):
+        if i > start and total + size > chunk_bytes:
+            chunks.append((start, i, total))
+            start, total = i, 0
+        total += size
+    if start < len(sizes):
+        chunks.append((start, len(sizes), total))
+    return chunks
+
+
+def _init_worker(settings):
+    metrics._settings.update(settings)
+
+
+def _run_chunk(func, items):
+    """Runs `func` over one chunk in a worker; returns its results, metrics and busy time."""
+    metrics.metrics.reset()
+    start = time.perf_counter()
+    results = [func(item) for item in items]
+    busy = time.perf_counter() - start
+    with metrics.metrics._lock:
+        return results, dict(metrics.metrics.counters), dict(metrics.metrics.histograms), busy
+
+
+class FileExecutor:
+    """
+    Args:
+        workers: Worker processes; 1 runs in-process.
+        chunk_bytes: Target input bytes per chunk; defaults to the total
+            split CHUNKS_PER_WORKER ways per worker.
+        name: Stage the run statistics are recorded under, as
+            {name}.pool_files, .pool_bytes, .pool_chunks, .pool_chunk_seconds.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, chunk_bytes=None, name="executor"):
+        self.workers = max(1, workers or 1)
+        self.chunk_bytes = chunk_bytes
+        self.name = name
+        self.stats = {"files": 0, "bytes": 0, "chunks": 0, "busy_s": 0.0, "elapsed_s": 0.0}
+        # Pool size of the last map(); no more workers than files
+        self.workers_used = self.workers
+
+    def map(self, func, items, sizes=None):
+        """
+        Yields (item, func(item)) for every item, in input order.
+
+        Args:
+            func: Picklable callable of one item.
+            items: File paths or other picklable items.
+            sizes: Input bytes per item, for chunking; defaults to the size
+                of the file each item names (0 if it names none).
+        """
+        items = list(items)
+        sizes = [_size(item) for item in items] if sizes is None else list(sizes)
+        total = sum(sizes)
+        workers = min(self.workers, len(items)) or 1
+        chunk_bytes = self.chunk_bytes or max(total // (workers * CHUNKS_PER_WORKER), 1)
+        chunks = plan_chunks(sizes, chunk_bytes)
+        self.workers_used = workers
+        start, elapsed = time.perf_counter(), self.stats["elapsed_s"]
+        if workers == 1:
+            for lo, hi, size in chunks:
+                chunk_start = time.perf_counter()
+                results = [func(item) for item in items[lo:hi]]
+                self._account(hi - lo, size, time.perf_counter() - chunk_start, elapsed + time.perf_counter() - start)
+                yield from zip(items[lo:hi], results)
+            return
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(dict(metrics._settings),)) as pool:
+            futures = {}
+            for lo, hi, size in sorted(chunks, key=lambda chunk: -chunk[2]):
+                futures[lo] = pool.submit(_run_chunk, func, items[lo:hi])
+            for lo, hi, size in chunks:
+                results, counters, histograms, busy = futures.pop(lo).result()
+                metrics.metrics.merge(counters, histograms)
+                self._account(hi - lo, size, busy, elapsed + time.perf_counter() - start)
+                yield from zip(items[lo:hi], results)
+
+    def _account(self, files, size, busy, elapsed):
+        """Adds a finished chunk to the statistics; `elapsed` is the wall time of all map()s so far."""
+        self.stats["elapsed_s"] = elapsed
+        self.stats["files"] += files
+        self.stats["bytes"] += size
+        self.stats["chunks"] += 1
+        self.stats["busy_s"] += busy
+        metrics.incr(f"{self.name}.pool_files", files)
+        metrics.incr(f"{self.name}.pool_bytes", size)
+        metrics.incr(f"{self.name}.pool_chunks")
+        metrics.observe(f"{self.name}.pool_chunk_seconds", busy)
+
+    def utilization(self):
+        """Share of the workers' wall time spent running chunks (0..1)."""
+        capacity = self.stats["elapsed_s"] * self.workers_used
+        return self.stats["busy_s"] / capacity if capacity else 0.0
+
+    def report(self):
+        """One line of throughput and utilization; also recorded as {name}.pool_utilization."""
+        elapsed = self.stats["elapsed_s"] or 1e-9
+        utilization = self.utilization()
+        metrics.observe(f"{self.name}.pool_utilization", utilization)
+        return (f"{self.stats['files']} files ({self.stats['bytes'] / 1e6:.1f} MB) in {self.stats['chunks']} chunks "
+                f"on {self.workers_used} workers: {self.stats['files'] / elapsed:.0f} files/s, "
+                f"{self.stats['bytes'] / 1e6 / elapsed:.1f} MB/s, {utilization:.0%} utilization")
+
+
+def add_arguments(parser):
+    """Adds --workers and --chunk-kb to an argparse parser."""
+    group = parser.add_argument_group("parallelism")
+    group.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                       help=f"worker processes (default: {DEFAULT_WORKERS}); 1 runs serially in-process")
+    group.add_argument("--chunk-kb", type=int, help="input KB per chunk (default: split evenly, "
+                       f"{CHUNKS_PER_WORKER} chunks per worker)")
+
+
+def from_args(args, name="executor"):
+    """A FileExecutor configured by the add_arguments() flags."""
+    return FileExecutor(args.workers, args.chunk_kb * 1024 if args.chunk_kb else None, name)
@@ -2,6 +2,9 @@
 import os
 import json
 import glob
+import argparse
+
+from .station_registry import DEFAULT_REGISTRY, open_registry, station_coordinates
 
 def extract_coordinates_from_json(json_dir):
     """
@@ -38,12 +41,27 @@ def extract_coordinates_from_json(json_dir):
 
     return station_coordinates
 
+def load_station_coordinates(json_dir, registry_path=DEFAULT_REGISTRY):
+    """
+    Station coordinates from the station registry (see station_registry.py)
+    if it exists, otherwise by rescanning json_dir.
+    """
+    if registry_path and os.path.exists(registry_path):
+        return station_coordinates(open_registry(registry_path))
+    return extract_coordinates_from_json(json_dir)
+
 if __name__ == "__main__":
     # Directory containing the processed JSON files
     # Assumes the JSON files are in a 'json' subdirectory within 'earthquake_data'
     json_directory = './earthquake_data/json'
 
-    coordinates_dict = extract_coordinates_from_json(json_directory)
+    parser = argparse.ArgumentParser(description="Export station coordinates.")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY)
+    parser.add_argument("--rescan", action="store_true",
+                        help=f"rescan {json_directory} instead of reading the station registry")
+    args = parser.parse_args()
+
+    coordinates_dict = load_station_coordinates(json_directory, None if args.rescan else args.registry)
 
     if coordinates_dict:
         print("\nStation Coordinates (Stacode: [Longitude, Latitude]):")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Writes the regional data of the configured sites to a separate directory.
+
+This used to rewrite every regional JSON in place, keeping only the
+locations in four hardcoded counties; the downloaded files are now left
+whole and the counties come from a view in sites.json (see county_index.py).
+
+    python -m cwa_quake.filter_counties [--view sites] [--output-dir ./views/sites_regional]
+"""
+import argparse
+import functools
+import glob
+import json
+import os
+
+from . import executor as file_executor
+from .county_index import DEFAULT_VIEWS_CONFIG, DEFAULT_VIEWS_DIR, load_views, location_county
+
+
+def filter_file(json_file_path, output_dir, allowed):
+    """
+    Copies one regional JSON into output_dir with only the locations whose
+    normalized county is in `allowed`.
+
+    Returns:
+        tuple: (locations kept, locations dropped)
+    """
+    with open(json_file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    locations = data.get('locations', [])
+    data['locations'] = [loc for loc in locations if location_county(loc) in allowed]
+    file_executor.write_atomic(os.path.join(output_dir, os.path.basename(json_file_path)),
+                               json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
+    return len(data['locations']), len(locations) - len(data['locations'])
+
+
+def filter_regional(input_dir, output_dir, counties, executor=None):
+    """
+    Copies every regional JSON in input_dir to output_dir with only the
+    locations in `counties`, on the `executor` (see executor.py), serially
+    by default.
+
+    Returns:
+        tuple: (files written, locations kept, locations dropped)
+    """
+    executor = executor or file_executor.FileExecutor(1, name="filter")
+    os.makedirs(output_dir, exist_ok=True)
+    allowed = {location_county({"county": county}) for county in counties}
+    files = kept = dropped = 0
+    task = functools.partial(filter_file, output_dir=output_dir, allowed=allowed)
+    for _, (file_kept, file_dropped) in executor.map(task, glob.glob(os.path.join(input_dir, "*.json"))):
+        kept += file_kept
+        dropped += file_dropped
+        files += 1
+    return files, kept, dropped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the regional data of a configured view.")
+    parser.add_argument("--view", default="sites", help="view name in the configuration")
+    parser.add_argument("--config", default=DEFAULT_VIEWS_CONFIG)
+    parser.add_argument("--input-dir", default="./earthquake_regional_data")
+    parser.add_argument("--output-dir", help=f"defaults to {DEFAULT_VIEWS_DIR}/{{view}}_regional")
+    file_executor.add_arguments(parser)
+    args = parser.parse_args()
+
+    counties = load_views(args.config)[args.view]
+    output_dir = args.output_dir or os.path.join(DEFAULT_VIEWS_DIR, f"{args.view}_regional")
+    executor = file_executor.from_args(args, "filter")
+    files, kept, dropped = filter_regional(args.input_dir, output_dir, counties, executor)
+    print(f"Filtered {files} files into {output_dir}: kept {kept} locations, dropped {dropped}")
+    print(executor.report())
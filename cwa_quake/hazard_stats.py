@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Incremental hazard statistics per county and per station, in monthly bins.
+
+For every (scope, name, month) bin the SQLite store keeps the number of
+events felt there, how many of them reached each configured intensity, PGA
+and PGV threshold, the maxima, and log-spaced histograms of the per-event
+PGA/PGV from which percentiles are read. Yearly and all-time figures merge
+the monthly bins at query time.
+
+An update only reads the events that are new, changed or removed since the
+last run and recomputes the months they fall in.
+
+    python -m cwa_quake.hazard_stats update [--store unified_events.jsonl | --unified-dir ./unified_earthquake_data] [--pga 80 --intensity 4]
+    python -m cwa_quake.hazard_stats report --scope county --by year [--name 臺北市 新竹市]
+"""
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from .event_store import EventStore
+from .intensity import INTENSITY_MISSING, intensity_label, threshold_code
+from .station_columns import StationColumns
+
+# One row per ingested event, and one per (scope, name, month) bin.
+#   events.fingerprint: size/mtime of the unified file, or offset/length in
+#                       the packed store; a change marks the event's month dirty
+#   bins.exceedances:   JSON {threshold label: number of events reaching it}
+#   bins.*_hist:        JSON [[bin, count], ...] over PGA_EDGES / PGV_EDGES
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    event_id    TEXT PRIMARY KEY,
+    period      TEXT NOT NULL,
+    fingerprint TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_period ON events (period);
+CREATE TABLE IF NOT EXISTS bins (
+    scope         TEXT NOT NULL,
+    name          TEXT NOT NULL,
+    period        TEXT NOT NULL,
+    events        INTEGER NOT NULL,
+    exceedances   TEXT NOT NULL,
+    max_intensity INTEGER,
+    max_pga       REAL,
+    max_pgv       REAL,
+    pga_hist      TEXT NOT NULL,
+    pgv_hist      TEXT NOT NULL,
+    PRIMARY KEY (scope, name, period)
+);
+CREATE TABLE IF NOT EXISTS config (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+DEFAULT_STATS_DB = "./hazard_stats.sqlite"
+
+SCOPES = ("county", "station")
+
+DEFAULT_THRESHOLDS = {"intensity": [4], "pga": [80.0], "pgv": [15.0]}
+
+# Histogram edges, 20 bins per decade: PGA 0.01-10000 gal, PGV 0.001-1000 cm/s
+PGA_EDGES = np.logspace(-2, 4, 121)
+PGV_EDGES = np.logspace(-3, 3, 121)
+
+
+def open_stats(db_path=DEFAULT_STATS_DB):
+    """Opens (creating if needed) the SQLite hazard statistics store."""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def threshold_labels(thresholds):
+    """Labels of the configured thresholds, e.g. 'intensity>=4', 'pga>=80'."""
+    return [f"{kind}>={value:g}" if kind != "intensity" else f"{kind}>={value}"
+            for kind in ("intensity", "pga", "pgv") for value in thresholds.get(kind, [])]
+
+
+def directory_source(unified_dir):
+    """(fingerprints, loader) of a unified JSON directory; fingerprints come from stat()."""
+    fingerprints = {}
+    for file_path in glob.glob(os.path.join(unified_dir, '*.json')):
+        stat = os.stat(file_path)
+        fingerprints[os.path.basename(file_path)[:-len('.json')]] = f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def load(event_id):
+        with open(os.path.join(unified_dir, f"{event_id}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    return fingerprints, load
+
+
+def store_source(store_path):
+    """(fingerprints, loader) of a packed event store; fingerprints come from its index."""
+    store = EventStore(store_path)
+    fingerprints = {event_id: f"{entry['offset']}:{entry['length']}" for event_id, entry in store.entries.items()}
+    return fingerprints, store.get
+
+
+def event_period(event):
+    """Month bin ('YYYY-MM') of a unified event, '' without a timestamp."""
+    return (event.get("timestamp") or "")[:7]
+
+
+def _peak(*components):
+    """Largest absolute value across components per record, -inf where all are NaN."""
+    stacked = np.abs(np.vstack(components).astype(np.float64))
+    stacked[np.isnan(stacked)] = -np.inf
+    return stacked.max(axis=0)
+
+
+def _sparse_histogram(row):
+    return json.dumps([[int(i), int(row[i])] for i in np.nonzero(row)[0]])
+
+
+def compute_bins(events, thresholds):
+    """
+    Statistics of one month's events for every county and station.
+
+    Values are first reduced to one per (bin, event) pair, so a county
+    counts an event once however many of its stations recorded it.
+
+    Returns:
+        list: Row tuples (scope, name, events, exceedances, max_intensity,
+              max_pga, max_pgv, pga_hist, pgv_hist).
+    """
+    columns = StationColumns.from_events(events)
+    if not len(columns):
+        return []
+    n_events = len(columns.event_ids)
+    intensity = columns.intensity.astype(np.int16)
+    intensity[columns.intensity == INTENSITY_MISSING] = -1
+    pga = _peak(columns.pga_v, columns.pga_ns, columns.pga_ew)
+    pgv = _peak(columns.pgv_v, columns.pgv_ns, columns.pgv_ew)
+    labels = threshold_labels(thresholds)
+
+    rows = []
+    for scope, names in (("county", columns.county_names), ("station", columns.station_names)):
+        groups = columns.county if scope == "county" else columns.station
+        valid = groups >= 0
+        pairs, pair_of = np.unique(groups[valid].astype(np.int64) * n_events + columns.event[valid],
+                                   return_inverse=True)
+        pair_bin = pairs // n_events
+        pair_int = np.full(len(pairs), -1, dtype=np.int16)
+        pair_pga = np.full(len(pairs), -np.inf)
+        pair_pgv = np.full(len(pairs), -np.inf)
+        np.maximum.at(pair_int, pair_of, intensity[valid])
+        np.maximum.at(pair_pga, pair_of, pga[valid])
+        np.maximum.at(pair_pgv, pair_of, pgv[valid])
+
+        n_bins = len(names)
+        counts = np.bincount(pair_bin, minlength=n_bins)
+        reached = [pair_int >= threshold_code(value) for value in thresholds.get("intensity", [])]
+        reached += [pair_pga >= value for value in thresholds.get("pga", [])]
+        reached += [pair_pgv >= value for value in thresholds.get("pgv", [])]
+        exceed = np.array([np.bincount(pair_bin, weights=hit, minlength=n_bins) for hit in reached]).reshape(-1, n_bins)
+
+        maxima = []
+        for values, fill in ((pair_int, -1), (pair_pga, -np.inf), (pair_pgv, -np.inf)):
+            result = np.full(n_bins, fill, dtype=values.dtype)
+            np.maximum.at(result, pair_bin, values)
+            maxima.append(result)
+
+        histograms = []
+        for values, edges in ((pair_pga, PGA_EDGES), (pair_pgv, PGV_EDGES)):
+            hist = np.zeros((n_bins, len(edges) + 1), dtype=np.int64)
+            measured = np.isfinite(values)
+            np.add.at(hist, (pair_bin[measured], np.searchsorted(edges, values[measured])), 1)
+            histograms.append(hist)
+
+        for i in np.nonzero(counts)[0]:
+            rows.append((
+                scope, str(names[i]), int(counts[i]),
+                json.dumps({label: int(n) for label, n in zip(labels, exceed[:, i])}),
+                int(maxima[0][i]) if maxima[0][i] >= 0 else None,
+                float(maxima[1][i]) if np.isfinite(maxima[1][i]) else None,
+                float(maxima[2][i]) if np.isfinite(maxima[2][i]) else None,
+                _sparse_histogram(histograms[0][i]), _sparse_histogram(histograms[1][i]),
+            ))
+    return rows
+
+
+def update_stats(conn, source, thresholds=None):
+    """
+    Brings the statistics up to date with a source.
+
+    Args:
+        conn: Connection from open_stats().
+        source: (fingerprints, loader) from directory_source() or store_source().
+        thresholds: {"intensity": [...], "pga": [...], "pgv": [...]}; the
+            stored configuration (or DEFAULT_THRESHOLDS) if None. Changing
+            them recomputes every month.
+
+    Returns:
+        dict: Counts of new, changed and removed events and recomputed months.
+    """
+    fingerprints, load = source
+    stored = conn.execute("SELECT value FROM config WHERE key = 'thresholds'").fetchone()
+    stored = json.loads(stored[0]) if stored else None
+    thresholds = thresholds or stored or DEFAULT_THRESHOLDS
+    rebuild = stored != thresholds
+    conn.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('thresholds', ?)", (json.dumps(thresholds),))
+
+    known = {row[0]: row[1:] for row in conn.execute("SELECT event_id, period, fingerprint FROM events")}
+    dirty = set(period for period, _ in known.values()) if rebuild else set()
+    counts = {"new": 0, "changed": 0, "removed": 0}
+    loaded = {}
+    for event_id in known.keys() - fingerprints.keys():
+        dirty.add(known[event_id][0])
+        conn.execute("DELETE FROM events WHERE event_id = ?", (event_id,))
+        counts["removed"] += 1
+    for event_id, fingerprint in fingerprints.items():
+        entry = known.get(event_id)
+        if entry is not None and entry[1] == fingerprint:
+            continue
+        event = loaded[event_id] = load(event_id)
+        period = event_period(event)
+        if entry is not None:
+            dirty.add(entry[0])
+        dirty.add(period)
+        counts["changed" if entry is not None else "new"] += 1
+        conn.execute("INSERT OR REPLACE INTO events (event_id, period, fingerprint) VALUES (?, ?, ?)",
+                     (event_id, period, fingerprint))
+
+    for period in dirty:
+        event_ids = [row[0] for row in conn.execute("SELECT event_id FROM events WHERE period = ? ORDER BY event_id",
+                                                    (period,))]
+        events = [loaded[event_id] if event_id in loaded else load(event_id) for event_id in event_ids]
+        conn.execute("DELETE FROM bins WHERE period = ?", (period,))
+        conn.executemany(
+            "INSERT INTO bins (scope, name, period, events, exceedances, max_intensity, max_pga, max_pgv, "
+            "pga_hist, pgv_hist) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(scope, name, period, *rest) for scope, name, *rest in compute_bins(events, thresholds)],
+        )
+    conn.commit()
+    counts["months"] = len(dirty)
+    return counts
+
+
+def _percentile(hist, edges, q):
+    """Geometric center of the histogram bin holding the q-th percentile, None if empty."""
+    total = hist.sum()
+    if not total:
+        return None
+    i = int(np.searchsorted(np.cumsum(hist), q / 100 * total))
+    lo = edges[i - 1] if i > 0 else edges[0] / 10 ** 0.05
+    hi = edges[i] if i < len(edges) else edges[-1] * 10 ** 0.05
+    return float(np.sqrt(lo * hi))
+
+
+def hazard_table(conn, scope="county", by="year", names=None, percentiles=(50, 95)):
+    """
+    Merges the monthly bins into per-year, per-month or all-time statistics.
+
+    Args:
+        scope: "county" or "station".
+        by: "year", "month" or "all".
+        names: Optional counties/stations to keep.
+        percentiles: PGA/PGV percentiles to report.
+
+    Returns:
+        list: One dict per (name, period), sorted by name and period.
+    """
+    query = "SELECT name, period, events, exceedances, max_intensity, max_pga, max_pgv, pga_hist, pgv_hist " \
+            "FROM bins WHERE scope = ?"
+    params = [scope]
+    if names:
+        query += f" AND name IN ({','.join('?' * len(names))})"
+        params += list(names)
+
+    merged = {}
+    for name, period, events, exceedances, max_int, max_pga, max_pgv, pga_hist, pgv_hist in conn.execute(query, params):
+        key = (name, {"year": period[:4], "month": period, "all": "all"}[by])
+        entry = merged.get(key)
+        if entry is None:
+            entry = merged[key] = {
+                "name": name, "period": key[1], "events": 0, "exceedances": {},
+                "max_intensity": None, "max_pga": None, "max_pgv": None,
+                "pga_hist": np.zeros(len(PGA_EDGES) + 1, dtype=np.int64),
+                "pgv_hist": np.zeros(len(PGV_EDGES) + 1, dtype=np.int64),
+            }
+        entry["events"] += events
+        for label, n in json.loads(exceedances).items():
+            entry["exceedances"][label] = entry["exceedances"].get(label, 0) + n
+        for field, value in (("max_intensity", max_int), ("max_pga", max_pga), ("max_pgv", max_pgv)):
+            if value is not None and (entry[field] is None or value > entry[field]):
+                entry[field] = value
+        for field, hist in (("pga_hist", pga_hist), ("pgv_hist", pgv_hist)):
+            for i, n in json.loads(hist):
+                entry[field][i] += n
+
+    table = []
+    for key in sorted(merged):
+        entry = merged[key]
+        pga_hist, pgv_hist = entry.pop("pga_hist"), entry.pop("pgv_hist")
+        if entry["max_intensity"] is not None:
+            entry["max_intensity"] = intensity_label(entry["max_intensity"])
+        # Bin centers can lie above the largest value; never report past it
+        for q in percentiles:
+            for field, hist, edges in (("pga", pga_hist, PGA_EDGES), ("pgv", pgv_hist, PGV_EDGES)):
+                value = _percentile(hist, edges, q)
+                entry[f"{field}_p{q}"] = min(value, entry[f"max_{field}"]) if value is not None else None
+        table.append(entry)
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental hazard statistics per county and station.")
+    parser.add_argument("--db", default=DEFAULT_STATS_DB)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    update = subparsers.add_parser("update", help="ingest new or changed unified events")
+    update.add_argument("--store", help="packed event store to read instead of --unified-dir")
+    update.add_argument("--unified-dir", default="./unified_earthquake_data")
+    update.add_argument("--intensity", nargs="*", help="intensity thresholds, e.g. 4 5弱")
+    update.add_argument("--pga", nargs="*", type=float, help="PGA thresholds in gal")
+    update.add_argument("--pgv", nargs="*", type=float, help="PGV thresholds in cm/s")
+    report = subparsers.add_parser("report", help="print exceedance counts, maxima and percentiles")
+    report.add_argument("--scope", choices=SCOPES, default="county")
+    report.add_argument("--by", choices=["year", "month", "all"], default="year")
+    report.add_argument("--name", nargs="*")
+    args = parser.parse_args()
+
+    conn = open_stats(args.db)
+    if args.command == "update":
+        thresholds = None
+        if args.intensity is not None or args.pga is not None or args.pgv is not None:
+            thresholds = {
+                "intensity": [int(v) if v.isdigit() else v for v in args.intensity or []],
+                "pga": args.pga or [],
+                "pgv": args.pgv or [],
+            }
+        start = time.perf_counter()
+        source = store_source(args.store) if args.store else directory_source(args.unified_dir)
+        counts = update_stats(conn, source, thresholds)
+        print(f"{counts['new']} new, {counts['changed']} changed, {counts['removed']} removed events; "
+              f"recomputed {counts['months']} months in {time.perf_counter() - start:.2f}s")
+    else:
+        for row in hazard_table(conn, args.scope, args.by, args.name):
+            exceedances = "  ".join(f"{label} {n}" for label, n in row["exceedances"].items())
+            pga = f"max PGA {row['max_pga']:.1f} p95 {row['pga_p95']:.1f}" if row["max_pga"] is not None else "no PGA"
+            print(f"{row['name']}\t{row['period']}\t{row['events']} events\t{exceedances}\t"
+                  f"max Int {row['max_intensity']}\t{pga}")
@@ -0,0 +1,135 @@
+"""
+Ordinal encoding of CWA seismic intensities.
+
+The pre-2020 scale has eight levels (0-7); the current one has ten, with 5
+and 6 split into 弱 (lower) and 強 (upper). Both map onto one uint8 code that
+orders them by strength, an unsplit 5 or 6 sorting between its two halves:
+
+    0 1 2 3 4 | 5弱 5 5強 | 6弱 6 6強 | 7
+    0 1 2 3 4 |  5  6  7  |  8  9  10 | 11
+
+Labels are what the JSON outputs carry: plain levels as ints, split levels
+as strings ("5弱").
+
+The codes are ordinal, not evenly spaced; averages (intensity_grid.py) are
+taken over INTENSITY_VALUES, a linear intensity per code, and mapped back
+with nearest_codes() onto the scale of the event.
+"""
+import math
+
+import numpy as np
+
+INTENSITY_CODES = {
+    "0": 0, "1": 1, "2": 2, "3": 3, "4": 4,
+    "5弱": 5, "5-": 5, "5": 6, "5強": 7, "5+": 7,
+    "6弱": 8, "6-": 8, "6": 9, "6強": 10, "6+": 10,
+    "7": 11,
+}
+INTENSITY_LABELS = {0: 0, 1: 1, 2: 2, 3: 3, 4: 4, 5: "5弱", 6: 5, 7: "5強", 8: "6弱", 9: 6, 10: "6強", 11: 7}
+INTENSITY_MISSING = 255
+LEVELS = len(INTENSITY_LABELS)
+
+# Linear intensity per code: 弱 and 強 halves at .0 and .5, an unsplit 5 or 6 between them
+INTENSITY_VALUES = np.array([0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 5.25, 5.5, 6.0, 6.25, 6.5, 7.0])
+SPLIT_CODES = (5, 7, 8, 10)
+UNSPLIT_CODES = (6, 9)
+
+# The CWA split 5 and 6 into 弱 and 強 from this date
+SPLIT_SCALE_SINCE = "2020-01-01"
+
+
+def intensity_code(value):
+    """
+    Ordinal code of an intensity: an int, a label ("4級", "5弱", "5+") or a
+    damaged label, which is read by its single leading digit as an unsplit
+    level ("4??" -> 4, "5.1" -> 5, but "10" is no level). INTENSITY_MISSING
+    if there is no level, NaN included.
+    """
+    if value is None or isinstance(value, (bool, np.bool_)):
+        return INTENSITY_MISSING
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        if not math.isfinite(value):
+            return INTENSITY_MISSING
+        value = str(int(value))
+    value = str(value).strip().replace("級", "").strip()
+    code = INTENSITY_CODES.get(value)
+    if code is None and value[:1].isdigit() and not value[1:2].isdigit():
+        code = INTENSITY_CODES.get(value[0])
+    return INTENSITY_MISSING if code is None else code
+
+
+def intensity_values(codes):
+    """Linear intensities (INTENSITY_VALUES) of an array of codes; NaN where missing."""
+    codes = np.asarray(codes, dtype=np.uint8)
+    values = np.full(codes.shape, np.nan)
+    present = codes != INTENSITY_MISSING
+    values[present] = INTENSITY_VALUES[codes[present]]
+    return values
+
+
+def split_scale(codes, timestamp=None):
+    """
+    Whether an event's codes are on the split (2020-) scale: by the levels
+    present, else by the event time.
+    """
+    codes = np.asarray(codes, dtype=np.uint8)
+    if np.isin(codes, SPLIT_CODES).any():
+        return True
+    if np.isin(codes, UNSPLIT_CODES).any():
+        return False
+    return timestamp is not None and str(timestamp)[:10] >= SPLIT_SCALE_SINCE
+
+
+def nearest_codes(values, split=True):
+    """
+    Code of the level nearest to each linear intensity, on the split or the
+    unsplit scale, as floats; NaN stays NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.array([code for code in range(LEVELS) if code not in (UNSPLIT_CODES if split else SPLIT_CODES)])
+    levels = INTENSITY_VALUES[codes]
+    nearest = codes[np.searchsorted((levels[1:] + levels[:-1]) / 2, np.nan_to_num(values))].astype(np.float64)
+    return np.where(np.isnan(values), np.nan, nearest)
+
+
+def intensity_label(code):
+    """Label of a code: int for plain levels, str for split levels, None if missing."""
+    return INTENSITY_LABELS.get(int(code))
+
+
+def normalize_intensity(value):
+    """Canonical label of an intensity value, None if it has no level."""
+    return intensity_label(intensity_code(value))
+
+
+def intensity_codes(values):
+    """uint8 array of the codes of a sequence of intensity values."""
+    return np.fromiter((intensity_code(value) for value in values), dtype=np.uint8)
+
+
+def max_intensity(codes):
+    """Label of the strongest code in an array, None if all are missing."""
+    codes = np.asarray(codes, dtype=np.uint8)
+    codes = codes[codes != INTENSITY_MISSING]
+    return intensity_label(codes.max()) if len(codes) else None
+
+
+def histogram(codes):
+    """Number of values per code, as an array of length LEVELS."""
+    codes = np.asarray(codes, dtype=np.uint8)
+    return np.bincount(codes[codes != INTENSITY_MISSING], minlength=LEVELS)[:LEVELS]
+
+
+def threshold_code(value):
+    """
+    Lowest code that counts as at least intensity `value`: a plain 5 or 6
+    includes its 弱 half, so "at least 5" starts at 5弱.
+    """
+    code = intensity_code(value)
+    return code - 1 if code in (6, 9) else code
+
+
+def exceedance(codes, threshold):
+    """Boolean mask of the codes at or above the intensity `threshold` (see threshold_code())."""
+    codes = np.asarray(codes, dtype=np.uint8)
+    return (codes >= threshold_code(threshold)) & (codes != INTENSITY_MISSING)
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+ShakeMap-style rasters of an event: intensity, PGA and PGV interpolated from
+its scattered station or regional locations onto a fixed lon/lat grid over
+Taiwan.
+
+Every grid cell takes the inverse-distance weighted mean of its k nearest
+locations within max_distance_km. The cell centers are indexed once
+(spatial_index.GridIndex); an event is one radius query of its locations
+against them, after which ranking and weighting run over all reached cells
+in NumPy batches, so cells out of reach cost nothing. Intensity is
+interpolated on a linear scale (intensity.INTENSITY_VALUES) and mapped back
+to the nearest level of the event's own scale, PGA and PGV in log10 space;
+cells farther than max_distance_km from every location are NaN. PGA and
+PGV are the peak horizontal component, or the site_motion.py estimate of a
+regional location.
+
+Rasters are cached per event in {cache_dir}/{event_id}-{key}.npz, where the
+key hashes the event's catalog fingerprint and the grid settings, so a
+repeat request is a file-exists check and a changed event or setting is
+gridded again:
+
+    gridder = IntensityGridder(EarthquakeCatalog())
+    grid = gridder.get("2024_019")      # lons, lats, intensity, intensity_code, pga, pgv, distance_km
+
+    python -m cwa_quake.intensity_grid build [--start 2024-01-01] [--min-magnitude 4] [--workers 8]
+    python -m cwa_quake.intensity_grid show 2024_019
+"""
+import argparse
+import functools
+import glob
+import hashlib
+import io
+import json
+import os
+import time
+
+import numpy as np
+
+from . import executor as file_executor
+from . import metrics
+from .earthquake_catalog import EarthquakeCatalog
+from .event_store import EventStore
+from .hazard_stats import directory_source, store_source
+from .intensity import intensity_codes, intensity_label, intensity_values, nearest_codes, split_scale
+from .spatial_index import KM_PER_DEGREE, GridIndex
+
+DEFAULT_CACHE_DIR = "./intensity_grids"
+
+# lon_min, lat_min, lon_max, lat_max: Taiwan with Penghu, Kinmen and Matsu
+TAIWAN_BOUNDS = (118.1, 21.8, 122.1, 26.4)
+DEFAULT_RESOLUTION = 0.02  # degrees, about 2 km
+DEFAULT_K = 6
+DEFAULT_POWER = 2.0
+DEFAULT_MAX_DISTANCE_KM = 40.0
+
+# Distances below this count as this, so a cell on top of a location does
+# not divide by zero (it is dominated by that location instead)
+MIN_DISTANCE_KM = 0.5
+
+# Bump when the gridding changes, so cached rasters are rebuilt
+GRID_VERSION = 2
+
+FIELDS = ("intensity", "pga", "pgv")
+
+
+def grid_axes(bounds=TAIWAN_BOUNDS, resolution=DEFAULT_RESOLUTION):
+    """Cell-center longitudes and latitudes of the grid over `bounds`."""
+    lon_min, lat_min, lon_max, lat_max = bounds
+    lons = lon_min + resolution * (np.arange(int(round((lon_max - lon_min) / resolution))) + 0.5)
+    lats = lat_min + resolution * (np.arange(int(round((lat_max - lat_min) / resolution))) + 0.5)
+    return lons, lats
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _peak_horizontal(location, kind):
+    """Peak horizontal PGA or PGV of a location, else its site_motion estimate; NaN if neither."""
+    peak = np.nanmax([_float(location.get(f"{kind}_ns")), _float(location.get(f"{kind}_ew")), -np.inf])
+    return peak if peak > 0 else _float(location.get(f"{kind}_estimated"))
+
+
+def location_values(event):
+    """
+    Coordinates and values of an event's locations that have coordinates.
+
+    Returns:
+        tuple: lons, lats and {field: values} arrays; missing values are NaN.
+        Besides FIELDS, intensity_code holds the codes (see intensity.py).
+    """
+    locations = [location for location in event.get("affected_locations", [])
+                 if np.isfinite(_float(location.get("longitude"))) and np.isfinite(_float(location.get("latitude")))]
+    codes = intensity_codes(location.get("intensity") for location in locations)
+    values = {
+        "intensity_code": codes,
+        "intensity": intensity_values(codes),
+        "pga": np.array([_peak_horizontal(location, "pga") for location in locations], dtype=np.float64),
+        "pgv": np.array([_peak_horizontal(location, "pgv") for location in locations], dtype=np.float64),
+    }
+    lons = np.array([_float(location["longitude"]) for location in locations], dtype=np.float64)
+    lats = np.array([_float(location["latitude"]) for location in locations], dtype=np.float64)
+    return lons, lats, values
+
+
+@functools.lru_cache(maxsize=4)
+def cell_index(bounds=TAIWAN_BOUNDS, resolution=DEFAULT_RESOLUTION):
+    """GridIndex over the cell centers of a grid, built once per process and grid."""
+    lons, lats = grid_axes(bounds, resolution)
+    cell_lons, cell_lats = np.meshgrid(lons, lats)
+    return GridIndex(cell_lons.ravel(), cell_lats.ravel())
+
+
+def grid_event(event, bounds=TAIWAN_BOUNDS, resolution=DEFAULT_RESOLUTION, k=DEFAULT_K, power=DEFAULT_POWER,
+               max_distance_km=DEFAULT_MAX_DISTANCE_KM):
+    """
+    Interpolates an event onto the grid.
+
+    Returns:
+        dict: lons and lats (cell centers), and float32 rasters shaped
+        (len(lats), len(lons)): intensity (linear, see
+        intensity.INTENSITY_VALUES), intensity_code (its nearest level on the
+        event's scale), pga (gal), pgv (kine) and distance_km to the nearest
+        location. NaN where there is no data.
+    """
+    lons, lats = grid_axes(bounds, resolution)
+    shape = (len(lats), len(lons))
+    grid = {"lons": lons, "lats": lats}
+    point_lons, point_lats, values = location_values(event)
+
+    # (location, cell, distance) of every cell within reach of a location,
+    # ranked per cell by distance; the k nearest of a cell carry weight
+    hits = cell_index(tuple(bounds), resolution).query_radius(point_lons, point_lats, max_distance_km)
+    cells = np.concatenate([np.empty(0, dtype=np.int64)] + [indices for indices, _ in hits])
+    points = np.repeat(np.arange(len(hits)), [len(indices) for indices, _ in hits])
+    distances = np.concatenate([np.empty(0)] + [distances for _, distances in hits])
+    order = np.lexsort((distances, cells))
+    cells, points, distances = cells[order], points[order], distances[order]
+    rank = np.arange(len(cells)) - np.searchsorted(cells, cells)
+    keep = rank < k
+    cells, points, distances, first = cells[keep], points[keep], distances[keep], rank[keep] == 0
+    weights = np.maximum(distances, MIN_DISTANCE_KM) ** -power
+
+    size = shape[0] * shape[1]
+    for name in FIELDS:
+        field = values[name][points]
+        if name != "intensity":
+            field = np.log10(np.where(field > 0, field, np.nan))
+        usable = ~np.isnan(field)
+        total = np.bincount(cells[usable], weights[usable], minlength=size)
+        weighted = np.bincount(cells[usable], weights[usable] * field[usable], minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(total > 0, weighted / total, np.nan)
+        if name != "intensity":
+            mean = 10 ** mean
+        grid[name] = mean.reshape(shape).astype(np.float32)
+    split = split_scale(values["intensity_code"], event.get("timestamp"))
+    grid["intensity_code"] = nearest_codes(grid["intensity"], split).astype(np.float32)
+    nearest = np.full(size, np.nan)
+    nearest[cells[first]] = distances[first]
+    grid["distance_km"] = nearest.reshape(shape).astype(np.float32)
+    metrics.incr("grid.events")
+    metrics.incr("grid.locations", len(point_lons))
+    return grid
+
+
+def intensity_labels(codes):
+    """Labels (see intensity.py) of an intensity_code raster; None where NaN."""
+    codes = np.asarray(codes)
+    labels = np.full(codes.shape, None, dtype=object)
+    valid = ~np.isnan(codes)
+    labels[valid] = [intensity_label(code) for code in np.rint(codes[valid]).astype(np.int64)]
+    return labels
+
+
+def cache_key(fingerprint, bounds, resolution, k, power, max_distance_km):
+    """Short hash of what a cached raster depends on."""
+    settings = [GRID_VERSION, fingerprint, list(bounds), resolution, k, power, max_distance_km]
+    return hashlib.sha256(json.dumps(settings).encode("utf-8")).hexdigest()[:16]
+
+
+def save_grid(path, grid):
+    """Writes a raster dict as a compressed npz, atomically."""
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **grid)
+    file_executor.write_atomic(path, buffer.getvalue())
+
+
+def _save_replacing(path, event_id, grid):
+    """Caches an event's rasters and removes those it had under other keys."""
+    save_grid(path, grid)
+    for stale in glob.glob(os.path.join(os.path.dirname(path), glob.escape(event_id) + "-*.npz")):
+        if stale != path:
+            os.remove(stale)
+
+
+def load_grid(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+# Event loader per source in this process; worker processes build their own
+_loaders = {}
+
+
+def grid_to_cache(item, unified_dir, store, settings):
+    """
+    Grids one event of a unified directory or packed store into its cache
+    file, replacing the rasters of other keys; the per-event work of
+    IntensityGridder.build(), run on its executor.
+
+    Args:
+        item: (event_id, cache path).
+
+    Returns:
+        bool: Whether the event was gridded.
+    """
+    event_id, cache_path = item
+    source = (unified_dir, store)
+    if source not in _loaders:
+        _loaders[source] = (store_source(store) if store else directory_source(unified_dir))[1]
+    try:
+        grid = grid_event(_loaders[source](event_id), **settings)
+    except (OSError, ValueError) as e:
+        metrics.warn(f"Could not grid {event_id}: {e}")
+        return False
+    _save_replacing(cache_path, event_id, grid)
+    metrics.detail(f"Gridded {event_id} -> {cache_path}")
+    return True
+
+
+class IntensityGridder:
+    """
+    Cached rasters of the events of an EarthquakeCatalog.
+
+    Args:
+        catalog: EarthquakeCatalog the events and their fingerprints come from.
+        cache_dir: Directory of the {event_id}-{key}.npz rasters.
+        bounds, resolution, k, power, max_distance_km: Grid settings, see
+            grid_event().
+    """
+
+    def __init__(self, catalog, cache_dir=DEFAULT_CACHE_DIR, bounds=TAIWAN_BOUNDS, resolution=DEFAULT_RESOLUTION,
+                 k=DEFAULT_K, power=DEFAULT_POWER, max_distance_km=DEFAULT_MAX_DISTANCE_KM):
+        self.catalog = catalog
+        self.cache_dir = cache_dir
+        self.settings = {"bounds": tuple(bounds), "resolution": resolution, "k": k, "power": power,
+                         "max_distance_km": max_distance_km}
+        self.stats = {"hits": 0, "gridded": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, event_id):
+        """Cache file of an event's rasters for its current fingerprint; raises KeyError if unknown."""
+        key = cache_key(self.catalog.fingerprints[event_id], **self.settings)
+        return os.path.join(self.cache_dir, f"{event_id}-{key}.npz")
+
+    def get(self, event_id):
+        """The rasters of an event (see grid_event()), from the cache or gridded and cached now."""
+        path = self.path(event_id)
+        if os.path.exists(path):
+            self.stats["hits"] += 1
+            metrics.incr("grid.cache_hits")
+            return load_grid(path)
+        grid = grid_event(self.catalog.get(event_id), **self.settings)
+        _save_replacing(path, event_id, grid)
+        self.stats["gridded"] += 1
+        return grid
+
+    def build(self, event_ids=None, executor=None):
+        """
+        Grids the given events (default: all) that are not cached yet, on
+        the `executor` (see executor.py), serially by default.
+
+        Returns:
+            dict: Counts of gridded, cached (already up to date) and failed events.
+        """
+        executor = executor or file_executor.FileExecutor(1, name="grid")
+        event_ids = list(self.catalog.headers) if event_ids is None else list(event_ids)
+        items = [(event_id, self.path(event_id)) for event_id in event_ids]
+        missing = [item for item in items if not os.path.exists(item[1])]
+        # Input bytes per event, for chunking
+        if self.catalog.store:
+            entries = EventStore(self.catalog.store).entries
+            sizes = [entries[event_id]["length"] for event_id, _ in missing]
+        else:
+            sizes = [os.path.getsize(os.path.join(self.catalog.unified_dir, f"{event_id}.json"))
+                     for event_id, _ in missing]
+        task = functools.partial(grid_to_cache, unified_dir=self.catalog.unified_dir, store=self.catalog.store,
+                                 settings=self.settings)
+        counts = {"gridded": 0, "cached": len(event_ids) - len(missing), "failed": 0}
+        for _, gridded in executor.map(task, missing, sizes):
+            counts["gridded" if gridded else "failed"] += 1
+        self.stats["gridded"] += counts["gridded"]
+        return counts
+
+
+def summarize_grid(grid, resolution=DEFAULT_RESOLUTION):
+    """Cells with data, peak values and area (km²) per intensity level of a grid, as report lines."""
+    codes = grid["intensity_code"]
+    covered = int(np.count_nonzero(~np.isnan(codes)))
+    if not covered:
+        return ["no locations with coordinates"]
+    # Cell area shrinks with the cosine of the latitude
+    cell_km2 = (resolution * KM_PER_DEGREE) ** 2 * np.cos(np.radians(grid["lats"]))[:, None] * np.ones_like(codes)
+    lines = [f"{covered} cells with data, max intensity {intensity_label(int(np.rint(np.nanmax(codes))))}"]
+    for name, unit in (("pga", "gal"), ("pgv", "kine")):
+        if np.any(~np.isnan(grid[name])):
+            lines.append(f"max {name.upper()} {np.nanmax(grid[name]):.2f} {unit}")
+    levels = np.rint(codes)
+    for code in np.unique(levels[~np.isnan(levels)]).astype(int):
+        lines.append(f"intensity {intensity_label(code)}: {cell_km2[levels == code].sum():.0f} km²")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interpolated intensity, PGA and PGV rasters per event.")
+    parser.add_argument("--store", help="packed event store to read instead of --unified-dir")
+    parser.add_argument("--unified-dir", default="./unified_earthquake_data")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--resolution", type=float, default=DEFAULT_RESOLUTION, help="cell size in degrees")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="nearest locations per cell")
+    parser.add_argument("--power", type=float, default=DEFAULT_POWER, help="inverse-distance weighting power")
+    parser.add_argument("--max-distance", type=float, default=DEFAULT_MAX_DISTANCE_KM,
+                        help="km from the nearest location beyond which cells stay empty")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="grid every matching event not cached yet")
+    build.add_argument("--start", help="ISO date or date-time, inclusive")
+    build.add_argument("--end", help="ISO date or date-time, exclusive")
+    build.add_argument("--min-magnitude", type=float)
+    build.add_argument("--county", nargs="*")
+    file_executor.add_arguments(build)
+    show = subparsers.add_parser("show", help="summarize the rasters of one event")
+    show.add_argument("event_id")
+    show.add_argument("--output", help="also write the rasters to this .npz file")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+
+    start = time.perf_counter()
+    catalog = EarthquakeCatalog(args.unified_dir, args.store)
+    gridder = IntensityGridder(catalog, args.cache_dir, resolution=args.resolution, k=args.k, power=args.power,
+                               max_distance_km=args.max_distance)
+    if args.command == "build":
+        headers = catalog.select(start=args.start, end=args.end, min_magnitude=args.min_magnitude,
+                                 county=args.county)
+        executor = file_executor.from_args(args, "grid")
+        with metrics.stage("grid"):
+            counts = gridder.build([header["event_id"] for header in headers], executor)
+        metrics.info(f"{counts['gridded']} events gridded, {counts['cached']} cached, {counts['failed']} failed "
+                     f"in {time.perf_counter() - start:.2f}s; rasters in {args.cache_dir}")
+        metrics.info(executor.report())
+    else:
+        try:
+            grid = gridder.get(args.event_id)
+        except KeyError:
+            parser.error(f"No event {args.event_id!r}")
+        metrics.info(f"{args.event_id}: {'cached' if gridder.stats['hits'] else 'gridded'} "
+                     f"in {(time.perf_counter() - start) * 1e3:.1f} ms ({gridder.path(args.event_id)})")
+        for line in summarize_grid(grid, args.resolution):
+            metrics.info(f"  {line}")
+        if args.output:
+            save_grid(args.output, grid)
+    metrics.finish()
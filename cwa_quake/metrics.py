@@ -0,0 +1,214 @@
+"""
+Run instrumentation shared by the scripts: counters, histograms and timers
+in one process-wide registry, leveled console output instead of a print per
+file, a machine-readable metrics JSON at the end of a run, and opt-in
+cProfile / tracemalloc per stage.
+
+A script adds the common flags and wraps its work in a stage:
+
+    parser = argparse.ArgumentParser(...)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+    with metrics.stage("parse"):
+        ...
+    metrics.finish()
+
+Metric names are "{stage}.{what}", e.g. parse.files, parse.stations,
+http.latency_seconds.
+"""
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+QUIET, NORMAL, VERBOSE = 0, 1, 2
+
+# Allocation sites listed per stage with --trace-memory
+TOP_ALLOCATIONS = 10
+
+# Observations kept per histogram for its percentiles (the most recent ones),
+# so long-running processes such as watch.py stay bounded
+HISTOGRAM_WINDOW = 10000
+
+
+class Histogram:
+    """Count, sum, min and max of every observation, and the last HISTOGRAM_WINDOW for percentiles."""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0
+        self.min = self.max = None
+        self.window = deque(maxlen=HISTOGRAM_WINDOW)
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.window.append(value)
+
+    def update(self, other):
+        """Adds the observations of another Histogram."""
+        if not other.count:
+            return
+        self.count += other.count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.window.extend(other.window)
+
+    def summary(self):
+        ordered = sorted(self.window)
+        n = len(ordered)
+        return {
+            "count": self.count, "sum": self.sum, "min": self.min, "max": self.max, "mean": self.sum / self.count,
+            **{f"p{q}": ordered[min(n - 1, int(q / 100 * n))] for q in (50, 90, 99)},
+        }
+
+
+class Metrics:
+    """Thread-safe counters and histograms (see Histogram, summarized on snapshot)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+            self.stages = {}
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).add(value)
+
+    def merge(self, counters, histograms):
+        """Adds counters and Histograms recorded elsewhere, e.g. in a worker process."""
+        with self._lock:
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for name, histogram in histograms.items():
+                self.histograms.setdefault(name, Histogram()).update(histogram)
+
+    @contextmanager
+    def timer(self, name):
+        """Observes the wall time of the block, in seconds, into histogram `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Counters, histogram summaries (count, sum, min, max, mean, p50, p90, p99) and stages."""
+        with self._lock:
+            histograms = {name: histogram.summary() for name, histogram in self.histograms.items()}
+            return {"counters": dict(self.counters), "histograms": histograms, "stages": dict(self.stages)}
+
+
+metrics = Metrics()
+incr = metrics.incr
+observe = metrics.observe
+timer = metrics.timer
+
+_settings = {"verbosity": NORMAL, "metrics_file": None, "profile_dir": None, "trace_memory": False}
+
+
+def configure(quiet=False, verbose=False, metrics_file=None, profile_dir=None, trace_memory=False):
+    """
+    Sets the output level (quiet: errors only; verbose: a line per file too),
+    the metrics JSON written by finish(), and the per-stage profiling options.
+    """
+    _settings["verbosity"] = QUIET if quiet else VERBOSE if verbose else NORMAL
+    _settings["metrics_file"] = metrics_file
+    _settings["profile_dir"] = profile_dir
+    _settings["trace_memory"] = trace_memory
+
+
+def add_arguments(parser):
+    """Adds --quiet, --verbose, --metrics, --profile and --trace-memory to an argparse parser."""
+    group = parser.add_argument_group("instrumentation")
+    group.add_argument("--quiet", "-q", action="store_true", help="only print errors")
+    group.add_argument("--verbose", "-v", action="store_true", help="also print a line per file")
+    group.add_argument("--metrics", metavar="FILE", help="write counters, histograms and stage timings as JSON")
+    group.add_argument("--profile", metavar="DIR", help="cProfile each stage into DIR/{stage}.prof")
+    group.add_argument("--trace-memory", action="store_true",
+                       help="record peak traced memory and top allocation sites per stage")
+
+
+def configure_from_args(args):
+    configure(args.quiet, args.verbose, args.metrics, args.profile, args.trace_memory)
+
+
+def info(message):
+    """Summary-level output; suppressed by --quiet."""
+    if _settings["verbosity"] >= NORMAL:
+        print(message)
+
+
+def detail(message):
+    """Per-file output; only printed with --verbose."""
+    if _settings["verbosity"] >= VERBOSE:
+        print(message)
+
+
+def warn(message):
+    """Errors and warnings, always printed to stderr."""
+    print(message, file=sys.stderr)
+
+
+@contextmanager
+def stage(name):
+    """
+    Times a stage into metrics.stages[name], profiling it with cProfile
+    and/or tracemalloc when enabled by configure().
+    """
+    profiler = None
+    if _settings["profile_dir"]:
+        os.makedirs(_settings["profile_dir"], exist_ok=True)
+        profiler = cProfile.Profile()
+    tracing = _settings["trace_memory"] and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        entry = {"seconds": time.perf_counter() - start}
+        if profiler:
+            entry["profile"] = os.path.join(_settings["profile_dir"], f"{name}.prof")
+            profiler.dump_stats(entry["profile"])
+        if tracing:
+            entry["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+            entry["top_allocations"] = [
+                {"site": str(stat.traceback[0]), "bytes": stat.size, "count": stat.count}
+                for stat in tracemalloc.take_snapshot().statistics("lineno")[:TOP_ALLOCATIONS]
+            ]
+            tracemalloc.stop()
+        with metrics._lock:
+            metrics.stages[name] = entry
+
+
+def finish():
+    """Writes the metrics JSON if one was configured; returns the snapshot."""
+    snapshot = metrics.snapshot()
+    if _settings["metrics_file"]:
+        with open(_settings["metrics_file"], 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2)
+        info(f"Metrics written to {_settings['metrics_file']}")
+    return snapshot
@@ -0,0 +1,193 @@
+import os
+import json
+import re
+import glob
+import argparse
+import functools
+from datetime import datetime
+from itertools import chain, islice
+
+from . import executor as file_executor
+from . import metrics
+from .build_ledger import open_ledger, plan_build, record_build, remove_orphans
+from .station_parser import HEADER_LINES, parse_station_lines, read_header
+from .station_registry import DEFAULT_REGISTRY, open_registry, record_event, sighting
+
+def parse_earthquake_file(filepath, archive=None):
+    """
+    Parse earthquake data text file into a structured JSON format.
+    With a raw archive (see raw_archive.py), a file archived under its
+    name is read from the archive instead of the disk.
+    """
+    size = 0
+    try:
+        with metrics.timer("parse.file_seconds"):
+            name = os.path.basename(filepath)
+            if archive is not None and name in archive:
+                file = archive.open_text(name, 'big5')
+                size = len(file.getvalue())
+            else:
+                # Open file with Big5 encoding instead of UTF-8
+                file = open(filepath, 'r', encoding='big5', errors='replace')
+                size = os.path.getsize(filepath)
+            with file:
+                result = _parse_earthquake_stream(filepath, file)
+    except Exception as e:
+        metrics.warn(f"Error parsing {filepath}: {str(e)}")
+        result = None
+    metrics.incr("parse.files")
+    metrics.incr("parse.bytes", size)
+    if result is None:
+        metrics.incr("parse.errors")
+    else:
+        metrics.incr("parse.stations", len(result["stations"]))
+    return result
+
+def _parse_earthquake_stream(filepath, file):
+    """Parses an open earthquake txt file line by line (see parse_earthquake_file)."""
+    head = list(islice(file, HEADER_LINES + 1))
+    if len(head) < HEADER_LINES + 1:  # At least header info should be present
+        metrics.warn(f"File {filepath} seems incomplete. Skipping.")
+        return None
+    
+    # Extract filename to get earthquake ID
+    filename = os.path.basename(filepath)
+    earthquake_id = filename.split('_')[1].split('.')[0] if '_' in filename else None
+    
+    # Parse header information
+    header_data = read_header(head[:HEADER_LINES])
+    
+    # Extract coordinates and clean values
+    lat_match = re.search(r'(\d+\.\d+)', header_data.get('Lat', '0'))
+    lon_match = re.search(r'(\d+\.\d+)', header_data.get('Lon', '0'))
+    
+    # Parse timestamp
+    timestamp = None
+    if 'Origin Time' in header_data:
+        try:
+            time_str = header_data['Origin Time']
+            timestamp = datetime.strptime(time_str, '%Y/%m/%d %H:%M:%S').isoformat()
+        except ValueError:
+            metrics.warn(f"Could not parse timestamp: {header_data.get('Origin Time')}")
+    
+    # Create result object with metadata
+    result = {
+        "earthquake_id": earthquake_id,
+        "timestamp": timestamp,
+        "latitude": float(lat_match.group(1)) if lat_match else None,
+        "longitude": float(lon_match.group(1)) if lon_match else None,
+        "depth_km": float(header_data.get('Depth', '0').replace('km', '')) if 'Depth' in header_data else None,
+        "magnitude": float(header_data.get('Mag', '0')) if 'Mag' in header_data else None,
+        "stations": []
+    }
+    
+    # Parse station data (lines after header)
+    for station in parse_station_lines(chain(head[HEADER_LINES:], file)):
+        # Add station to the result
+        # Filter stations based on Staname
+        # if station.get("Staname") in ["新竹市", "臺南市", "臺北市", "臺中市"]:
+        #     result["stations"].append(station)
+
+        result["stations"].append(station)
+        
+    return result
+
+def parse_to_json(file_path, output_dir):
+    """
+    Parses one txt file into {output_dir}/{name}.json, written atomically.
+
+    Returns:
+        tuple: (output path, number of stations, registry sighting) or None
+        if the file could not be parsed.
+    """
+    metrics.detail(f"Processing {file_path}...")
+    data = parse_earthquake_file(file_path)
+    if not data:
+        return None
+    # Create output filename
+    filename = os.path.basename(file_path)
+    output_filename = os.path.splitext(filename)[0] + '.json'
+    output_path = os.path.join(output_dir, output_filename)
+
+    # Write to JSON file with ensure_ascii=False to preserve Chinese characters
+    file_executor.write_atomic(output_path, json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8'))
+    metrics.detail(f"Created {output_path}")
+    return output_path, len(data["stations"]), sighting(data)
+
+def process_earthquake_files(input_dir, output_dir=None, ledger=None, registry=None, executor=None):
+    """
+    Process all earthquake data files in the input directory and 
+    save JSON results to the output directory
+
+    With a build ledger connection (see build_ledger.py) only new or modified
+    txt files are parsed, and JSON files whose txt file is gone are deleted.
+    With a station registry connection (see station_registry.py) the
+    stations of every parsed file are recorded in it, in file order.
+    Files are parsed on the `executor` (see executor.py), serially by default.
+    """
+    if output_dir is None:
+        output_dir = os.path.join(input_dir, 'json')
+    executor = executor or file_executor.FileExecutor(1, name="parse")
+    
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Get all .txt files in the directory
+    file_paths = glob.glob(os.path.join(input_dir, '*.txt'))
+    if ledger is not None:
+        for removed in remove_orphans(ledger, "parse", file_paths):
+            metrics.detail(f"Removed orphaned {removed}")
+        to_build, skipped = plan_build(ledger, "parse", file_paths)
+        metrics.info(f"{len(to_build)} new or modified files, {skipped} up to date")
+    else:
+        to_build = [(file_path, None) for file_path in file_paths]
+
+    parsed = stations = 0
+    results = executor.map(functools.partial(parse_to_json, output_dir=output_dir),
+                           [file_path for file_path, _ in to_build])
+    for (_, result), (file_path, fingerprint) in zip(results, to_build):
+        if result:
+            output_path, station_count, seen = result
+            parsed += 1
+            stations += station_count
+            if registry is not None:
+                record_event(registry, os.path.splitext(os.path.basename(file_path))[0], seen)
+            if ledger is not None:
+                record_build(ledger, "parse", file_path, fingerprint, output_path)
+
+    if ledger is not None:
+        ledger.commit()
+    if registry is not None:
+        registry.commit()
+
+    metrics.info(f"Parsed {parsed} of {len(to_build)} files ({stations} stations). JSON saved in {output_dir}")
+    metrics.info(executor.report())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse CWA earthquake txt files into JSON.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only parse new or modified files, tracked in the build ledger")
+    parser.add_argument("--ledger", default="./build_ledger.sqlite")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY, help="station registry to update")
+    parser.add_argument("--no-registry", action="store_true", help="do not update the station registry")
+    file_executor.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+
+    # Directory containing earthquake data files
+    input_directory = './earthquake_data'
+    
+    # Directory for JSON output (will be created if it doesn't exist)
+    output_directory = './earthquake_data/json'
+    
+    ledger = open_ledger(args.ledger) if args.incremental else None
+    registry = None if args.no_registry else open_registry(args.registry)
+    with metrics.stage("parse"):
+        process_earthquake_files(input_directory, output_directory, ledger, registry,
+                                 file_executor.from_args(args, "parse"))
+    metrics.finish()
+    
+    # Alternatively, parse a single file:
+    # sample_file = '/home/user/tsmc/earthquake_data/2020_009.txt'
+    # result = parse_earthquake_file(sample_file)
+    # print(json.dumps(result, indent=2, ensure_ascii=False))
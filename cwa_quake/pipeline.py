@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Single-pass ingest: every source event goes through parse -> city tagging ->
+unification in memory, and only the unified record is written.
+
+Replaces running parse_earthquake_data.py, add_city_to_stations.py and
+unify_earthquake_json.py one after the other, each of which writes and
+re-reads a full JSON copy of every event.
+"""
+import argparse
+import contextlib
+import functools
+import glob
+import json
+import os
+import time
+from pathlib import Path
+
+from . import executor as file_executor
+from . import metrics
+from .add_city_to_stations import add_city_to_earthquake_data
+from .build_ledger import open_ledger, plan_build, record_build, remove_orphans
+from .event_store import EventStore
+from .parse_earthquake_data import parse_earthquake_file
+from .raw_archive import RawArchive, archive_sources
+from .regional_extractor import extract_regional_data
+from .site_motion import DEFAULT_COEFFICIENTS, coefficients_digest
+from .station_registry import DEFAULT_REGISTRY, open_registry, record_event, sighting
+from .unify_earthquake_json import save_unified_data, transform_detailed_station_data, transform_regional_intensity_data
+
+
+def _dump_intermediate(data, output_dir, name, write):
+    """Serializes an intermediate stage like the standalone scripts do; writes it if `write`."""
+    content = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    if write:
+        file_executor.write_atomic(os.path.join(output_dir, name), content)
+    return len(content)
+
+
+def unify_txt_event(file_path, registry=None, archive=None, registry_lock=None):
+    """
+    Parses, city-tags and unifies one station txt file; returns the unified
+    record or None. The parsed stations are recorded in the station registry
+    connection, if one is given, and committed; only that holds
+    `registry_lock`, if given. A file in the raw archive, if given, is read
+    from there.
+    """
+    data = parse_earthquake_file(file_path, archive)
+    if not data:
+        return None
+    if registry is not None:
+        with registry_lock or contextlib.nullcontext():
+            record_event(registry, Path(file_path).stem, data)
+            registry.commit()
+    data = add_city_to_earthquake_data(data)
+    return transform_detailed_station_data(data, Path(file_path).stem)
+
+
+def unify_regional_event(file_path, archive=None, coefficients=DEFAULT_COEFFICIENTS):
+    """
+    Unifies one regional JSON file, or a details page ({encoded_id}.html)
+    extracted again; returns the unified record or None. A file in the raw
+    archive, if given, is read from there. The locations are filled with
+    the site_motion `coefficients`, if they exist.
+    """
+    name = os.path.basename(file_path)
+    if archive is not None and name in archive:
+        content = archive.get(name)
+    else:
+        with open(file_path, 'rb') as f:
+            content = f.read()
+    if name.endswith('.html'):
+        data, _ = extract_regional_data([content])
+        event_id = name[:-len('.html')] + '_regional'
+    else:
+        data = json.loads(content)
+        event_id = Path(file_path).stem
+    if not data or not isinstance(data.get("locations"), list):
+        return None
+    return transform_regional_intensity_data(data, event_id, coefficients)
+
+
+# RawArchive per archive path in this process; worker processes open their own
+_archives = {}
+
+
+def build_event(source, output_dir, txt_dir, archive=None, intermediate=False, compare=False, keep=False,
+                coefficients=DEFAULT_COEFFICIENTS):
+    """
+    Runs one source through parse -> city tagging -> unification; the
+    per-file work of run_pipeline(), run on its executor.
+
+    Args:
+        archive: RawArchive, or the path of one (opened once per process).
+        keep: Return the unified record instead of writing it into
+            output_dir (for a packed store, appended by the caller).
+        coefficients: site_motion coefficients file for regional events.
+
+    Returns:
+        dict: unified (if keep), output and size (if not), the bytes of the
+        intermediate stages and the registry sighting of a txt file; None
+        if the source could not be unified.
+    """
+    if isinstance(archive, str):
+        if archive not in _archives:
+            _archives[archive] = RawArchive(archive)
+        archive = _archives[archive]
+    result = {"unified": None, "output": None, "size": 0, "intermediate_bytes": 0, "sighting": None}
+    try:
+        if source.endswith('.txt'):
+            data = parse_earthquake_file(source, archive)
+            if not data:
+                return None
+            result["sighting"] = sighting(data)
+            if intermediate or compare:
+                name = Path(source).stem + '.json'
+                result["intermediate_bytes"] += _dump_intermediate(data, os.path.join(txt_dir, 'json'), name,
+                                                                   intermediate)
+            data = add_city_to_earthquake_data(data)
+            if intermediate or compare:
+                result["intermediate_bytes"] += _dump_intermediate(data, os.path.join(txt_dir, 'json_with_city'),
+                                                                   name, intermediate)
+            unified = transform_detailed_station_data(data, Path(source).stem)
+        else:
+            unified = unify_regional_event(source, archive, coefficients)
+    except Exception as e:
+        metrics.warn(f"Error processing {source}: {e}")
+        unified = None
+    if unified is None:
+        return None
+    if keep:
+        result["unified"] = unified
+    else:
+        output_path, result["size"] = save_unified_data(unified, output_dir)
+        result["output"] = str(output_path)
+    return result
+
+
+def _store_output(store, event_id):
+    """Ledger output name of an event written to a packed store."""
+    return f"{store.path}#{event_id}"
+
+
+def run_pipeline(txt_dir='./earthquake_data', regional_dir='./earthquake_regional_data',
+                 output_dir='./unified_earthquake_data', intermediate=False, compare=False, ledger=None,
+                 store=None, registry=None, archive=None, executor=None, coefficients=DEFAULT_COEFFICIENTS):
+    """
+    Runs the fused pipeline over every station txt file and regional JSON file.
+
+    Args:
+        txt_dir: Directory with the {year}_{id}.txt station files.
+        regional_dir: Directory with the *_regional.json files.
+        output_dir: Directory for the unified JSON files.
+        intermediate: Also write {txt_dir}/json and {txt_dir}/json_with_city
+            as the standalone scripts do.
+        compare: Measure the bytes the intermediate files would take without
+            writing them, to compare with the three-script flow.
+        ledger: Optional build ledger connection; only new or changed sources
+            are processed and outputs of removed sources are deleted.
+        store: Optional EventStore (see event_store.py) to append the
+            unified events to instead of writing them into output_dir.
+        registry: Optional station registry connection (see
+            station_registry.py), updated with every parsed txt file.
+        archive: Optional RawArchive (see raw_archive.py) to read every
+            source from instead of txt_dir and regional_dir; regional
+            events are extracted again from their archived details pages.
+            Not combined with a ledger, which tracks loose files.
+        executor: FileExecutor (see executor.py) the sources are processed
+            on, serially by default. Outputs, the ledger, the registry and
+            the store are updated in source order either way.
+        coefficients: site_motion coefficients file the regional events
+            are filled with, if it exists; with a ledger, regional sources
+            are rebuilt when its content changes.
+
+    Returns:
+        dict: Run statistics (events, errors, skipped, bytes, elapsed_s).
+    """
+    if store is None:
+        os.makedirs(output_dir, exist_ok=True)
+    json_dir = os.path.join(txt_dir, 'json')
+    city_dir = os.path.join(txt_dir, 'json_with_city')
+    if intermediate:
+        os.makedirs(json_dir, exist_ok=True)
+        os.makedirs(city_dir, exist_ok=True)
+
+    if archive is not None:
+        sources = archive_sources(archive)
+    else:
+        sources = sorted(glob.glob(os.path.join(txt_dir, '*.txt'))) + sorted(glob.glob(os.path.join(regional_dir, '*.json')))
+    # Regional outputs also depend on the coefficients they were filled with
+    digest = coefficients_digest(coefficients)
+    depends = lambda source: "" if source.endswith('.txt') else digest
+    if ledger is not None and store is not None:
+        # Store outputs are "{store path}#{event_id}" entries of one file
+        stage = "pipeline-store"
+        stored = lambda output: output.rpartition("#")[2] in store
+        delete = lambda output: store.delete(output.rpartition("#")[2])
+        for removed in remove_orphans(ledger, stage, sources, stored, delete):
+            metrics.detail(f"Removed orphaned {removed}")
+        to_build, skipped = plan_build(ledger, stage, sources, stored, depends)
+    elif ledger is not None:
+        stage = "pipeline"
+        for removed in remove_orphans(ledger, stage, sources):
+            metrics.detail(f"Removed orphaned {removed}")
+        to_build, skipped = plan_build(ledger, stage, sources, depends=depends)
+    else:
+        to_build, skipped = [(source, None) for source in sources], 0
+
+    stats = {"events": 0, "errors": 0, "skipped": skipped, "bytes_written": 0, "intermediate_bytes": 0}
+    start = time.perf_counter()
+    executor = executor or file_executor.FileExecutor(1, name="pipeline")
+    sizes = None
+    if archive is not None:
+        archived = archive.sizes()
+        sizes = [archived.get(source, 0) for source, _ in to_build]
+        if executor.workers > 1:
+            archive = archive.path
+    task = functools.partial(build_event, output_dir=output_dir, txt_dir=txt_dir, archive=archive,
+                             intermediate=intermediate, compare=compare, keep=store is not None,
+                             coefficients=coefficients)
+    results = executor.map(task, [source for source, _ in to_build], sizes)
+    for (_, result), (source, fingerprint) in zip(results, to_build):
+        if result is None:
+            stats["errors"] += 1
+            continue
+        if registry is not None and result["sighting"] is not None:
+            record_event(registry, Path(source).stem, result["sighting"])
+        stats["intermediate_bytes"] += result["intermediate_bytes"]
+        if store is not None:
+            _, size = store.append(result["unified"])
+            output_path = _store_output(store, result["unified"]["event_id"])
+        else:
+            output_path, size = result["output"], result["size"]
+        stats["events"] += 1
+        stats["bytes_written"] += size
+        metrics.detail(f"Unified {source} -> {output_path}")
+        if ledger is not None:
+            record_build(ledger, stage, source, fingerprint, str(output_path), depends(source))
+
+    if ledger is not None:
+        ledger.commit()
+    if registry is not None:
+        registry.commit()
+    stats["elapsed_s"] = time.perf_counter() - start
+    if intermediate:
+        stats["bytes_written"] += stats["intermediate_bytes"]
+        stats["intermediate_bytes"] = 0
+    return stats
+
+
+def format_stats(stats, compare=False):
+    """Formats run_pipeline() statistics as a short report."""
+    elapsed = stats["elapsed_s"] or 1e-9
+    lines = [
+        f"Unified {stats['events']} events ({stats['errors']} errors, {stats['skipped']} up to date) "
+        f"in {elapsed:.2f}s: {stats['events'] / elapsed:.0f} events/s",
+        f"Bytes written: {stats['bytes_written'] / 1e6:.1f} MB",
+    ]
+    if compare:
+        three_script = stats["bytes_written"] + stats["intermediate_bytes"]
+        lines.append(f"Three-script flow writes {three_script / 1e6:.1f} MB "
+                     f"({stats['intermediate_bytes'] / 1e6:.1f} MB of intermediate JSON not written)")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse, city-tag and unify all events in one pass.")
+    parser.add_argument("--txt-dir", default="./earthquake_data")
+    parser.add_argument("--regional-dir", default="./earthquake_regional_data")
+    parser.add_argument("--output-dir", default="./unified_earthquake_data")
+    parser.add_argument("--store", help="append the unified events to this packed store instead of --output-dir")
+    parser.add_argument("--intermediate", action="store_true",
+                        help="also write earthquake_data/json and json_with_city")
+    parser.add_argument("--compare", action="store_true",
+                        help="report the bytes the three-script flow would write")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only process new or modified sources, tracked in the build ledger")
+    parser.add_argument("--ledger", default="./build_ledger.sqlite")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY, help="station registry to update")
+    parser.add_argument("--no-registry", action="store_true", help="do not update the station registry")
+    parser.add_argument("--archive", help="read every source from this raw archive (see raw_archive.py)")
+    parser.add_argument("--coefficients", default=DEFAULT_COEFFICIENTS,
+                        help="site_motion.py coefficients to fill regional events with (not filled if the file does not exist)")
+    file_executor.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    if args.archive and args.incremental:
+        parser.error("--incremental tracks the loose source files; it cannot be combined with --archive")
+
+    metrics.configure_from_args(args)
+
+    ledger = open_ledger(args.ledger) if args.incremental else None
+    executor = file_executor.from_args(args, "pipeline")
+    with metrics.stage("pipeline"):
+        stats = run_pipeline(args.txt_dir, args.regional_dir, args.output_dir,
+                             args.intermediate, args.compare, ledger,
+                             EventStore(args.store) if args.store else None,
+                             None if args.no_registry else open_registry(args.registry),
+                             RawArchive(args.archive) if args.archive else None,
+                             executor, args.coefficients)
+    metrics.info(format_stats(stats, args.compare))
+    metrics.info(executor.report())
+    metrics.finish()
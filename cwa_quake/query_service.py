@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Local HTTP query service over the unified events, for dashboards and
+alerting scripts that would otherwise re-open unified_earthquake_data/*.json.
+
+At startup the header of every event (time, magnitude, counties) is loaded
+from the earthquake_catalog.py header index into sorted in-memory arrays
+that filter queries are answered from; full event bodies are read on demand
+and kept in an LRU cache. The source is polled for new, changed and removed
+events, and only those are re-read.
+
+    GET /events?start=2024-04-01&end=2024-05-01&min_magnitude=5&county=花蓮縣&limit=100
+    GET /events/latest?limit=10[&min_magnitude=..&county=..]
+    GET /events/{event_id}
+    GET /counties?start=..&end=..&min_magnitude=..     events per affected county
+    GET /stats                                         index size, cache and latency figures
+
+Event lists are summaries, newest first. Dates are ISO dates or date-times.
+
+    python -m cwa_quake.query_service [--store unified_events.jsonl | --unified-dir ./unified_earthquake_data] [--port 8080]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from . import metrics
+from .earthquake_catalog import EarthquakeCatalog
+from .event_store import normalize_timestamp
+
+DEFAULT_PORT = 8080
+
+# Full event bodies kept in memory
+DEFAULT_CACHE_SIZE = 256
+
+# Events returned by a list query unless ?limit= says otherwise, and the cap
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 10000
+
+# Request latencies kept for the percentiles in /stats
+LATENCY_WINDOW = 10000
+
+MAX_REQUEST_LINE = 8192
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               500: "Internal Server Error"}
+
+
+class QueryError(Exception):
+    """A request the service cannot answer; carries the HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class EventIndex:
+    """
+    In-memory header index over a unified directory or a packed store (an
+    EarthquakeCatalog), with an LRU cache of full event bodies (kept as
+    encoded JSON, ready to send).
+    """
+
+    def __init__(self, unified_dir="./unified_earthquake_data", store=None, cache_size=DEFAULT_CACHE_SIZE):
+        self.catalog = EarthquakeCatalog(unified_dir, store, refresh=False)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._generation = 0  # bumped by every reload that changed events, under _cache_lock
+        self.stats = {"cache_hits": 0, "cache_misses": 0, "reloads": 0, "reloaded_events": 0,
+                      "last_reload_s": None}
+
+    @property
+    def snapshot(self):
+        return self.catalog.arrays
+
+    def reload(self):
+        """
+        Re-reads the events that are new or changed since the last reload and
+        drops the removed ones.
+
+        Returns:
+            set: IDs of the events that changed or were removed.
+        """
+        start = time.perf_counter()
+        changed = self.catalog.refresh()
+        if changed:
+            with self._cache_lock:
+                self._generation += 1
+                for event_id in changed:
+                    self._cache.pop(event_id, None)
+        self.stats["reloads"] += 1
+        self.stats["reloaded_events"] += len(changed)
+        self.stats["last_reload_s"] = time.perf_counter() - start
+        return changed
+
+    def body(self, event_id):
+        """
+        The full unified event as encoded JSON; raises KeyError if unknown,
+        or what reading it raises. A body read while a reload changed events
+        is returned but not cached, as it may predate the reload.
+        """
+        with self._cache_lock:
+            body = self._cache.get(event_id)
+            if body is not None:
+                self._cache.move_to_end(event_id)
+                self.stats["cache_hits"] += 1
+                return body
+            generation = self._generation
+        event = self.catalog.get(event_id)
+        self.stats["cache_misses"] += 1
+        body = json.dumps(event, ensure_ascii=False).encode("utf-8")
+        with self._cache_lock:
+            if generation != self._generation:
+                return body
+            self._cache[event_id] = body
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return body
+
+    def events(self, start=None, end=None, min_magnitude=None, county=None, limit=DEFAULT_LIMIT):
+        """Summaries of the matching events, newest first, and how many matched."""
+        snapshot = self.snapshot
+        positions = snapshot.select(start, end, min_magnitude, county)
+        newest = positions[::-1][:limit]
+        return [snapshot.summaries[i] for i in newest], len(positions)
+
+    def county_counts(self, start=None, end=None, min_magnitude=None):
+        """{county: number of matching events that affected it}."""
+        snapshot = self.snapshot
+        positions = snapshot.select(start, end, min_magnitude)
+        return {county: int(np.count_nonzero(column[positions]))
+                for county, column in sorted(snapshot.counties.items())}
+
+
+def _time_param(params, name):
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        return np.datetime64(normalize_timestamp(value), "s")
+    except ValueError:
+        raise QueryError(400, f"{name} must be an ISO date or date-time, got {value!r}")
+
+
+def _number_param(params, name, kind, default=None):
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        return kind(value)
+    except ValueError:
+        raise QueryError(400, f"{name} must be a number, got {value!r}")
+
+
+class QueryService:
+    """Routes GET requests to an EventIndex and keeps request latencies for /stats."""
+
+    def __init__(self, index):
+        self.index = index
+        self.started = time.time()
+        self.requests = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def handle(self, path, params):
+        """Answers one request; returns the JSON body as bytes or raises QueryError."""
+        parts = [unquote(part) for part in path.strip("/").split("/") if part]
+        if parts == ["events"] or parts == ["events", "latest"]:
+            limit = min(_number_param(params, "limit", int, 10 if len(parts) == 2 else DEFAULT_LIMIT), MAX_LIMIT)
+            events, matched = self.index.events(
+                None if len(parts) == 2 else _time_param(params, "start"),
+                None if len(parts) == 2 else _time_param(params, "end"),
+                _number_param(params, "min_magnitude", float), params.get("county"), max(limit, 0))
+            return _encode({"matched": matched, "events": events})
+        if len(parts) == 2 and parts[0] == "events":
+            try:
+                return self.index.body(parts[1])
+            except (KeyError, FileNotFoundError):
+                # FileNotFoundError: removed since the last reload
+                raise QueryError(404, f"No event {parts[1]}")
+            except (OSError, ValueError) as e:
+                metrics.warn(f"Could not read event {parts[1]}: {e}")
+                raise QueryError(500, f"Could not read event {parts[1]}")
+        if parts == ["counties"]:
+            return _encode(self.index.county_counts(_time_param(params, "start"), _time_param(params, "end"),
+                                                    _number_param(params, "min_magnitude", float)))
+        if parts == ["stats"]:
+            return _encode(self.stats())
+        raise QueryError(404, f"Unknown path {path}")
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1e3
+        return {
+            "events": len(self.index.snapshot.summaries),
+            "requests": self.requests,
+            "uptime_s": round(time.time() - self.started, 1),
+            "cached_bodies": len(self.index._cache),
+            **self.index.stats,
+            "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+        }
+
+    async def serve_connection(self, reader, writer):
+        """Serves HTTP/1.1 requests on one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line or len(request_line) > MAX_REQUEST_LINE:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                start = time.perf_counter()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                status, body = self._respond(method, target)
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+                writer.write(f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                             f"Content-Type: application/json; charset=utf-8\r\n"
+                             f"Content-Length: {len(body)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+                await writer.drain()
+                self.requests += 1
+                self.latencies.append(time.perf_counter() - start)
+                metrics.detail(f"{method} {target} {status} {(time.perf_counter() - start) * 1e3:.2f} ms")
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, method, target):
+        if method != "GET":
+            return 405, _encode({"error": "Only GET is supported"})
+        url = urlsplit(target)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            return 200, self.handle(url.path, params)
+        except QueryError as e:
+            return e.status, _encode({"error": str(e)})
+
+
+def _encode(value):
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+async def _reload_periodically(index, interval):
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            changed = await loop.run_in_executor(None, index.reload)
+        except Exception as e:
+            metrics.warn(f"Reload failed: {e}")
+            continue
+        if changed:
+            metrics.info(f"Reloaded {len(changed)} changed events in {index.stats['last_reload_s'] * 1e3:.0f} ms")
+
+
+async def serve(index, host="127.0.0.1", port=DEFAULT_PORT, reload_interval=5.0, started=None):
+    """
+    Serves queries over an already loaded index until cancelled, polling
+    the source every `reload_interval` seconds (0 disables reloading).
+    `started`, if given, is called with the bound (host, port).
+    """
+    service = QueryService(index)
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    reloader = asyncio.ensure_future(_reload_periodically(index, reload_interval)) if reload_interval > 0 else None
+    if started:
+        started(server.sockets[0].getsockname()[:2])
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if reloader:
+            reloader.cancel()
+
+
+def start_query_service(index, port=0, reload_interval=5.0):
+    """
+    Starts the service on a background thread with its own event loop.
+
+    Returns:
+        str: Base URL of the service.
+    """
+    bound = threading.Event()
+    address = []
+
+    def started(sockname):
+        address.append(sockname)
+        bound.set()
+
+    threading.Thread(target=lambda: asyncio.run(serve(index, "127.0.0.1", port, reload_interval, started)),
+                     daemon=True).start()
+    bound.wait()
+    host, port = address[0]
+    return f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP query service over the unified events.")
+    parser.add_argument("--store", help="packed event store to serve instead of --unified-dir")
+    parser.add_argument("--unified-dir", default="./unified_earthquake_data")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="event bodies kept in memory")
+    parser.add_argument("--reload-interval", type=float, default=5.0,
+                        help="seconds between checks for new or changed events (0 to disable)")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+
+    index = EventIndex(args.unified_dir, args.store, args.cache_size)
+    start = time.perf_counter()
+    index.reload()
+    metrics.info(f"Indexed {len(index.snapshot.summaries)} events in {time.perf_counter() - start:.2f}s; "
+                 f"serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(index, args.host, args.port, args.reload_interval))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Content-addressed archive of the raw downloads: station txt files, the
+details pages of the regional events (the HTML the regional JSON is
+extracted from) and, for events archived before pages were kept, their
+regional JSON.
+
+Payloads are compressed (lzma or gzip) and stored once per SHA-256 of their
+content; names map to payloads, so identical downloads share one blob. The
+archive is a single SQLite file, so a full re-parse (pipeline.py --archive)
+reads one file instead of thousands and needs no network.
+
+Names are the file names the loose copies have:
+
+    {year}_{id}.txt                  station txt file (Big5)
+    {encoded_id}.html                regional details page
+    {encoded_id}_regional.json       regional JSON, when no page was kept
+
+    python -m cwa_quake.raw_archive import [--txt-dir ./earthquake_data] [--regional-dir ./earthquake_regional_data]
+    python -m cwa_quake.raw_archive stats
+    python -m cwa_quake.raw_archive verify
+    python -m cwa_quake.raw_archive extract 2024_001.txt [--output 2024_001.txt]
+"""
+import argparse
+import glob
+import gzip
+import hashlib
+import io
+import lzma
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from . import metrics
+
+# One row per distinct payload, and one per name.
+#   blobs.sha256:  hex digest of the uncompressed payload
+#   blobs.codec:   "lzma" or "gzip"
+#   blobs.size:    uncompressed bytes
+#   payloads.url:  where the payload was fetched from, NULL for imported files
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    codec  TEXT NOT NULL,
+    size   INTEGER NOT NULL,
+    data   BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS payloads (
+    name        TEXT PRIMARY KEY,
+    sha256      TEXT NOT NULL,
+    url         TEXT,
+    archived_at REAL NOT NULL
+);
+"""
+
+DEFAULT_ARCHIVE = "./raw_archive.sqlite"
+
+CODECS = {
+    "lzma": (lzma.compress, lzma.decompress),
+    "gzip": (lambda data: gzip.compress(data, mtime=0), gzip.decompress),
+}
+
+
+def page_name(encoded_id):
+    """Archive name of a regional event's details page."""
+    return f"{encoded_id}.html"
+
+
+class RawArchive:
+    """
+    Thread-safe handle on an archive file; download handlers on worker
+    threads share one.
+
+    Args:
+        path: SQLite archive file, created if missing.
+        codec: Compression for new payloads ("lzma" or "gzip").
+    """
+
+    def __init__(self, path=DEFAULT_ARCHIVE, codec="lzma"):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}; one of {', '.join(CODECS)}")
+        self.path = path
+        self.codec = codec
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    def __contains__(self, name):
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM payloads WHERE name = ?", (name,)).fetchone() is not None
+
+    def names(self, pattern="*"):
+        """Archived names matching a glob pattern, sorted."""
+        with self._lock:
+            return [name for (name,) in self.conn.execute(
+                "SELECT name FROM payloads WHERE name GLOB ? ORDER BY name", (pattern,))]
+
+    def sizes(self):
+        """{name: uncompressed bytes} of every archived name."""
+        with self._lock:
+            return dict(self.conn.execute("SELECT p.name, b.size FROM payloads p JOIN blobs b ON b.sha256 = p.sha256"))
+
+    def put(self, name, data, url=None, commit=True):
+        """
+        Archives `data` under `name`, replacing what the name pointed to.
+        A payload already archived under any name is not stored again.
+        Batch callers pass commit=False and call commit() at the end.
+
+        Returns:
+            str: SHA-256 hex digest of the payload.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            stored = self.conn.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (digest,)).fetchone()
+        compressed = None if stored else CODECS[self.codec][0](data)
+        with self._lock:
+            if compressed is not None:
+                self.conn.execute("INSERT OR IGNORE INTO blobs (sha256, codec, size, data) VALUES (?, ?, ?, ?)",
+                                  (digest, self.codec, len(data), compressed))
+                metrics.incr("archive.stored_bytes", len(compressed))
+            else:
+                metrics.incr("archive.deduplicated")
+            self.conn.execute("INSERT OR REPLACE INTO payloads (name, sha256, url, archived_at) VALUES (?, ?, ?, ?)",
+                              (name, digest, url, time.time()))
+            if commit:
+                self.conn.commit()
+        metrics.incr("archive.payloads")
+        return digest
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+
+    def get(self, name):
+        """The payload archived under `name`; raises KeyError if there is none."""
+        with self._lock:
+            row = self.conn.execute("SELECT b.codec, b.data FROM payloads p JOIN blobs b ON b.sha256 = p.sha256 "
+                                    "WHERE p.name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return CODECS[row[0]][1](row[1])
+
+    def open_text(self, name, encoding="utf-8", errors="replace"):
+        """The payload under `name` as a text stream, like open(path, 'r')."""
+        return io.StringIO(self.get(name).decode(encoding, errors))
+
+    def stats(self):
+        """Payload and blob counts, uncompressed and stored bytes."""
+        with self._lock:
+            payloads, = self.conn.execute("SELECT COUNT(*) FROM payloads").fetchone()
+            blobs, size, stored = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blobs").fetchone()
+        return {"payloads": payloads, "blobs": blobs, "bytes": size, "stored_bytes": stored}
+
+    def verify(self):
+        """Decompresses every blob and checks its digest; returns the digests that do not match."""
+        with self._lock:
+            rows = self.conn.execute("SELECT sha256, codec, data FROM blobs").fetchall()
+        return [digest for digest, codec, data in rows
+                if hashlib.sha256(CODECS[codec][1](data)).hexdigest() != digest]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def import_files(archive, file_paths):
+    """
+    Archives loose files under their file names, skipping those already
+    archived with the same content.
+
+    Returns:
+        dict: Counts of added, unchanged and replaced names.
+    """
+    counts = {"added": 0, "unchanged": 0, "replaced": 0}
+    with archive._lock:
+        known = dict(archive.conn.execute("SELECT name, sha256 FROM payloads"))
+    for file_path in file_paths:
+        name = os.path.basename(file_path)
+        with open(file_path, "rb") as f:
+            data = f.read()
+        if known.get(name) == hashlib.sha256(data).hexdigest():
+            counts["unchanged"] += 1
+            continue
+        counts["replaced" if name in known else "added"] += 1
+        archive.put(name, data, commit=False)
+        metrics.detail(f"Archived {file_path}")
+    archive.commit()
+    return counts
+
+
+def archive_sources(archive):
+    """
+    Archive names to unify, one per event: every station txt file and, per
+    regional event, its details page, else its regional JSON.
+    """
+    names = archive.names()
+    pages = {name[:-len(".html")] for name in names if name.endswith(".html")}
+    return ([name for name in names if name.endswith(".txt")]
+            + [name for name in names if name.endswith(".html")]
+            + [name for name in names
+               if name.endswith("_regional.json") and name[:-len("_regional.json")] not in pages])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compressed, content-addressed archive of the raw downloads.")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE)
+    parser.add_argument("--codec", choices=sorted(CODECS), default="lzma", help="compression for new payloads")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add = subparsers.add_parser("import", help="archive the loose txt and regional JSON files")
+    add.add_argument("--txt-dir", default="./earthquake_data")
+    add.add_argument("--regional-dir", default="./earthquake_regional_data")
+    subparsers.add_parser("stats", help="payloads, blobs and compression ratio")
+    subparsers.add_parser("verify", help="check every blob against its digest")
+    extract = subparsers.add_parser("extract", help="write one payload out")
+    extract.add_argument("name")
+    extract.add_argument("--output", help="defaults to stdout")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+
+    archive = RawArchive(args.archive, args.codec)
+    start = time.perf_counter()
+    if args.command == "import":
+        file_paths = (sorted(glob.glob(os.path.join(args.txt_dir, "*.txt")))
+                      + sorted(glob.glob(os.path.join(args.regional_dir, "*_regional.json"))))
+        with metrics.stage("archive"):
+            counts = import_files(archive, file_paths)
+        metrics.info(f"{counts['added']} added, {counts['replaced']} replaced, {counts['unchanged']} unchanged "
+                     f"in {time.perf_counter() - start:.2f}s")
+    if args.command in ("import", "stats"):
+        stats = archive.stats()
+        metrics.info(f"{stats['payloads']} payloads in {stats['blobs']} blobs: {stats['bytes'] / 1e6:.1f} MB "
+                     f"stored as {stats['stored_bytes'] / 1e6:.1f} MB "
+                     f"({stats['bytes'] / max(stats['stored_bytes'], 1):.1f}x) in {args.archive}")
+    elif args.command == "verify":
+        bad = archive.verify()
+        metrics.info(f"{len(bad)} corrupt blobs" + (": " + ", ".join(bad) if bad else ""))
+    elif args.command == "extract":
+        try:
+            data = archive.get(args.name)
+        except KeyError:
+            parser.error(f"No payload {args.name!r} in {args.archive}")
+        if args.output:
+            with open(args.output, "wb") as f:
+                f.write(data)
+        else:
+            sys.stdout.buffer.write(data)
+    archive.close()
+    metrics.finish()
@@ -0,0 +1,99 @@
+import codecs
+import re
+from collections import namedtuple
+
+# One entry of a details page's locationList, in page order. Values are kept
+# as the page prints them, which is what earthquake_regional_data/*.json stores.
+RegionalLocation = namedtuple("RegionalLocation", ["latitude", "longitude", "county", "intensity", "location_name"])
+
+# All five variables in one pattern. locationList may span many lines; the
+# scalar variables are single-line strings.
+_VARIABLE_RE = re.compile(
+    r"var (?:(lat|lon|mag|maxIntensity) = '([^'\n]*)';|locationList = \[(.*?)\];)",
+    re.DOTALL,
+)
+_LOCATION_RE = re.compile(r"\['(.*?)', '(.*?)', '(.*?)', '(.*?)', '(.*?)'\]")
+
+_SCALARS = ("lat", "lon", "mag", "maxIntensity")
+
+# Keep this much unscanned text between chunks so a "var ..." split across
+# two chunks is still found
+_OVERLAP = 64
+
+
+class RegionalPageExtractor:
+    """
+    Incrementally extracts lat, lon, mag, maxIntensity and locationList from
+    a details page fed in chunks. feed() returns True once all five have been
+    seen, at which point the rest of the page does not need to be read.
+    """
+
+    def __init__(self, encoding="utf-8"):
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self.buffer = ""
+        self.values = {}
+        self.locations = None
+        self.bytes_read = 0
+
+    @property
+    def complete(self):
+        return self.locations is not None and len(self.values) == len(_SCALARS)
+
+    def feed(self, chunk):
+        self.bytes_read += len(chunk)
+        self.buffer += self.decoder.decode(chunk)
+        return self._scan()
+
+    def close(self):
+        self.buffer += self.decoder.decode(b"", final=True)
+        return self._scan()
+
+    def _scan(self):
+        # Drop text before the last complete match, keeping enough of the
+        # tail (or of an unfinished "var locationList = [") to match later
+        consumed = 0
+        for match in _VARIABLE_RE.finditer(self.buffer):
+            name = match.group(1)
+            if name is not None:
+                self.values.setdefault(name, match.group(2))
+            elif self.locations is None:
+                self.locations = [RegionalLocation(*m.groups()) for m in _LOCATION_RE.finditer(match.group(3))]
+            consumed = match.end()
+        pending = self.buffer.find("var locationList = [", consumed)
+        if pending == -1 or self.locations is not None:
+            pending = max(consumed, len(self.buffer) - _OVERLAP)
+        self.buffer = self.buffer[pending:]
+        return self.complete
+
+    def result(self):
+        """
+        Returns:
+            dict: The earthquake_regional_data record, or None if the page had
+                  no locationList.
+        """
+        if self.locations is None:
+            return None
+        return {
+            'epicenter_lat': self.values.get('lat', ''),
+            'epicenter_lon': self.values.get('lon', ''),
+            'magnitude': self.values.get('mag', ''),
+            'max_intensity': self.values.get('maxIntensity', ''),
+            'locations': [location._asdict() for location in self.locations]
+        }
+
+
+def extract_regional_data(chunks, encoding="utf-8"):
+    """
+    Extracts the regional record from an iterable of byte chunks, stopping
+    as soon as every variable has been found.
+
+    Returns:
+        tuple: (record or None, bytes read)
+    """
+    extractor = RegionalPageExtractor(encoding)
+    for chunk in chunks:
+        if extractor.feed(chunk):
+            break
+    else:
+        extractor.close()
+    return extractor.result(), extractor.bytes_read
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Estimated ground motion for the locations of regional events, which carry an
+intensity but no distance, PGA or PGV.
+
+An attenuation relation
+
+    log10(Y) = c0 + c1 * M + c2 * log10(R) + c3 * R,   R = sqrt(Dist^2 + depth^2)
+
+is fitted by least squares to the peak horizontal PGA and PGV of the
+detailed-station records, and the coefficients are cached as JSON. Filling
+then computes distance, back azimuth and the estimated PGA/PGV of every
+regional location in one batch. Regional events have no depth; the median
+depth of the detailed events is assumed.
+
+Once the coefficients exist, unify_earthquake_json.py, pipeline.py and
+watch.py fill every regional event they write (their --coefficients); with
+--incremental the build ledger rebuilds the regional events when the file
+changes, so `fill` is only needed for runs without a ledger.
+
+    python -m cwa_quake.site_motion fit [--unified-dir ./unified_earthquake_data]
+    python -m cwa_quake.site_motion fill [--store unified_events.jsonl | --unified-dir ./unified_earthquake_data]
+"""
+import argparse
+import functools
+import json
+import os
+
+import numpy as np
+
+from .build_ledger import file_digest
+from .event_store import EventStore
+from .spatial_index import azimuth_deg, haversine_km
+from .station_columns import StationColumns, load_unified_events
+
+DEFAULT_COEFFICIENTS = "./site_motion_coefficients.json"
+
+# Closest hypocentral distance used, so log10(R) stays finite near the source
+MIN_DISTANCE_KM = 1.0
+
+
+def _design(magnitudes, distances):
+    distances = np.maximum(distances, MIN_DISTANCE_KM)
+    return np.column_stack([np.ones_like(distances), magnitudes, np.log10(distances), distances])
+
+
+def fit_attenuation(columns):
+    """
+    Fits the relation to the detailed-station records of a StationColumns.
+
+    Returns:
+        dict: {"pga": {...}, "pgv": {...}} each with coefficients, residual
+              sigma (log10 units) and record count, plus assumed_depth_km.
+    """
+    detailed = columns.event_source[columns.event] == 0
+    magnitudes = columns.per_record("event_magnitude").astype(np.float64)
+    depths = columns.per_record("event_depth").astype(np.float64)
+    hypocentral = np.hypot(columns.dist.astype(np.float64), depths)
+    model = {"assumed_depth_km": float(np.nanmedian(columns.event_depth[columns.event_source == 0]))}
+    for name, components in (("pga", (columns.pga_ns, columns.pga_ew)), ("pgv", (columns.pgv_ns, columns.pgv_ew))):
+        peak = np.fmax(np.abs(components[0]), np.abs(components[1])).astype(np.float64)
+        usable = detailed & np.isfinite(peak) & (peak > 0) & np.isfinite(magnitudes) & np.isfinite(hypocentral)
+        design = _design(magnitudes[usable], hypocentral[usable])
+        target = np.log10(peak[usable])
+        coefficients, _, _, _ = np.linalg.lstsq(design, target, rcond=None)
+        residuals = target - design @ coefficients
+        model[name] = {
+            "coefficients": coefficients.tolist(),
+            "sigma": float(residuals.std()),
+            "records": int(usable.sum()),
+        }
+    return model
+
+
+def save_model(model, path=DEFAULT_COEFFICIENTS):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(model, f, indent=2)
+
+
+def load_model(path=DEFAULT_COEFFICIENTS):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def cached_model(path=DEFAULT_COEFFICIENTS):
+    """load_model(path), loaded once per process and again when the file changes; None if it does not exist."""
+    if not path:
+        return None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    return _load_model_at(path, mtime)
+
+
+def coefficients_digest(path=DEFAULT_COEFFICIENTS):
+    """sha256 of the coefficients file, for the build ledger; '' if it does not exist."""
+    return file_digest(path) if path and os.path.exists(path) else ""
+
+
+@functools.lru_cache(maxsize=4)
+def _load_model_at(path, mtime):
+    return load_model(path)
+
+
+def predict(model, name, magnitudes, distances_km):
+    """Median PGA (gal) or PGV (cm/s) at hypocentral distances for magnitudes (arrays)."""
+    coefficients = np.asarray(model[name]["coefficients"])
+    return 10 ** (_design(np.asarray(magnitudes, dtype=np.float64),
+                          np.asarray(distances_km, dtype=np.float64)) @ coefficients)
+
+
+def fill_regional(events, model):
+    """
+    Fills distance_km and adds back_azimuth, pga_estimated and pgv_estimated
+    to every location of the regional events, and assumed_depth_km to the
+    events. All locations are computed in one vectorized batch.
+
+    Args:
+        events: List of unified event dicts, changed in place.
+        model: Coefficients from fit_attenuation() / load_model().
+
+    Returns:
+        list: The regional events that were filled.
+    """
+    regional = [event for event in events if event.get("source_type") == "regional_intensity"]
+    rows = []
+    for event in regional:
+        for location in event["affected_locations"]:
+            rows.append((event.get("epicenter_longitude"), event.get("epicenter_latitude"), event.get("magnitude"),
+                         location.get("longitude"), location.get("latitude")))
+    if not rows:
+        return regional
+    values = np.array([[np.nan if v in (None, "") else float(v) for v in row] for row in rows], dtype=np.float64)
+    epi_lon, epi_lat, magnitude, lon, lat = values.T
+
+    depth = model["assumed_depth_km"]
+    distance = haversine_km(epi_lon, epi_lat, lon, lat)
+    back_azimuth = azimuth_deg(lon, lat, epi_lon, epi_lat)
+    hypocentral = np.hypot(distance, depth)
+    pga = predict(model, "pga", magnitude, hypocentral)
+    pgv = predict(model, "pgv", magnitude, hypocentral)
+
+    def rounded(value):
+        return round(float(value), 2) if np.isfinite(value) else None
+
+    i = 0
+    for event in regional:
+        event["assumed_depth_km"] = depth
+        for location in event["affected_locations"]:
+            location["distance_km"] = rounded(distance[i])
+            location["back_azimuth"] = rounded(back_azimuth[i])
+            location["pga_estimated"] = rounded(pga[i])
+            location["pgv_estimated"] = rounded(pgv[i])
+            i += 1
+    return regional
+
+
+if __name__ == "__main__":
+    from .unify_earthquake_json import save_unified_data
+
+    parser = argparse.ArgumentParser(description="Fit and apply an attenuation relation for regional events.")
+    parser.add_argument("command", choices=["fit", "fill"])
+    parser.add_argument("--coefficients", default=DEFAULT_COEFFICIENTS)
+    parser.add_argument("--store", help="packed event store to read (and update) instead of --unified-dir")
+    parser.add_argument("--unified-dir", default="./unified_earthquake_data")
+    parser.add_argument("--refit", action="store_true", help="fit again even if coefficients are cached")
+    args = parser.parse_args()
+
+    events = list(load_unified_events(args.store, args.unified_dir))
+    if args.command == "fit" or args.refit or not os.path.exists(args.coefficients):
+        model = fit_attenuation(StationColumns.from_events(events))
+        save_model(model, args.coefficients)
+        for name in ("pga", "pgv"):
+            c0, c1, c2, c3 = model[name]["coefficients"]
+            print(f"log10({name.upper()}) = {c0:.3f} + {c1:.3f} M + {c2:.3f} log10(R) + {c3:.5f} R  "
+                  f"(sigma {model[name]['sigma']:.3f}, {model[name]['records']} records)")
+        print(f"Assumed depth for regional events: {model['assumed_depth_km']:.1f} km; saved to {args.coefficients}")
+    else:
+        model = load_model(args.coefficients)
+
+    if args.command == "fill":
+        filled = fill_regional(events, model)
+        if args.store:
+            store = EventStore(args.store)
+            for event in filled:
+                store.append(event)
+            store.compact()
+        else:
+            for event in filled:
+                save_unified_data(event, args.unified_dir)
+        print(f"Filled {sum(len(e['affected_locations']) for e in filled)} locations of {len(filled)} regional events")
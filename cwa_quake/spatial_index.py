@@ -0,0 +1,248 @@
+import argparse
+import glob
+import json
+import math
+import os
+from datetime import datetime
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Query points handled per vectorized batch; bounds the candidate arrays
+BATCH_SIZE = 4096
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    """Great-circle distance in km between (broadcastable) arrays of points in degrees."""
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def azimuth_deg(lon1, lat1, lon2, lat2):
+    """Initial bearing in degrees [0, 360) from point 1 towards point 2."""
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lon1, lat1, lon2, lat2))
+    dlon = lon2 - lon1
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+class GridIndex:
+    """
+    Fixed lon/lat grid over a set of points. Points are sorted by cell, so a
+    cell's points are one contiguous slice; queries gather the slices of the
+    cells that cover the search circle and filter them by haversine distance,
+    for a whole batch of query points at once.
+    """
+
+    def __init__(self, lons, lats, cell_deg=0.1):
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.cell_deg = float(cell_deg)
+        self.lon0 = self.lons.min() if len(self.lons) else 0.0
+        self.lat0 = self.lats.min() if len(self.lats) else 0.0
+        cols, rows = self._cells(self.lons, self.lats)
+        self.ncols = int(cols.max()) + 1 if len(cols) else 1
+        self.nrows = int(rows.max()) + 1 if len(rows) else 1
+        keys = rows * self.ncols + cols
+        self.order = np.argsort(keys, kind="stable")
+        self.cell_keys, self.cell_starts, self.cell_counts = np.unique(
+            keys[self.order], return_index=True, return_counts=True)
+        self.sorted_lons = self.lons[self.order]
+        self.sorted_lats = self.lats[self.order]
+
+    def __len__(self):
+        return len(self.lons)
+
+    def _cells(self, lons, lats):
+        cols = np.floor((lons - self.lon0) / self.cell_deg).astype(np.int64)
+        rows = np.floor((lats - self.lat0) / self.cell_deg).astype(np.int64)
+        return cols, rows
+
+    def _candidates(self, lons, lats, radius_km):
+        """
+        Returns (query, point, distance) arrays for every point within
+        `radius_km` of each query point.
+        """
+        # Query points outside the grid are moved onto its border: the cells
+        # around the border cell cover every cell the real point would
+        cols, rows = self._cells(lons, lats)
+        cols = np.clip(cols, 0, self.ncols - 1)
+        rows = np.clip(rows, 0, self.nrows - 1)
+        max_lat = min(89.0, float(np.abs(lats).max()) + radius_km / KM_PER_DEGREE)
+        reach_rows = min(self.nrows, int(math.ceil(radius_km / KM_PER_DEGREE / self.cell_deg)))
+        reach_cols = min(self.ncols, int(math.ceil(
+            radius_km / (KM_PER_DEGREE * math.cos(math.radians(max_lat))) / self.cell_deg)))
+        d_rows, d_cols = np.mgrid[-reach_rows:reach_rows + 1, -reach_cols:reach_cols + 1]
+
+        # (query, neighbouring cell) pairs that fall inside the grid
+        cand_rows = rows[:, None] + d_rows.ravel()[None, :]
+        cand_cols = cols[:, None] + d_cols.ravel()[None, :]
+        inside = (cand_rows >= 0) & (cand_rows < self.nrows) & (cand_cols >= 0) & (cand_cols < self.ncols)
+        query_ids = np.broadcast_to(np.arange(len(lons))[:, None], inside.shape)[inside]
+        keys = cand_rows[inside] * self.ncols + cand_cols[inside]
+
+        # Keep the pairs whose cell holds points
+        slots = np.searchsorted(self.cell_keys, keys)
+        slots[slots == len(self.cell_keys)] = 0
+        occupied = self.cell_keys[slots] == keys
+        query_ids, slots = query_ids[occupied], slots[occupied]
+
+        # Expand each (query, cell) pair into (query, point) pairs
+        counts = self.cell_counts[slots]
+        total = int(counts.sum())
+        pair_query = np.repeat(query_ids, counts)
+        offsets = np.repeat(self.cell_starts[slots] - (np.cumsum(counts) - counts), counts)
+        pair_point = np.arange(total) + offsets
+
+        distances = haversine_km(lons[pair_query], lats[pair_query],
+                                 self.sorted_lons[pair_point], self.sorted_lats[pair_point])
+        within = distances <= radius_km
+        return pair_query[within], self.order[pair_point[within]], distances[within]
+
+    def query_radius(self, lons, lats, radius_km, sort=False):
+        """
+        Finds the points within `radius_km` of each query point.
+
+        Args:
+            lons, lats: Query coordinates (scalars or arrays).
+            radius_km: Search radius.
+            sort: Order each query's matches by distance.
+
+        Returns:
+            list: One (indices, distances_km) pair of arrays per query point.
+        """
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        if not len(self):
+            return [(np.empty(0, dtype=np.int64), np.empty(0)) for _ in range(len(lons))]
+        results = []
+        for start in range(0, len(lons), BATCH_SIZE):
+            query, points, distances = self._candidates(lons[start:start + BATCH_SIZE],
+                                                        lats[start:start + BATCH_SIZE], radius_km)
+            order = np.lexsort((distances, query)) if sort else np.argsort(query, kind="stable")
+            query, points, distances = query[order], points[order], distances[order]
+            bounds = np.searchsorted(query, np.arange(min(BATCH_SIZE, len(lons) - start) + 1))
+            results.extend((points[lo:hi], distances[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:]))
+        return results
+
+    def query_knn(self, lons, lats, k=1):
+        """
+        Finds the `k` nearest points of each query point.
+
+        Returns:
+            tuple: (indices, distances_km), both shaped (n_queries, k) and
+                   ordered by distance; missing neighbours (fewer than k
+                   points in the index) are -1 / inf.
+        """
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        n = len(lons)
+        indices = np.full((n, k), -1, dtype=np.int64)
+        distances = np.full((n, k), np.inf)
+        if not len(self) or not n:
+            return indices, distances
+
+        # Start with a radius expected to hold about k points and double it
+        # for the queries that found fewer
+        lon_span = max(self.ncols * self.cell_deg, self.cell_deg) * KM_PER_DEGREE
+        lat_span = max(self.nrows * self.cell_deg, self.cell_deg) * KM_PER_DEGREE
+        radius = max(self.cell_deg * KM_PER_DEGREE / 2, math.sqrt(lon_span * lat_span * k / (math.pi * len(self))))
+        max_radius = math.pi * EARTH_RADIUS_KM
+        pending = np.arange(n)
+        while len(pending):
+            for start in range(0, len(pending), BATCH_SIZE):
+                batch = pending[start:start + BATCH_SIZE]
+                query, points, dist = self._candidates(lons[batch], lats[batch], radius)
+                order = np.lexsort((dist, query))
+                query, points, dist = query[order], points[order], dist[order]
+                first = np.searchsorted(query, query)
+                rank = np.arange(len(query)) - first
+                found = np.bincount(query, minlength=len(batch))
+                done = (found >= k) | (radius >= max_radius)
+                keep = (rank < k) & done[query]
+                indices[batch[query[keep]], rank[keep]] = points[keep]
+                distances[batch[query[keep]], rank[keep]] = dist[keep]
+                pending[start:start + len(batch)][done] = -1
+            pending = pending[pending >= 0]
+            radius = min(radius * 2, max_radius)
+        return indices, distances
+
+
+def station_coordinates_index(station_coordinates, cell_deg=0.1):
+    """
+    Builds a GridIndex over a {Stacode: [Longitude, Latitude]} dict, the
+    format of extract_station_coords.extract_coordinates_from_json().
+
+    Returns:
+        tuple: (GridIndex, list of station codes in index order)
+    """
+    codes = list(station_coordinates)
+    coords = np.array([station_coordinates[code] for code in codes], dtype=np.float64).reshape(-1, 2)
+    return GridIndex(coords[:, 0], coords[:, 1], cell_deg), codes
+
+
+def load_epicenters(unified_dir):
+    """
+    Reads the epicenters of the unified events.
+
+    Returns:
+        dict: Arrays event_id, timestamp (datetime64[s]), longitude, latitude
+              and magnitude, for events with a usable epicenter.
+    """
+    records = []
+    for file_path in sorted(glob.glob(os.path.join(unified_dir, '*.json'))):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        try:
+            lon = float(data.get("epicenter_longitude"))
+            lat = float(data.get("epicenter_latitude"))
+        except (TypeError, ValueError):
+            continue
+        magnitude = data.get("magnitude")
+        timestamp = data.get("timestamp") or ""
+        records.append((data.get("event_id"), timestamp.replace(" ", "T"), lon, lat,
+                        float(magnitude) if magnitude not in (None, "") else np.nan))
+    event_ids, timestamps, lons, lats, magnitudes = zip(*records) if records else ([], [], [], [], [])
+    return {
+        "event_id": np.array(event_ids, dtype=object),
+        "timestamp": np.array([t or "NaT" for t in timestamps], dtype="datetime64[s]"),
+        "longitude": np.array(lons, dtype=np.float64),
+        "latitude": np.array(lats, dtype=np.float64),
+        "magnitude": np.array(magnitudes, dtype=np.float64),
+    }
+
+
+if __name__ == "__main__":
+    from .extract_station_coords import load_station_coordinates
+
+    parser = argparse.ArgumentParser(description="Events and stations near a point.")
+    parser.add_argument("--lon", type=float, required=True)
+    parser.add_argument("--lat", type=float, required=True)
+    parser.add_argument("--radius", type=float, default=50.0, help="event search radius in km")
+    parser.add_argument("--since", help="only events from this date (YYYY-MM-DD)")
+    parser.add_argument("--nearest", type=int, default=5, help="number of nearest stations to list")
+    parser.add_argument("--unified-dir", default="./unified_earthquake_data")
+    parser.add_argument("--json-dir", default="./earthquake_data/json")
+    args = parser.parse_args()
+
+    epicenters = load_epicenters(args.unified_dir)
+    event_index = GridIndex(epicenters["longitude"], epicenters["latitude"])
+    (hits, distances), = event_index.query_radius(args.lon, args.lat, args.radius, sort=True)
+    if args.since:
+        recent = epicenters["timestamp"][hits] >= np.datetime64(datetime.strptime(args.since, "%Y-%m-%d"))
+        hits, distances = hits[recent], distances[recent]
+    print(f"{len(hits)} events within {args.radius} km:")
+    for i, distance in zip(hits, distances):
+        print(f"  {epicenters['event_id'][i]}  {epicenters['timestamp'][i]}  "
+              f"M{epicenters['magnitude'][i]:.1f}  {distance:.1f} km")
+
+    station_index, codes = station_coordinates_index(load_station_coordinates(args.json_dir))
+    nearest, distances = station_index.query_knn(args.lon, args.lat, args.nearest)
+    print(f"{args.nearest} nearest stations:")
+    for i, distance in zip(nearest[0], distances[0]):
+        if i >= 0:
+            print(f"  {codes[i]}  {distance:.1f} km")
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Columnar store of the station records of the unified events: one NumPy array
+per field instead of one dict per record, saved as a directory of .npy files
+that load memory-mapped.
+
+Per-record columns (one row per affected location):
+    event          int32    row in the event columns
+    station        int32    index into station_names (station code, or the
+                            location name for regional records), -1 if none
+    county         int32    index into county_names, -1 if unknown
+    intensity      uint8    intensity code (see intensity.py), INTENSITY_MISSING if none
+    longitude, latitude, dist, baz,
+    pga_v, pga_ns, pga_ew, pgv_v, pgv_ns, pgv_ew
+                   float32  NaN if missing
+
+Per-event columns (prefixed event_):
+    event_timestamp datetime64[s], event_magnitude, event_depth,
+    event_longitude, event_latitude float32, event_source uint8
+    (index into SOURCE_TYPES: 0 detailed_station, 1 regional_intensity,
+    2 merged by event_join.py)
+
+    python -m cwa_quake.station_columns build [--store unified_events.jsonl | --unified-dir ./unified_earthquake_data]
+    python -m cwa_quake.station_columns summary --by county [--since 2024-01-01] [--min-magnitude 5]
+"""
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+
+from .event_store import EventStore, normalize_timestamp
+from .intensity import INTENSITY_MISSING, exceedance, intensity_code, intensity_label
+from .spatial_index import azimuth_deg
+
+DEFAULT_COLUMNS_DIR = "./station_columns"
+
+SOURCE_TYPES = ["detailed_station", "regional_intensity", "merged"]
+
+FLOAT_FIELDS = {
+    "longitude": "longitude", "latitude": "latitude", "dist": "distance_km",
+    "pga_v": "pga_v", "pga_ns": "pga_ns", "pga_ew": "pga_ew",
+    "pgv_v": "pgv_v", "pgv_ns": "pgv_ns", "pgv_ew": "pgv_ew",
+}
+RECORD_COLUMNS = ["event", "station", "county", "intensity", "baz"] + list(FLOAT_FIELDS)
+EVENT_COLUMNS = ["event_timestamp", "event_magnitude", "event_depth",
+                 "event_longitude", "event_latitude", "event_source"]
+NAME_COLUMNS = ["event_ids", "station_names", "county_names"]
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class _Encoder:
+    """Dictionary-encodes strings in first-seen order."""
+
+    def __init__(self):
+        self.codes = {}
+
+    def __call__(self, value):
+        if not value:
+            return -1
+        return self.codes.setdefault(value, len(self.codes))
+
+    def names(self):
+        return np.array(list(self.codes), dtype=str)
+
+
+class StationColumns:
+    """Record, event and name columns as attributes; see the module docstring."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        for name, array in columns.items():
+            setattr(self, name, array)
+
+    def __len__(self):
+        return len(self.event)
+
+    @classmethod
+    def from_events(cls, events):
+        """Builds the columns from an iterable of unified event dicts."""
+        event_ids, event_rows, records = [], [], []
+        stations, counties = _Encoder(), _Encoder()
+        for data in events:
+            event_index = len(event_ids)
+            event_ids.append(data["event_id"])
+            event_rows.append((
+                normalize_timestamp(data.get("timestamp")) or "NaT",
+                _float(data.get("magnitude")), _float(data.get("depth_km")),
+                _float(data.get("epicenter_longitude")), _float(data.get("epicenter_latitude")),
+                SOURCE_TYPES.index(data.get("source_type")),
+            ))
+            for location in data.get("affected_locations", []):
+                records.append((
+                    event_index,
+                    stations(location.get("station_code") or location.get("location_name")),
+                    counties(location.get("county")),
+                    intensity_code(location.get("intensity")),
+                    *(_float(location.get(key)) for key in FLOAT_FIELDS.values()),
+                ))
+
+        timestamps, magnitudes, depths, lons, lats, sources = zip(*event_rows) if event_rows else ([],) * 6
+        columns = {
+            "event_timestamp": np.array(timestamps, dtype="datetime64[s]"),
+            "event_magnitude": np.array(magnitudes, dtype=np.float32),
+            "event_depth": np.array(depths, dtype=np.float32),
+            "event_longitude": np.array(lons, dtype=np.float32),
+            "event_latitude": np.array(lats, dtype=np.float32),
+            "event_source": np.array(sources, dtype=np.uint8),
+            "event_ids": np.array(event_ids, dtype=str),
+            "station_names": stations.names(),
+            "county_names": counties.names(),
+        }
+        fields = list(zip(*records)) if records else [[]] * (4 + len(FLOAT_FIELDS))
+        columns["event"] = np.array(fields[0], dtype=np.int32)
+        columns["station"] = np.array(fields[1], dtype=np.int32)
+        columns["county"] = np.array(fields[2], dtype=np.int32)
+        columns["intensity"] = np.array(fields[3], dtype=np.uint8)
+        for name, values in zip(FLOAT_FIELDS, fields[4:]):
+            columns[name] = np.array(values, dtype=np.float32)
+        # Back azimuth: bearing from the station towards the epicenter
+        events = columns["event"]
+        columns["baz"] = azimuth_deg(columns["longitude"], columns["latitude"],
+                                     columns["event_longitude"][events],
+                                     columns["event_latitude"][events]).astype(np.float32)
+        return cls(columns)
+
+    def save(self, columns_dir=DEFAULT_COLUMNS_DIR):
+        os.makedirs(columns_dir, exist_ok=True)
+        for name, array in self.columns.items():
+            np.save(os.path.join(columns_dir, f"{name}.npy"), array, allow_pickle=False)
+
+    @classmethod
+    def load(cls, columns_dir=DEFAULT_COLUMNS_DIR, mmap=True):
+        """Loads saved columns; with `mmap` the arrays are memory-mapped read-only."""
+        mode = "r" if mmap else None
+        return cls({
+            name: np.load(os.path.join(columns_dir, f"{name}.npy"), mmap_mode=mode, allow_pickle=False)
+            for name in RECORD_COLUMNS + EVENT_COLUMNS + NAME_COLUMNS
+        })
+
+    def per_record(self, name):
+        """A record column, or an event column broadcast to the records."""
+        if name.startswith("event_"):
+            return self.columns[name][self.event]
+        return self.columns[name]
+
+    def mask(self, county=None, station=None, min_intensity=None, since=None, until=None,
+             min_magnitude=None, source=None):
+        """
+        Boolean mask over the records matching all given conditions.
+
+        Args:
+            county, station: Name (or list of names) to keep.
+            min_intensity: Intensity value; keeps records at least as strong
+                (see intensity.threshold_code()).
+            since, until: Event time bounds (ISO strings), since <= t < until.
+            min_magnitude: Lowest event magnitude to keep.
+            source: One of SOURCE_TYPES.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        for values, names, wanted in ((self.county, self.county_names, county),
+                                      (self.station, self.station_names, station)):
+            if wanted is not None:
+                wanted = [wanted] if isinstance(wanted, str) else wanted
+                keep &= np.isin(values, np.nonzero(np.isin(names, wanted))[0])
+        if min_intensity is not None:
+            keep &= exceedance(self.intensity, min_intensity)
+        event_keep = np.ones(len(self.event_ids), dtype=bool)
+        if since is not None:
+            event_keep &= self.event_timestamp >= np.datetime64(normalize_timestamp(since))
+        if until is not None:
+            event_keep &= self.event_timestamp < np.datetime64(normalize_timestamp(until))
+        if min_magnitude is not None:
+            event_keep &= self.event_magnitude >= min_magnitude
+        if source is not None:
+            event_keep &= self.event_source == SOURCE_TYPES.index(source)
+        return keep & event_keep[self.event]
+
+    def group_by(self, by, field=None, reduce="count", mask=None):
+        """
+        Aggregates a field per county, station or event.
+
+        Args:
+            by: "county", "station" or "event".
+            field: Column to aggregate (record or event column); unused for "count".
+            reduce: "count", "max", "min", "mean" or "sum". NaN values and
+                missing intensities are ignored.
+            mask: Optional record mask from mask().
+
+        Returns:
+            dict: Group name -> aggregate, for groups with at least one value.
+        """
+        names = {"county": self.county_names, "station": self.station_names, "event": self.event_ids}[by]
+        groups = np.asarray(self.columns[by])
+        values = None if reduce == "count" else np.asarray(self.per_record(field))
+        valid = groups >= 0 if mask is None else mask & (groups >= 0)
+        if values is not None:
+            if field == "intensity":
+                valid &= values != INTENSITY_MISSING
+            elif values.dtype.kind == "f":
+                valid &= ~np.isnan(values)
+            values = values[valid]
+        groups = groups[valid]
+
+        counts = np.bincount(groups, minlength=len(names))
+        if reduce == "count":
+            result = counts
+        elif reduce in ("sum", "mean"):
+            result = np.bincount(groups, weights=values, minlength=len(names))
+            if reduce == "mean":
+                result = result / np.maximum(counts, 1)
+        elif reduce in ("max", "min"):
+            values = values.astype(np.float64)
+            result = np.full(len(names), -np.inf if reduce == "max" else np.inf)
+            (np.maximum if reduce == "max" else np.minimum).at(result, groups, values)
+        else:
+            raise ValueError(f"Unknown reduce: {reduce}")
+        return {str(names[i]): result[i].item() for i in np.nonzero(counts)[0]}
+
+
+def load_unified_events(store=None, unified_dir="./unified_earthquake_data"):
+    """Yields the unified events of a packed store if given, else of a unified directory."""
+    if store:
+        yield from EventStore(store)
+        return
+    for file_path in sorted(glob.glob(os.path.join(unified_dir, '*.json'))):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            yield json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar station records of the unified events.")
+    parser.add_argument("--columns-dir", default=DEFAULT_COLUMNS_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="build the columns from the unified events")
+    build.add_argument("--store", help="packed event store to read instead of --unified-dir")
+    build.add_argument("--unified-dir", default="./unified_earthquake_data")
+    summary = subparsers.add_parser("summary", help="per-group record count, max intensity and max PGA")
+    summary.add_argument("--by", choices=["county", "station", "event"], default="county")
+    summary.add_argument("--county", nargs="*")
+    summary.add_argument("--since")
+    summary.add_argument("--until")
+    summary.add_argument("--min-magnitude", type=float)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        columns = StationColumns.from_events(load_unified_events(args.store, args.unified_dir))
+        columns.save(args.columns_dir)
+        print(f"Saved {len(columns)} station records of {len(columns.event_ids)} events to {args.columns_dir}")
+    else:
+        columns = StationColumns.load(args.columns_dir)
+        mask = columns.mask(county=args.county, since=args.since, until=args.until,
+                            min_magnitude=args.min_magnitude)
+        counts = columns.group_by(args.by, mask=mask)
+        max_intensity = columns.group_by(args.by, "intensity", "max", mask)
+        max_pga = columns.group_by(args.by, "pga_v", "max", mask)
+        for name in sorted(counts, key=counts.get, reverse=True):
+            code = max_intensity.get(name)
+            label = intensity_label(code) if code is not None else "-"
+            pga = f"{max_pga[name]:.2f}" if name in max_pga else "-"
+            print(f"{name}\t{counts[name]} records\tmax Int {label}\tmax PGA(V) {pga}")
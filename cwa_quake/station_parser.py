@@ -0,0 +1,135 @@
+import re
+from itertools import islice
+
+from .intensity import normalize_intensity
+
+# Number of "Key:value" lines (Origin Time, Lon, Lat, Depth, Mag) before the station lines
+HEADER_LINES = 5
+
+# Fields of a Stacode= line. Files up to 2014 carry only the first nine
+# (with AZ instead of BAZ); later files carry all fifteen.
+STATION_FIELDS = (
+    "Stacode", "Staname", "Stalon", "Stalat", "Dist", "BAZ",
+    "PGA(V)", "PGA(NS)", "PGA(EW)", "PGV(V)", "PGV(NS)", "PGV(EW)",
+    "Int", "PGA(SUM)", "PGV(SUM)",
+)
+
+_FLOAT_RE = re.compile(r'^[-+]?\d+\.\d+$')
+
+
+def coerce_value(value):
+    """
+    Generic conversion of a station field value: decimal strings become
+    floats, digit strings ints, anything else stays a string.
+    """
+    if _FLOAT_RE.match(value):
+        return float(value)
+    if value.isdigit():
+        return int(value)
+    return value
+
+
+def _number(value):
+    # Measurement columns are always printed as %.2f, so float() is tried
+    # first; anything else falls back to the generic conversion.
+    if '.' in value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return coerce_value(value)
+
+
+def _intensity(value):
+    # "4級" -> 4; split levels ("5弱", "6強") stay strings, damaged labels
+    # ("4??") are read by their leading digit (see intensity.py)
+    return normalize_intensity(value)
+
+
+def _text(value):
+    return value
+
+
+_CONVERTERS = {field: _number for field in STATION_FIELDS}
+_CONVERTERS.update({"Stacode": _text, "Staname": _text, "Int": _intensity})
+
+_layouts = {}
+
+
+def _layout(parts):
+    """
+    Returns (keys, converters) for the field layout of a split station line,
+    or None if the line is malformed. Layouts are cached, so converters are
+    chosen once per column rather than once per value.
+    """
+    if not all('=' in part for part in parts):
+        return None
+    signature = tuple(part.partition('=')[0].strip() for part in parts)
+    layout = _layouts.get(signature)
+    if layout is None:
+        if not all(signature) or len(set(signature)) != len(signature):
+            return None
+        converters = tuple(_CONVERTERS.get(key, coerce_value) for key in signature)
+        layout = _layouts[signature] = (signature, converters)
+    return layout
+
+
+def parse_station_lines(lines):
+    """
+    Parses Stacode= lines into station dicts, skipping any other line.
+
+    Args:
+        lines: Iterable of text lines (the part of a file after the header).
+
+    Yields:
+        dict: One station, keyed by field name in file order.
+    """
+    layout = None
+    for line in lines:
+        line = line.strip()
+        if not line.startswith('Stacode='):
+            continue
+        parts = line.split(',')
+        # All station lines of a file share one layout; it is only looked up
+        # again when the field count changes
+        if layout is None or len(parts) != len(layout[0]):
+            layout = _layout(parts)
+            if layout is None:
+                # Malformed line: fall back to per-field parsing
+                station = {}
+                for part in parts:
+                    if '=' in part:
+                        key, value = part.split('=', 1)
+                        key = key.strip()
+                        station[key] = _CONVERTERS.get(key, coerce_value)(value.strip())
+                yield station
+                continue
+        keys, converters = layout
+        yield {
+            key: convert(part.partition('=')[2].strip())
+            for key, convert, part in zip(keys, converters, parts)
+        }
+
+
+def read_header(lines):
+    """Parses the "Key:value" header lines into a dict of stripped strings."""
+    header_data = {}
+    for line in lines:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            header_data[key.strip()] = value.strip()
+    return header_data
+
+
+def iter_stations(filepath):
+    """
+    Streams the stations of a CWA earthquake txt file one at a time, without
+    loading the file or building the full event.
+
+    Yields:
+        dict: One station per Stacode= line.
+    """
+    with open(filepath, 'r', encoding='big5', errors='replace') as file:
+        for _ in islice(file, HEADER_LINES):
+            pass
+        yield from parse_station_lines(file)
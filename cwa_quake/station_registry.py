@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Persistent station registry: code, name, coordinates, county, first and last
+seen, and the number of events of every station, in SQLite.
+
+It is updated as a side effect of parsing (parse_earthquake_data.py and
+pipeline.py call record_event() for each event they parse), so keeping it
+current costs O(new events). The city tagger and the coordinate export read
+it instead of rescanning earthquake_data/json.
+
+A station's county comes from code_to_city, the curated table below, and
+otherwise from the offline boundary lookup (county_lookup.py), which is
+repeated when a station reports new coordinates. Name and coordinates are
+those of the station's latest event.
+
+    python -m cwa_quake.station_registry rebuild [--txt-dir ./earthquake_data]
+    python -m cwa_quake.station_registry list [--county 臺北市]
+"""
+import argparse
+import glob
+import os
+import sqlite3
+from pathlib import Path
+
+from . import metrics
+from .county_lookup import lookup_counties
+
+# Curated city/county of the known stations (some entries are a township or a
+# building, see county_lookup.COUNTY_OF_PLACE); they take precedence over the lookup
+code_to_city = {'HWA': '花蓮市', 'ETL': '花蓮縣', 'EYL': '花蓮縣', 'ETM': '花蓮縣', 'EHP': '花蓮縣', 'ESL': '花蓮縣', 'EAH': '宜蘭縣', 'EGC': '花蓮縣', 'WHF': '南投縣', 'ENA': '宜蘭縣', 'FUSS': '臺中市', 'EWT': '宜蘭縣', 'EGFH': '花蓮縣', 'NNS': '宜蘭縣', 'TWT': '臺中市', 'NDS': '宜蘭縣', 'ENT': '宜蘭縣', 'TWD': '花蓮縣', 'ETLH': '花蓮縣', 'OWD': '南投縣', 'B112': '彰化縣', 'SSD': '屏東縣', 'SPT': '屏東市', 'SGL': '屏東縣', 'ECL': '臺東縣', 'KAU': '高雄市', 'TWG': '臺東縣', 'ECU': '臺東縣', 'SGS': '高雄市', 'CHN3': '臺南市', 'STY': '高雄市', 'TAI': '臺南市', 'CHN1': '內市', 'TAI1': '臺南市', 'WTP': '嘉義縣', 'SSH': '臺南市', 'ELD': '臺東縣', 'EDH': '臺東縣', 'ECS': '臺東縣', 'SCL': '臺南市', 'CHN4': '嘉義縣', 'ALS': '嘉義縣', 'CHY': '嘉義市', 'CHN5': '雲林縣', 'WGK': '雲林縣', 'WSF': '雲林縣', 'WDL': '斗六市', 'WTC': '彰化縣', 'PNG': '馬公市', 'WCH': '彰化市', 'TWL': '臺南市', 'TWC': '宜蘭縣', 'ILA': '宜蘭市', 'NTC': '宜蘭縣', 'TWE': '宜蘭縣', 'TIPB': '新北市', 'TWB1': '新北市', 'NDT': '宜蘭縣', 'NWF': '新北市', 'TWA': '臺北市', 'NHDH': '新北市', 'NSK': '桃園市', 'NHY': '臺北市', 'TAP': '臺北市', 'BAC': '新北市', 'NWR': '新北市', 'TWS1': '新北市', 'NTY': '桃園市', 'NTS': '新北市', 'KSHI': '新竹縣', 'NFF': '新竹縣', 'NCU': '桃園市', 'NJD': '新竹縣', 'LIOB': '新竹縣', 'NST': '苗栗縣', 'HSN1': '新竹市', 'HSN': '竹北市', 'NHW': '桃園市', 'SHUL': '花蓮縣', 'WHP': '臺中市', 'NJN': '苗栗縣', 'NML': '苗栗市', 'NSY': '苗栗縣', 'WCS': '南投縣', 'TWQ1': '苗栗縣', 'WDJ': '臺中市', 'WWC': '台中港市鎮中心', 'WNT1': '南投市', 'WHY': '南投縣', 'WCH2': '彰化市', 'WYL': '員林市', 'YUS': '南投縣', 'WRL': '彰化縣', 'WTK': '雲林縣', 'WCKO': '嘉義縣', 'CHN2': '嘉義縣', 'WML': '雲林縣', 'CHY1': '朴子市', 'EGA': '花蓮縣', 'NLD': '宜蘭縣', 'ESF': '花蓮縣', 'NOU': '基隆市', 'EHY': '花蓮縣', 'ECB': '臺東縣', 'FULB': '花蓮縣', 'TCU': '臺中市', 'CHK': '臺東縣', 'WCHH': '彰化市', 'NXZ': '新北市', 'WSL': '雲林縣', 'TTN': '臺東市', 'LDU': '臺東縣', 'TWF1': '花蓮縣', 'TAW': '臺東縣', 'EAS': '臺東縣', 'SCZ': '屏東縣', 'LAY': '臺東縣', 'TWM1': '高雄市', 'EGF': '花蓮縣', 'HEN': '屏東縣', 'SNW': '屏東縣', 'WLC': '屏東縣', 'SEB': '屏東縣', 'SML': '南投縣', 'TYC': '南投縣', 'SCK': '臺南市', 'WES': '彰化縣', 'CHN7': '嘉義縣', 'WNT': '南投縣', 'WPL': '南投縣', 'WWF': '臺中市', 'WDD': '臺中市', 'WDS': '臺中市', 'WYP': '臺中市', 'NSD': '苗栗縣', 'EYUL': '花蓮縣', 'C015': '臺南市', 'CHN8': '嘉義縣', 'LONT': '臺東縣', 'SMG': '屏東縣', 'STYH': '高雄市立桃源國民中學', 'SNS': '臺南市', 'SHH': '臺南市', 'SLG': '高雄市', 'SCS': '高雄市', 'EGS': '宜蘭縣', 'NWL': '新北市', 'A124': '新北市', 'B011': '桃園市', 'NSX': '新北市', 'B219': '臺中市', 'A024': '新北市', 'WJS': '南投縣', 'C092': '雲林縣', 'EHD': '臺東縣', 'WCH1': '彰化市', 'NMLH': '苗栗市', 'SNJ': '高雄市', 'D009': '高雄市', 'WSS': '高雄市', 'KAU1': '高雄市', 'SSP': '屏東縣', 'WDG': '澎湖縣', 'TAWH': '臺東縣', 'SLIU': '屏東縣', 'SMS': '屏東縣', 'WDLH': '斗六市', 'NPL': '新北市', 'NHD': '新北市', 'NGL': '新北市', 'ANP': '臺北市', 'NSM': '新北市', 'ESA': '宜蘭縣', 'TWK1': '屏東縣', 'ICHU': '嘉義縣', 'D033': '屏東縣', 'PCY': '基隆市', 'KNM': '金門縣', 'MSU': '連江縣', 'H176': '苗栗縣', 'CHKH': '臺東縣', 'EHYH': '花蓮縣', 'WLCH': '屏東縣', 'DPDB': '南投縣'}
+
+# One row per station, and one per (event, station) sighting so that parsing
+# an event again does not count it twice.
+#   first_seen, last_seen: ISO origin times of the station's first and latest event
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stations (
+    code       TEXT PRIMARY KEY,
+    name       TEXT,
+    longitude  REAL,
+    latitude   REAL,
+    county     TEXT,
+    first_seen TEXT,
+    last_seen  TEXT,
+    events     INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS sightings (
+    event_id TEXT NOT NULL,
+    code     TEXT NOT NULL,
+    PRIMARY KEY (event_id, code)
+);
+"""
+
+DEFAULT_REGISTRY = "./station_registry.sqlite"
+
+COLUMNS = ("code", "name", "longitude", "latitude", "county", "first_seen", "last_seen", "events")
+
+
+def open_registry(db_path=DEFAULT_REGISTRY):
+    """Opens (creating if needed) the SQLite station registry."""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _coordinate(value):
+    return value if isinstance(value, float) else None
+
+
+def sighting(event):
+    """
+    The part of a parsed event record_event() reads: its timestamp and the
+    code, name and coordinates of its stations. Small enough to send back
+    from a worker process (see executor.py).
+    """
+    keys = ("Stacode", "Staname", "Stalon", "Stalat")
+    return {"timestamp": event.get("timestamp"),
+            "stations": [{key: station[key] for key in keys if key in station} for station in event.get("stations", [])]}
+
+
+def record_event(conn, event_id, event):
+    """
+    Adds the stations of one parsed event (parse_earthquake_file() output)
+    to the registry. Does not commit.
+
+    Returns:
+        int: Number of stations not seen before.
+    """
+    timestamp = event.get("timestamp")
+    stations = {station["Stacode"]: station for station in event.get("stations", []) if station.get("Stacode")}
+    if not stations:
+        return 0
+    codes = list(stations)
+    placeholders = ",".join("?" * len(codes))
+    known = {
+        row[0]: row[1:]
+        for row in conn.execute(f"SELECT code, longitude, latitude, first_seen, last_seen FROM stations "
+                                f"WHERE code IN ({placeholders})", codes)
+    }
+
+    # Counties of new stations, and of looked-up stations that moved, in one batch
+    relookup = []
+    for code, station in stations.items():
+        if code in code_to_city:
+            continue
+        lon, lat = _coordinate(station.get("Stalon")), _coordinate(station.get("Stalat"))
+        if lon is None or lat is None:
+            continue
+        entry = known.get(code)
+        if entry is None or ((lon, lat) != tuple(entry[:2]) and (entry[3] is None or (timestamp or "") >= entry[3])):
+            relookup.append(code)
+    counties = {}
+    if relookup:
+        counties = dict(zip(relookup, lookup_counties([stations[code]["Stalon"] for code in relookup],
+                                                      [stations[code]["Stalat"] for code in relookup])))
+        metrics.incr("registry.county_lookups", len(relookup))
+
+    added = 0
+    for code, station in stations.items():
+        new_sighting = conn.execute("INSERT OR IGNORE INTO sightings (event_id, code) VALUES (?, ?)",
+                                    (event_id, code)).rowcount
+        lon, lat = _coordinate(station.get("Stalon")), _coordinate(station.get("Stalat"))
+        entry = known.get(code)
+        if entry is None:
+            conn.execute(
+                "INSERT INTO stations (code, name, longitude, latitude, county, first_seen, last_seen, events) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (code, station.get("Staname"), lon, lat, code_to_city.get(code, counties.get(code)),
+                 timestamp, timestamp, new_sighting))
+            added += 1
+            continue
+        _, _, first_seen, last_seen = entry
+        latest = last_seen is None or (timestamp or "") >= last_seen
+        conn.execute(
+            "UPDATE stations SET events = events + ?, first_seen = ?, last_seen = ? WHERE code = ?",
+            (new_sighting, min(filter(None, (first_seen, timestamp)), default=None),
+             max(filter(None, (last_seen, timestamp)), default=None), code))
+        if latest and lon is not None and lat is not None:
+            conn.execute("UPDATE stations SET name = ?, longitude = ?, latitude = ? WHERE code = ?",
+                         (station.get("Staname"), lon, lat, code))
+            if code in counties:
+                conn.execute("UPDATE stations SET county = ? WHERE code = ?", (counties[code], code))
+    metrics.incr("registry.events")
+    metrics.incr("registry.new_stations", added)
+    return added
+
+
+def station_counties(conn):
+    """{code: county} of every registered station with a known county."""
+    return dict(conn.execute("SELECT code, county FROM stations WHERE county IS NOT NULL"))
+
+
+def station_coordinates(conn):
+    """
+    {code: [longitude, latitude]} of every registered station with
+    coordinates, the format of extract_station_coords.extract_coordinates_from_json().
+    """
+    return {code: [lon, lat] for code, lon, lat in
+            conn.execute("SELECT code, longitude, latitude FROM stations "
+                         "WHERE longitude IS NOT NULL AND latitude IS NOT NULL ORDER BY code")}
+
+
+def list_stations(conn, county=None):
+    """Registered stations as dicts (see COLUMNS), optionally of one county."""
+    query = f"SELECT {', '.join(COLUMNS)} FROM stations"
+    params = ()
+    if county:
+        query += " WHERE county = ?"
+        params = (county,)
+    return [dict(zip(COLUMNS, row)) for row in conn.execute(query + " ORDER BY code", params)]
+
+
+def rebuild(conn, txt_dir='./earthquake_data'):
+    """Clears the registry and records every station txt file in txt_dir; returns the number of events."""
+    from .parse_earthquake_data import parse_earthquake_file
+
+    conn.execute("DELETE FROM stations")
+    conn.execute("DELETE FROM sightings")
+    events = 0
+    for file_path in sorted(glob.glob(os.path.join(txt_dir, '*.txt'))):
+        data = parse_earthquake_file(file_path)
+        if data:
+            record_event(conn, Path(file_path).stem, data)
+            events += 1
+    conn.commit()
+    return events
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Persistent station registry.")
+    parser.add_argument("command", choices=["rebuild", "list"])
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY)
+    parser.add_argument("--txt-dir", default="./earthquake_data")
+    parser.add_argument("--county", help="only list the stations of this county")
+    args = parser.parse_args()
+
+    conn = open_registry(args.registry)
+    if args.command == "rebuild":
+        events = rebuild(conn, args.txt_dir)
+        total, = conn.execute("SELECT COUNT(*) FROM stations").fetchone()
+        print(f"Registered {total} stations from {events} events in {args.registry}")
+    else:
+        for station in list_stations(conn, args.county):
+            print(f"{station['code']:<6}{station['name'] or '':<10}{station['longitude'] or 0:>8.2f}"
+                  f"{station['latitude'] or 0:>7.2f}  {station['county'] or 'Unknown':<8}"
+                  f"{station['first_seen'] or '':<21}{station['last_seen'] or '':<21}{station['events']:>6}")
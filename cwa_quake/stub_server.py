@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the CWA earthquake site, used to exercise the downloader
+without touching the real server.
+
+    GET .../download?file=%2FdrawTrace%2Foutcome%2F{year}%2F{year}{id}.txt
+        -> {txt_dir}/{year}_{id}.txt
+    GET .../details/{encoded_id}
+        -> details page rendered from {regional_dir}/{encoded_id}_regional.json
+    GET .../catalog.csv
+        -> the catalog CSV file given with --catalog (for watch.py), with
+           Last-Modified set to its mtime
+
+Usage:
+    python -m cwa_quake.stub_server --port 8000
+    python -m cwa_quake.download_earthquake_data --base-url http://127.0.0.1:8000/zh-tw/earthquake
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def render_details_page(earthquake_info, padding=0):
+    """
+    Renders a details page carrying the same JavaScript variables as the CWA
+    site. `padding` bytes of filler markup are put before and after the script
+    to mimic the size of the real page.
+    """
+    location_list = ",\n".join(
+        f"['{loc['latitude']}', '{loc['longitude']}', '{loc['county']}', "
+        f"'{loc['intensity']}', '{loc['location_name']}']"
+        for loc in earthquake_info.get("locations", [])
+    )
+    filler = "<div class=\"filler\"></div>\n" * (padding // 50)
+    return (
+        "<!DOCTYPE html>\n<html><head><title>地震資訊</title></head><body>\n"
+        f"{filler}"
+        "<script>\n"
+        f"var lat = '{earthquake_info.get('epicenter_lat', '')}';\n"
+        f"var lon = '{earthquake_info.get('epicenter_lon', '')}';\n"
+        f"var mag = '{earthquake_info.get('magnitude', '')}';\n"
+        f"var maxIntensity = '{earthquake_info.get('max_intensity', '')}';\n"
+        f"var locationList = [{location_list}];\n"
+        "</script>\n"
+        f"{filler}"
+        "</body></html>\n"
+    )
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    txt_dir = "./earthquake_data"
+    regional_dir = "./earthquake_regional_data"
+    latency = 0.0
+    fail_rate = 0.0
+    padding = 0
+    catalog_file = None
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_rate and random.random() < self.fail_rate:
+            self.send_error(503)
+            return
+
+        parts = urlsplit(self.path)
+        last_modified = None
+        if parts.path.endswith("/catalog.csv"):
+            body, last_modified = self._catalog_body()
+            content_type = "text/csv; charset=big5"
+        elif parts.path.endswith("/download"):
+            body = self._txt_body(parse_qs(parts.query).get("file", [""])[0])
+            content_type = "text/plain; charset=big5"
+        elif "/details/" in parts.path:
+            body = self._details_body(parts.path.rsplit("/", 1)[-1])
+            content_type = "text/html; charset=utf-8"
+        else:
+            body = None
+
+        if body is None:
+            self.send_error(404)
+            return
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag or self._not_modified_since(last_modified):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        if last_modified is not None:
+            self.send_header("Last-Modified", formatdate(last_modified, usegmt=True))
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _catalog_body(self):
+        if not self.catalog_file or not os.path.exists(self.catalog_file):
+            return None, None
+        with open(self.catalog_file, "rb") as f:
+            return f.read(), os.path.getmtime(self.catalog_file)
+
+    def _not_modified_since(self, last_modified):
+        since = self.headers.get("If-Modified-Since")
+        if last_modified is None or not since or self.headers.get("If-None-Match"):
+            return False
+        try:
+            return int(last_modified) <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def _txt_body(self, file_param):
+        match = re.search(r"/(\d{4})/\1(\w+)\.txt$", file_param)
+        if not match:
+            return None
+        path = os.path.join(self.txt_dir, f"{match.group(1)}_{match.group(2)}.txt")
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _details_body(self, encoded_id):
+        path = os.path.join(self.regional_dir, f"{encoded_id}_regional.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            earthquake_info = json.load(f)
+        return render_details_page(earthquake_info, self.padding).encode("utf-8")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(txt_dir="./earthquake_data", regional_dir="./earthquake_regional_data",
+                      port=0, latency=0.0, fail_rate=0.0, padding=0, catalog_file=None):
+    """
+    Starts the stub server on a background thread.
+
+    Returns:
+        tuple: (server, base_url) - call server.shutdown() when done.
+    """
+    handler = type("Handler", (StubHandler,), {
+        "txt_dir": txt_dir,
+        "regional_dir": regional_dir,
+        "latency": latency,
+        "fail_rate": fail_rate,
+        "padding": padding,
+        "catalog_file": catalog_file,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/zh-tw/earthquake"
+    return server, base_url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve local earthquake files the way the CWA site does.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--txt-dir", default="./earthquake_data")
+    parser.add_argument("--regional-dir", default="./earthquake_regional_data")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--padding", type=int, default=0, help="filler bytes around the details page script")
+    parser.add_argument("--catalog", help="catalog CSV served as .../catalog.csv")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.txt_dir, args.regional_dir, args.port,
+                                         args.latency, args.fail_rate, args.padding, args.catalog)
+    print(f"Serving stub CWA site at {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
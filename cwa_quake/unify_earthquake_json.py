@@ -0,0 +1,242 @@
+import json
+import os
+import glob
+import argparse
+import functools
+from pathlib import Path
+
+from . import executor as file_executor
+from . import metrics
+from .build_ledger import open_ledger, plan_build, record_build, remove_orphans
+from .county_lookup import lookup_counties
+from .intensity import intensity_code, max_intensity, normalize_intensity
+from .site_motion import DEFAULT_COEFFICIENTS, cached_model, coefficients_digest, fill_regional
+
+# Define input and output directories
+# Adjust these paths if your directories are different
+DETAILED_STATION_JSON_DIR = Path("earthquake_data/json_with_city")
+REGIONAL_INTENSITY_JSON_DIR = Path("earthquake_regional_data")
+UNIFIED_JSON_DIR = Path("unified_earthquake_data")
+
+def transform_detailed_station_data(data, event_id):
+    unified = {
+        "event_id": event_id,
+        "timestamp": data.get("timestamp"),
+        "epicenter_latitude": data.get("latitude"),
+        "epicenter_longitude": data.get("longitude"),
+        "depth_km": data.get("depth_km"),
+        "magnitude": data.get("magnitude"),
+        "max_intensity_observed": None, # Will calculate from stations
+        "source_type": "detailed_station",
+        "affected_locations": []
+    }
+
+    codes = []
+    for station in data.get("stations", []):
+        intensity = station.get("Int")
+        codes.append(intensity_code(intensity))
+
+        location = {
+            "location_name": station.get("Staname"),
+            "latitude": station.get("Stalat"),
+            "longitude": station.get("Stalon"),
+            "county": station.get("City"), # Assuming 'City' was added previously
+            "intensity": normalize_intensity(intensity),
+            "station_code": station.get("Stacode"),
+            "distance_km": station.get("Dist"),
+            "pga_v": station.get("PGA(V)"),
+            "pga_ns": station.get("PGA(NS)"),
+            "pga_ew": station.get("PGA(EW)"),
+            "pgv_v": station.get("PGV(V)"),
+            "pgv_ns": station.get("PGV(NS)"),
+            "pgv_ew": station.get("PGV(EW)")
+        }
+        unified["affected_locations"].append(location)
+
+    # Max over the ordinal codes, so split levels ("5強") count too
+    metrics.incr("unify.detailed")
+    strongest = max_intensity(codes)
+    unified["max_intensity_observed"] = strongest if strongest else None
+    return unified
+
+def transform_regional_intensity_data(data, event_id, coefficients=DEFAULT_COEFFICIENTS):
+    # Attempt to parse timestamp from event_id (assuming format YYYYMMDDHHMMSS...)
+    timestamp_str = None
+    try:
+        # Extract the numeric part assuming it's at the beginning
+        numeric_part = "".join(filter(str.isdigit, event_id.split('_')[0]))
+        if len(numeric_part) >= 14: # Need at least YYYYMMDDHHMMSS
+            year = numeric_part[0:4]
+            month = numeric_part[4:6]
+            day = numeric_part[6:8]
+            hour = numeric_part[8:10]
+            minute = numeric_part[10:12]
+            second = numeric_part[12:14]
+            timestamp_str = f"{year}-{month}-{day} {hour}:{minute}:{second}"
+    except Exception:
+        timestamp_str = None # Keep it None if parsing fails
+
+    unified = {
+        "event_id": event_id,
+        "timestamp": timestamp_str, # Use parsed timestamp
+        "epicenter_latitude": data.get("epicenter_lat"),
+        "epicenter_longitude": data.get("epicenter_lon"),
+        "depth_km": None, # Not available in this source
+        "magnitude": data.get("magnitude"),
+        "max_intensity_observed": normalize_intensity(data.get("max_intensity")),
+        "source_type": "regional_intensity",
+        "affected_locations": []
+    }
+
+    locations = data.get("locations", [])
+    counties = [loc.get("county") for loc in locations]
+
+    # The details page does not always name the county; fill it in offline
+    missing = [i for i, county in enumerate(counties) if not county]
+    if missing:
+        try:
+            found = lookup_counties([float(locations[i]["longitude"]) for i in missing],
+                                    [float(locations[i]["latitude"]) for i in missing])
+            for i, county in zip(missing, found):
+                counties[i] = county
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    metrics.incr("unify.regional")
+    for loc, county in zip(locations, counties):
+        location = {
+            "location_name": loc.get("location_name"),
+            "latitude": loc.get("latitude"),
+            "longitude": loc.get("longitude"),
+            "county": county,
+            "intensity": normalize_intensity(loc.get("intensity")),
+            # Fields below are not available in regional data
+            "station_code": None,
+            "distance_km": None,
+            "pga_v": None,
+            "pga_ns": None,
+            "pga_ew": None,
+            "pgv_v": None,
+            "pgv_ns": None,
+            "pgv_ew": None
+        }
+        unified["affected_locations"].append(location)
+
+    # Distance and estimated PGA/PGV, once site_motion.py has fitted coefficients
+    model = cached_model(coefficients)
+    if model is not None:
+        fill_regional([unified], model)
+
+    return unified
+
+def save_unified_data(unified_data, output_dir):
+    """
+    Writes a unified event to {output_dir}/{event_id}.json, atomically.
+
+    Returns:
+        tuple: (output path, bytes written)
+    """
+    content = json.dumps(unified_data, ensure_ascii=False, indent=4).encode('utf-8')
+    output_filepath = Path(output_dir) / f"{unified_data['event_id']}.json"
+    file_executor.write_atomic(output_filepath, content)
+    metrics.incr("unify.files_written")
+    metrics.incr("unify.bytes_written", len(content))
+    return output_filepath, len(content)
+
+def process_json_file(filepath, output_dir, coefficients=DEFAULT_COEFFICIENTS):
+    """
+    Transforms one detailed-station or regional JSON file into the unified
+    format and returns the output path, or None if it was skipped. Regional
+    events are filled with the site_motion `coefficients`, if they exist.
+    """
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        event_id = filepath.stem # Get filename without extension (e.g., "2014_001")
+        unified_data = None
+
+        # Detect format and transform
+        if "stations" in data and isinstance(data["stations"], list):
+            unified_data = transform_detailed_station_data(data, event_id)
+            metrics.detail(f"Processed (detailed): {filepath.name}")
+        elif "locations" in data and isinstance(data["locations"], list):
+            unified_data = transform_regional_intensity_data(data, event_id, coefficients)
+            metrics.detail(f"Processed (regional): {filepath.name}")
+        else:
+            metrics.incr("unify.skipped")
+            metrics.detail(f"Skipping unknown format: {filepath.name}")
+            return None
+
+        # Save the unified data
+        output_filepath, _ = save_unified_data(unified_data, output_dir)
+        return output_filepath
+
+    except json.JSONDecodeError:
+        metrics.incr("unify.errors")
+        metrics.warn(f"Error decoding JSON: {filepath.name}")
+    except Exception as e:
+        metrics.incr("unify.errors")
+        metrics.warn(f"Error processing file {filepath.name}: {e}")
+    return None
+
+def main(ledger=None, executor=None, coefficients=DEFAULT_COEFFICIENTS):
+    """
+    Unifies the files of both input directories into UNIFIED_JSON_DIR.
+
+    With a build ledger connection (see build_ledger.py) unchanged inputs are
+    skipped and outputs whose input is gone are deleted; regional inputs are
+    also rebuilt when the `coefficients` file changes. Files are transformed
+    on the `executor` (see executor.py), serially by default.
+    """
+    executor = executor or file_executor.FileExecutor(1, name="unify")
+    # Ensure the output directory exists
+    UNIFIED_JSON_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Process files from both directories
+    regional = list(REGIONAL_INTENSITY_JSON_DIR.glob("*.json"))
+    filepaths = list(DETAILED_STATION_JSON_DIR.glob("*.json")) + regional
+    regional_sources = {str(filepath) for filepath in regional}
+    digest = coefficients_digest(coefficients)
+    depends = lambda source: digest if source in regional_sources else ""
+    if ledger is not None:
+        sources = [str(filepath) for filepath in filepaths]
+        for removed in remove_orphans(ledger, "unify", sources):
+            metrics.detail(f"Removed orphaned {removed}")
+        to_build, skipped = plan_build(ledger, "unify", sources, depends=depends)
+        metrics.info(f"{len(to_build)} new or modified files, {skipped} up to date")
+    else:
+        to_build = [(str(filepath), None) for filepath in filepaths]
+
+    unified = 0
+    task = functools.partial(process_json_file, output_dir=UNIFIED_JSON_DIR, coefficients=coefficients)
+    results = executor.map(task, [Path(source) for source, _ in to_build])
+    for (_, output_filepath), (source, fingerprint) in zip(results, to_build):
+        if output_filepath is not None:
+            unified += 1
+            if ledger is not None:
+                record_build(ledger, "unify", source, fingerprint, str(output_filepath), depends(source))
+
+    if ledger is not None:
+        ledger.commit()
+
+    metrics.info(f"Unified {unified} of {len(to_build)} files")
+    metrics.info(executor.report())
+    metrics.info(f"\\nUnified JSON files saved to: {UNIFIED_JSON_DIR}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Unify detailed-station and regional earthquake JSON files.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip inputs unchanged since the last run, tracked in the build ledger")
+    parser.add_argument("--ledger", default="./build_ledger.sqlite")
+    parser.add_argument("--coefficients", default=DEFAULT_COEFFICIENTS,
+                        help="site_motion.py coefficients to fill regional events with (not filled if the file does not exist)")
+    file_executor.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+
+    with metrics.stage("unify"):
+        main(open_ledger(args.ledger) if args.incremental else None, file_executor.from_args(args, "unify"),
+             args.coefficients)
+    metrics.finish()
\ No newline at end of file
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Watch mode: polls the earthquake catalog and ingests every newly listed
+event as soon as it appears, instead of waiting for the next hand-run
+download -> parse -> city tagging -> unify cycle.
+
+Every poll is a conditional request (If-None-Match / If-Modified-Since), so
+an unchanged catalog costs a 304. A changed one is merged into the download
+manifest (download_manifest.py); only the events new to the manifest are
+requested, and each goes straight through pipeline.py's in-memory
+parse -> city tagging -> unify and is written to the unified directory (or
+an event store), with the build ledger and station registry updated as the
+batch scripts do.
+
+The manifest is the backlog: the work queue in memory holds at most
+--queue-size events and is refilled from the manifest as workers free up,
+newest first, so a burst of aftershocks only grows the manifest while
+memory and the request rate stay bounded.
+
+The CWA site has no stable CSV export URL, so --catalog-url points at
+wherever the catalog is published; stub_server.py --catalog serves one for
+local runs:
+
+    python -m cwa_quake.stub_server --port 8000 --catalog catalog.csv
+    python -m cwa_quake.watch --catalog-url http://127.0.0.1:8000/zh-tw/earthquake/catalog.csv \\
+                              --base-url http://127.0.0.1:8000/zh-tw/earthquake --interval 10
+
+The latency of each event from publication (the catalog's Last-Modified,
+or the poll that first listed it) to its unified record is recorded as
+watch.publish_to_unified_seconds; see --metrics.
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from . import metrics
+from .build_ledger import open_ledger, record_build
+from .download_earthquake_data import manifest_jobs
+from .download_engine import HostRateLimiter, _run_job, fetch, make_session
+from .download_manifest import add_events, open_manifest, parse_catalog, record_failure, record_result
+from .earthquake_codec import CWA_BASE_URL
+from .event_store import EventStore
+from .pipeline import _store_output, unify_regional_event, unify_txt_event
+from .raw_archive import DEFAULT_ARCHIVE, RawArchive
+from .site_motion import DEFAULT_COEFFICIENTS, coefficients_digest
+from .station_registry import DEFAULT_REGISTRY, open_registry
+from .unify_earthquake_json import save_unified_data
+
+# Manifest source name of the events found by polling
+WATCH_SOURCE = "watch"
+
+# Failed events are retried on later refills up to this many attempts; the
+# batch downloader still picks them up after that
+MAX_ATTEMPTS = 3
+
+
+def _http_time(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class Watcher:
+    """
+    Polls a catalog URL and ingests new events with a pool of worker threads.
+
+    Args:
+        catalog_url: URL of the Big5 catalog CSV.
+        manifest_path: Download manifest (see download_manifest.py).
+        output_dir, regional_dir: Where the station txt files and regional
+            JSON files are downloaded to.
+        unified_dir: Directory for the unified JSON files.
+        store_path: Optional event store to append to instead of unified_dir.
+        ledger_path: Optional build ledger; ingested sources are recorded so
+            pipeline.py --incremental skips them.
+        registry_path: Optional station registry to update.
+        archive_path: Optional raw archive to store the payloads in.
+        base_url: CWA earthquake site (or a local stub server).
+        workers: Events downloaded and unified concurrently.
+        queue_size: Maximum number of events queued in memory.
+        rate, retries: As for download_engine.download_all().
+    """
+
+    def __init__(self, catalog_url, manifest_path, output_dir, regional_dir, unified_dir, store_path=None,
+                 ledger_path=None, registry_path=None, base_url=CWA_BASE_URL, workers=2, queue_size=32,
+                 rate=2.0, retries=3, archive_path=None, coefficients=DEFAULT_COEFFICIENTS):
+        self.catalog_url = catalog_url
+        self.manifest_path = manifest_path
+        self.output_dir = output_dir
+        self.regional_dir = regional_dir
+        self.unified_dir = unified_dir
+        self.ledger_path = ledger_path
+        self.registry_path = registry_path
+        self.base_url = base_url
+        self.workers = workers
+        self.retries = retries
+        self.coefficients = coefficients
+
+        self.session = make_session(workers + 1)
+        self.limiter = HostRateLimiter(rate, burst=2)
+        self.conn = None  # manifest connection of the polling thread, see run()
+        self.store = EventStore(store_path) if store_path else None
+        self.archive = RawArchive(archive_path) if archive_path else None
+        self._store_lock = threading.Lock()
+        self._registry_lock = threading.Lock()
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.in_flight = set()  # encoded IDs queued or being ingested
+        self.published = {}     # encoded ID -> publication time, until ingested
+        self._lock = threading.Lock()
+        self._freed = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+
+        self.etag = None
+        self.last_modified = None
+        self.last_poll = None
+        self.stats = {"polls": 0, "not_modified": 0, "new": 0, "ingested": 0, "failed": 0, "peak_queue": 0}
+
+    def poll(self):
+        """
+        Requests the catalog conditionally and adds its new events to the
+        manifest. Returns the number of new events.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        polled_at = time.time()
+        previous_poll, self.last_poll = self.last_poll, polled_at
+        self.stats["polls"] += 1
+        metrics.incr("watch.polls")
+        try:
+            response = fetch(self.session, self.limiter, self.catalog_url, retries=self.retries, headers=headers)
+        except Exception as e:
+            metrics.warn(f"Failed to poll {self.catalog_url}: {e}")
+            return 0
+        with response:
+            if response.status_code == 304:
+                self.stats["not_modified"] += 1
+                metrics.incr("watch.not_modified")
+                return 0
+            if response.status_code != 200:
+                metrics.warn(f"Failed to poll {self.catalog_url}. Status code: {response.status_code}")
+                return 0
+            text = response.content.decode("big5")
+            self.etag = response.headers.get("ETag")
+            self.last_modified = response.headers.get("Last-Modified")
+
+        events = parse_catalog(text.splitlines(), self.catalog_url)
+        added = add_events(self.conn, events, WATCH_SOURCE, self.output_dir, self.regional_dir)
+        self.conn.commit()
+
+        # Last-Modified has one-second resolution; an event was also not
+        # published before the previous poll that did not list it
+        published = _http_time(self.last_modified) or polled_at
+        if previous_poll is not None:
+            published = max(published, previous_poll)
+        published = min(published, polled_at)
+        with self._lock:
+            for event in added:
+                self.published[event.encoded_id] = published
+        self.stats["new"] += len(added)
+        metrics.incr("watch.new_events", len(added))
+        if added:
+            metrics.info(f"Catalog lists {len(added)} new events")
+        return len(added)
+
+    def fill(self):
+        """
+        Queues pending manifest events, newest first, up to the free queue
+        capacity. Returns the number of events queued or in flight.
+        """
+        with self._lock:
+            free = self.queue.maxsize - self.queue.qsize()
+            exclude = list(self.in_flight)
+        if free > 0:
+            placeholders = ",".join("?" * len(exclude))
+            rows = self.conn.execute(
+                f"SELECT * FROM events WHERE (status = 'new' OR (status = 'failed' AND attempts < ?)) "
+                f"AND encoded_id NOT IN ({placeholders}) ORDER BY origin_time DESC LIMIT ?",
+                (MAX_ATTEMPTS, *exclude, free)).fetchall()
+            for row in rows:
+                with self._lock:
+                    self.in_flight.add(row["encoded_id"])
+                    self.published.setdefault(row["encoded_id"], self.last_poll or time.time())
+                self.queue.put_nowait((row, time.time()))
+            depth = self.queue.qsize()
+            self.stats["peak_queue"] = max(self.stats["peak_queue"], depth)
+            metrics.observe("watch.queue_depth", depth)
+        with self._lock:
+            return len(self.in_flight)
+
+    def start(self):
+        """Starts the worker threads."""
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        # SQLite connections are per thread
+        conn = open_manifest(self.manifest_path)
+        ledger = open_ledger(self.ledger_path) if self.ledger_path else None
+        registry = open_registry(self.registry_path) if self.registry_path else None
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            row, queued_at = item
+            metrics.observe("watch.queue_wait_seconds", time.time() - queued_at)
+            try:
+                ok = self.ingest(row, conn, ledger, registry)
+            except Exception as e:
+                metrics.warn(f"Error ingesting {row['encoded_id']}: {e}")
+                ok = False
+            with self._lock:
+                self.in_flight.discard(row["encoded_id"])
+                published = self.published.pop(row["encoded_id"], None)
+                self.stats["ingested" if ok else "failed"] += 1
+            if ok and published is not None:
+                metrics.observe("watch.publish_to_unified_seconds", time.time() - published)
+            self._freed.set()
+        for connection in (conn, ledger, registry):
+            if connection is not None:
+                connection.close()
+
+    def ingest(self, row, conn, ledger=None, registry=None):
+        """
+        Downloads, parses and unifies one manifest event on the calling
+        thread's connections. Returns True once its unified record is written.
+
+        The download is recorded in the manifest only then; if the event
+        cannot be unified or written it is recorded as failed instead, so
+        fill() retries it.
+        """
+        job = manifest_jobs([row], self.output_dir, self.regional_dir, self.base_url, archive=self.archive)[0]
+        result = _run_job(self.session, self.limiter, job, self.retries)
+        if result["status"] != 304 and result["size"] is None:
+            record_result(conn, row["encoded_id"], result)
+            return False
+        try:
+            written = self._write_unified(row, job.output_file, result, ledger, registry)
+        except Exception:
+            record_failure(conn, row["encoded_id"])
+            raise
+        if not written:
+            record_failure(conn, row["encoded_id"])
+            return False
+        record_result(conn, row["encoded_id"], result)
+        return True
+
+    def _write_unified(self, row, source, result, ledger, registry):
+        """Unifies a downloaded event and writes it; returns False if it could not be unified."""
+        if row["kind"] == "regional":
+            unified = unify_regional_event(source, coefficients=self.coefficients)
+        else:
+            # record_event() reads then writes station rows, so registry
+            # updates from the workers' connections must not interleave;
+            # parsing and unifying run outside the lock
+            unified = unify_txt_event(source, registry, self.archive, self._registry_lock)
+        if unified is None:
+            metrics.warn(f"Could not unify {source}")
+            return False
+
+        if self.store is not None:
+            with self._store_lock:
+                self.store.append(unified)
+            stage, output = "pipeline-store", _store_output(self.store, unified["event_id"])
+        else:
+            output, _ = save_unified_data(unified, self.unified_dir)
+            stage = "pipeline"
+        if ledger is not None:
+            stat = os.stat(source)
+            depends = coefficients_digest(self.coefficients) if row["kind"] == "regional" else ""
+            record_build(ledger, stage, source, (stat.st_size, stat.st_mtime, result["checksum"]), str(output), depends)
+            ledger.commit()
+        metrics.incr("watch.ingested")
+        metrics.info(f"Ingested {unified['event_id']} ({unified.get('timestamp')}, M{unified.get('magnitude')})")
+        return True
+
+    def run(self, interval=30.0, max_polls=None, until_idle=False):
+        """
+        Polls every `interval` seconds, keeping the queue filled in between.
+        Stops after `max_polls` polls or, with `until_idle`, after a poll
+        that found nothing new, once the backlog is ingested; otherwise runs
+        until stop() is called or interrupted.
+        """
+        self.conn = open_manifest(self.manifest_path)
+        self.start()
+        try:
+            while True:
+                added = self.poll()
+                next_poll = time.monotonic() + interval
+                last = ((max_polls is not None and self.stats["polls"] >= max_polls) or (until_idle and not added)
+                        or self._stopping.is_set())
+                while last or time.monotonic() < next_poll:
+                    self._freed.clear()
+                    last = last or self._stopping.is_set()
+                    if not self.fill() and last:
+                        return self.stats
+                    self._freed.wait(timeout=max(0.0, next_poll - time.monotonic()) if not last else 1.0)
+        finally:
+            self.close()
+
+    def stop(self):
+        """Makes run() stop polling and return once the events already found are ingested."""
+        self._stopping.set()
+        self._freed.set()
+
+    def close(self):
+        """Stops the workers after the events already queued and closes the connections."""
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.conn is not None:
+            self.conn.close()
+        self.session.close()
+        if self.store is not None:
+            self.store.close()
+        if self.archive is not None:
+            self.archive.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poll the earthquake catalog and ingest new events as they appear.")
+    parser.add_argument("--catalog-url", required=True, help="URL of the Big5 catalog CSV")
+    parser.add_argument("--base-url", default=CWA_BASE_URL, help="CWA earthquake site (or a local stub server)")
+    parser.add_argument("--interval", type=float, default=30.0, help="seconds between catalog polls")
+    parser.add_argument("--output-dir", default="./earthquake_data")
+    parser.add_argument("--regional-dir", default="./earthquake_regional_data")
+    parser.add_argument("--unified-dir", default="./unified_earthquake_data")
+    parser.add_argument("--store", help="append the unified events to this packed store instead of --unified-dir")
+    parser.add_argument("--manifest", default="./download_manifest.sqlite", help="download state database")
+    parser.add_argument("--ledger", default="./build_ledger.sqlite")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY, help="station registry to update")
+    parser.add_argument("--no-registry", action="store_true", help="do not update the station registry")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE, help="raw archive to store the payloads in")
+    parser.add_argument("--no-archive", action="store_true", help="do not archive the payloads")
+    parser.add_argument("--coefficients", default=DEFAULT_COEFFICIENTS,
+                        help="site_motion.py coefficients to fill regional events with (not filled if the file does not exist)")
+    parser.add_argument("--workers", type=int, default=2, help="events ingested concurrently")
+    parser.add_argument("--queue-size", type=int, default=32, help="maximum events queued in memory")
+    parser.add_argument("--rate", type=float, default=2.0, help="requests per second per host")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--max-polls", type=int, help="stop after this many polls")
+    parser.add_argument("--until-idle", action="store_true",
+                        help="stop after a poll that finds nothing new, once the backlog is ingested")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+
+    for path in (args.output_dir, args.regional_dir, args.unified_dir):
+        os.makedirs(path, exist_ok=True)
+    watcher = Watcher(args.catalog_url, args.manifest, args.output_dir, args.regional_dir, args.unified_dir,
+                      args.store, args.ledger, None if args.no_registry else args.registry, args.base_url,
+                      args.workers, args.queue_size, args.rate, args.retries,
+                      None if args.no_archive else args.archive, args.coefficients)
+    try:
+        with metrics.stage("watch"):
+            stats = watcher.run(args.interval, args.max_polls, args.until_idle)
+    except KeyboardInterrupt:
+        stats = watcher.stats
+    metrics.info(f"{stats['polls']} polls ({stats['not_modified']} not modified), {stats['new']} new events, "
+                 f"{stats['ingested']} ingested, {stats['failed']} failed, peak queue {stats['peak_queue']}")
+    latency = metrics.metrics.snapshot()["histograms"].get("watch.publish_to_unified_seconds")
+    if latency:
+        metrics.info(f"Publication to unified record: p50 {latency['p50']:.2f}s, p99 {latency['p99']:.2f}s")
+    metrics.finish()